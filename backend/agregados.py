@@ -0,0 +1,486 @@
+"""
+Agregados incrementais de engajamento por (aula, aluno)
+
+Cada amostra de atenção ou interação gravada atualiza, na mesma transação,
+uma linha de `agregados_engajamento` com somas e contagens. A análise da
+turma passa a ler uma linha por aluno, independente de quantas amostras
+foram armazenadas.
+
+Na mesma gravação, score_atencao e risco_evasao das linhas alteradas são
+recalculados no banco, em colunas indexadas por aula: o ranking da turma
+(ranking_turma) lê só os K primeiros pelo índice, sem calcular nem ordenar
+a turma inteira. Quando o modelo de risco muda, atualizar_rankings recalcula
+as linhas com a assinatura antiga (o backend a chama em segundo plano ao
+iniciar e a cada recarga do modelo; até lá, as páginas que filtram ou
+ordenam pelo risco são montadas a partir da turma inteira, recalculada com
+o modelo novo).
+
+Uso via linha de comando (a partir de backend/):
+    python agregados.py reconstruir [aula_id]
+    python agregados.py verificar [aula_id]
+"""
+
+import sys
+
+from sqlalchemy import Float, case, cast, delete, func, literal, or_, select, tuple_, union, union_all, update
+
+from database import SessionLocal, insert_com_conflito
+from estado_compartilhado import trava
+from modelo_risco import OPERADORES, modelo_atual
+from models import (AgregadoEngajamento, Aluno, IntervaloAtencao, MetricaAtencao, MetricaAtencaoMinuto,
+                    SessaoInteracao)
+from paginacao import paginar, paginar_lista
+
+
+COLUNAS_ATENCAO = ("total_checks", "checks_na_tela", "soma_fadiga", "soma_desvios", "soma_interrupcoes")
+COLUNAS_INTERACAO = ("total_tempo", "total_cliques")
+COLUNAS_SNAPSHOT = ("ultimo_tempo_permanencia", "ultimos_cliques", "ultimos_eventos_player",
+                    "ultima_interacao_em", "sessao_atual")
+
+# Ordenações do ranking: coluna e se é decrescente (maior risco / menor atenção primeiro)
+ORDENACOES = {
+    "risco_evasao": (AgregadoEngajamento.risco_evasao, True),
+    "score_atencao": (AgregadoEngajamento.score_atencao, False),
+}
+
+
+def _upsert(db, linhas, colunas_soma, colunas_substituir=()):
+    stmt = insert_com_conflito(db, AgregadoEngajamento)
+    set_ = {c: getattr(AgregadoEngajamento, c) + stmt.excluded[c] for c in colunas_soma}
+    set_.update({c: stmt.excluded[c] for c in colunas_substituir})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AgregadoEngajamento.aula_id, AgregadoEngajamento.aluno_id],
+        set_=set_
+    )
+    db.execute(stmt, linhas)
+
+
+def aplicar_atencao(db, metricas):
+    """Acumula amostras de atenção (dicts com as colunas de MetricaAtencao)"""
+    deltas = {}
+    for m in metricas:
+        chave = (m["aula_id"], m["aluno_id"])
+        d = deltas.get(chave)
+        if d is None:
+            d = deltas[chave] = {
+                "aula_id": chave[0], "aluno_id": chave[1],
+                "total_checks": 0, "checks_na_tela": 0, "soma_fadiga": 0.0,
+                "soma_desvios": 0, "soma_interrupcoes": 0,
+            }
+        d["total_checks"] += 1
+        d["checks_na_tela"] += 1 if m["gaze_na_tela"] else 0
+        d["soma_fadiga"] += m["fadiga_score"]
+        d["soma_desvios"] += m["desvio_olhar"]
+        d["soma_interrupcoes"] += m["interrupcoes"]
+    if deltas:
+        _upsert(db, list(deltas.values()), COLUNAS_ATENCAO)
+        atualizar_ranking(db, pares=list(deltas))
+
+
+def aplicar_interacao(db, atualizacoes):
+    """
+    Acumula atualizações de sessões de interação (ver sessoes.py): somam-se
+    as diferenças de tempo e cliques em relação ao valor anterior da sessão,
+    e a atualização mais recente vira o snapshot
+    """
+    deltas = {}
+    for m in atualizacoes:
+        chave = (m["aula_id"], m["aluno_id"])
+        d = deltas.get(chave)
+        if d is None:
+            d = deltas[chave] = {
+                "aula_id": chave[0], "aluno_id": chave[1],
+                "total_tempo": 0, "total_cliques": 0,
+            }
+        d["total_tempo"] += m["delta_tempo"]
+        d["total_cliques"] += m["delta_cliques"]
+        d["ultimo_tempo_permanencia"] = m["tempo_permanencia"]
+        d["ultimos_cliques"] = m["cliques_materiais"]
+        d["ultimos_eventos_player"] = m["eventos_player"]
+        d["ultima_interacao_em"] = m["timestamp"]
+        d["sessao_atual"] = m["sessao_chave"]
+    if deltas:
+        _upsert(db, list(deltas.values()), COLUNAS_INTERACAO, COLUNAS_SNAPSHOT)
+        atualizar_ranking(db, pares=list(deltas))
+
+
+def _valores_ranking(modelo):
+    """
+    score_atencao e risco_evasao como expressões SQL sobre as somas do
+    agregado, com a mesma aritmética de montar_resultado
+    """
+    a = AgregadoEngajamento
+    com_checks = a.total_checks > 0
+    score_atencao = case((com_checks, cast(a.checks_na_tela, Float) / a.total_checks * 100), else_=0)
+    campos = {
+        "score_atencao": score_atencao,
+        "media_fadiga": case((com_checks, a.soma_fadiga / a.total_checks), else_=0),
+        "total_cliques": a.total_cliques,
+        "total_tempo": a.total_tempo,
+        "desvios_olhar": a.soma_desvios,
+        "interrupcoes": a.soma_interrupcoes,
+    }
+    soma = literal(0)
+    for campo, simbolo, limite, peso in modelo.regras:
+        soma = soma + case((OPERADORES[simbolo](campos[campo], limite), peso), else_=0)
+    return {
+        "score_atencao": score_atencao,
+        "risco_evasao": case((soma > modelo.maximo, modelo.maximo), else_=soma),
+        "modelo_risco": modelo.assinatura,
+    }
+
+
+def atualizar_rankings(modelo=None, session_factory=SessionLocal):
+    """
+    Recalcula, em todas as aulas, as linhas gravadas com outro modelo de
+    risco e faz o commit. Com vários workers, um de cada vez (os seguintes
+    não encontram mais linhas desatualizadas). Retorna as linhas alteradas.
+    """
+    with trava("ranking"):
+        db = session_factory()
+        try:
+            alteradas = atualizar_ranking(db, modelo=modelo, desatualizados=True)
+            db.commit()
+            return alteradas
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def atualizar_ranking(db, pares=None, aula_id=None, modelo=None, desatualizados=False):
+    """
+    Recalcula score_atencao e risco_evasao das linhas (aula_id, aluno_id)
+    em `pares`, da aula ou de todas; com desatualizados=True, só das
+    calculadas por outro modelo. Retorna o número de linhas alteradas.
+    """
+    modelo = modelo or modelo_atual()
+    stmt = update(AgregadoEngajamento).values(**_valores_ranking(modelo))
+    if pares is not None:
+        stmt = stmt.where(tuple_(AgregadoEngajamento.aula_id, AgregadoEngajamento.aluno_id).in_(pares))
+    if aula_id is not None:
+        stmt = stmt.where(AgregadoEngajamento.aula_id == aula_id)
+    if desatualizados:
+        stmt = stmt.where(or_(AgregadoEngajamento.modelo_risco.is_(None),
+                              AgregadoEngajamento.modelo_risco != modelo.assinatura))
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def calcular_risco(score_atencao, media_fadiga, total_cliques, total_tempo,
+                   desvios_olhar=0, interrupcoes=0, modelo=None):
+    """Risco de evasão (combinação dos scores) segundo o modelo configurado"""
+    return (modelo or modelo_atual()).avaliar(
+        score_atencao, media_fadiga, total_cliques, total_tempo, desvios_olhar, interrupcoes
+    )
+
+
+def montar_resultado(aluno_id, aluno_nome, total_checks, checks_na_tela, soma_fadiga,
+                     soma_desvios, soma_interrupcoes, total_tempo, total_cliques, modelo=None):
+    score_atencao = (checks_na_tela / total_checks * 100) if total_checks > 0 else 0
+    media_fadiga = soma_fadiga / total_checks if total_checks > 0 else 0
+    return {
+        "aluno_id": aluno_id,
+        "aluno_nome": aluno_nome,
+        "score_atencao": round(score_atencao, 2),
+        "score_fadiga": round(media_fadiga, 2),
+        "desvios_olhar": soma_desvios,
+        "interrupcoes": soma_interrupcoes,
+        "total_tempo": total_tempo,
+        "total_cliques": total_cliques,
+        "risco_evasao": calcular_risco(score_atencao, media_fadiga, total_cliques, total_tempo,
+                                       soma_desvios, soma_interrupcoes, modelo)
+    }
+
+
+def resultados_ordenados(linhas, modelo=None):
+    """Resultados de montar_resultado para cada linha, por risco decrescente"""
+    modelo = modelo or modelo_atual()
+    resultados = [montar_resultado(*linha, modelo=modelo) for linha in linhas]
+    resultados.sort(key=lambda x: x["risco_evasao"], reverse=True)
+    return resultados
+
+
+def _consulta_agregados(db, aula_id, *extras):
+    return db.query(
+        AgregadoEngajamento.aluno_id,
+        Aluno.nome,
+        AgregadoEngajamento.total_checks,
+        AgregadoEngajamento.checks_na_tela,
+        AgregadoEngajamento.soma_fadiga,
+        AgregadoEngajamento.soma_desvios,
+        AgregadoEngajamento.soma_interrupcoes,
+        AgregadoEngajamento.total_tempo,
+        AgregadoEngajamento.total_cliques,
+        *extras,
+    ).outerjoin(
+        Aluno, Aluno.id == AgregadoEngajamento.aluno_id
+    ).filter(
+        AgregadoEngajamento.aula_id == aula_id
+    )
+
+
+def calcular_analise(db, aula_id, modelo=None):
+    """Análise da turma a partir dos agregados: O(alunos)"""
+    linhas = _consulta_agregados(db, aula_id).order_by(AgregadoEngajamento.aluno_id).all()
+    return resultados_ordenados(linhas, modelo)
+
+
+def ranking_turma(db, aula_id, limite=None, cursor=None, ordenar_por="risco_evasao", min_risco=None,
+                  modelo=None):
+    """
+    Uma página do ranking da aula por `ordenar_por` (ver ORDENACOES), só
+    com alunos de risco >= min_risco: O(limite) pelo índice (aula_id,
+    coluna, aluno_id). Empates seguem a ordem de aluno_id no mesmo sentido
+    da coluna. Levanta CursorInvalidoError para cursores malformados.
+
+    Enquanto a aula tiver riscos gravados por outro modelo (recarga ainda
+    não aplicada por atualizar_rankings), filtro e ordem pelo risco não
+    valem no índice: a página sai da turma inteira recalculada, O(alunos),
+    com o mesmo formato de cursor.
+    """
+    modelo = modelo or modelo_atual()
+    coluna, decrescente = ORDENACOES[ordenar_por]
+
+    consulta = _consulta_agregados(db, aula_id, coluna)
+    if (min_risco is not None or coluna is AgregadoEngajamento.risco_evasao) and \
+            _riscos_desatualizados(db, aula_id, modelo):
+        return _ranking_recalculado(consulta, limite, cursor, ordenar_por, min_risco, modelo)
+    if min_risco is not None:
+        consulta = consulta.filter(AgregadoEngajamento.risco_evasao >= min_risco)
+    pagina = paginar(consulta, [coluna, AgregadoEngajamento.aluno_id], limite, cursor, decrescente=decrescente)
+    return {
+        "alunos": [montar_resultado(*linha[:-1], modelo=modelo) for linha in pagina["itens"]],
+        "proximo_cursor": pagina["proximo_cursor"],
+    }
+
+
+def _riscos_desatualizados(db, aula_id, modelo):
+    return db.query(AgregadoEngajamento.aluno_id).filter(
+        AgregadoEngajamento.aula_id == aula_id,
+        or_(AgregadoEngajamento.modelo_risco.is_(None), AgregadoEngajamento.modelo_risco != modelo.assinatura),
+    ).first() is not None
+
+
+def _ranking_recalculado(consulta, limite, cursor, ordenar_por, min_risco, modelo):
+    """ranking_turma sobre os riscos do modelo atual, sem usar os gravados"""
+    linhas = []
+    for linha in consulta:
+        resultado = montar_resultado(*linha[:-1], modelo=modelo)
+        if min_risco is None or resultado["risco_evasao"] >= min_risco:
+            # score_atencao não depende do modelo: a coluna gravada vale
+            valor = resultado["risco_evasao"] if ordenar_por == "risco_evasao" else linha[-1]
+            linhas.append((valor, resultado))
+    pagina = paginar_lista(linhas, lambda item: (item[0], item[1]["aluno_id"]), limite, cursor,
+                           decrescente=ORDENACOES[ordenar_por][1])
+    return {
+        "alunos": [resultado for _, resultado in pagina["itens"]],
+        "proximo_cursor": pagina["proximo_cursor"],
+    }
+
+
+def atencao_por_aluno(aula_id=None):
+    """
+    Subconsulta com as somas de atenção por (aula, aluno) sobre as
+    amostras brutas, as já compactadas por minuto (metricas_atencao_minuto)
+    e as gravadas como intervalos (intervalos_atencao)
+    """
+    brutas = select(
+        MetricaAtencao.aula_id.label("aula_id"),
+        MetricaAtencao.aluno_id.label("aluno_id"),
+        func.count(MetricaAtencao.id).label("total_checks"),
+        func.sum(case((MetricaAtencao.gaze_na_tela, 1), else_=0)).label("checks_na_tela"),
+        func.sum(MetricaAtencao.fadiga_score).label("soma_fadiga"),
+        func.sum(MetricaAtencao.desvio_olhar).label("soma_desvios"),
+        func.sum(MetricaAtencao.interrupcoes).label("soma_interrupcoes"),
+    ).group_by(MetricaAtencao.aula_id, MetricaAtencao.aluno_id)
+
+    compactadas = select(
+        MetricaAtencaoMinuto.aula_id,
+        MetricaAtencaoMinuto.aluno_id,
+        func.sum(MetricaAtencaoMinuto.total_amostras),
+        func.sum(MetricaAtencaoMinuto.amostras_na_tela),
+        func.sum(MetricaAtencaoMinuto.soma_fadiga),
+        func.sum(MetricaAtencaoMinuto.soma_desvios),
+        func.sum(MetricaAtencaoMinuto.soma_interrupcoes),
+    ).group_by(MetricaAtencaoMinuto.aula_id, MetricaAtencaoMinuto.aluno_id)
+
+    intervalos = select(
+        IntervaloAtencao.aula_id,
+        IntervaloAtencao.aluno_id,
+        func.sum(IntervaloAtencao.total_amostras),
+        func.sum(case((IntervaloAtencao.gaze_na_tela, IntervaloAtencao.total_amostras), else_=0)),
+        func.sum(IntervaloAtencao.soma_fadiga),
+        func.sum(IntervaloAtencao.desvio_olhar * IntervaloAtencao.total_amostras),
+        func.sum(IntervaloAtencao.interrupcoes * IntervaloAtencao.total_amostras),
+    ).group_by(IntervaloAtencao.aula_id, IntervaloAtencao.aluno_id)
+
+    if aula_id is not None:
+        brutas = brutas.where(MetricaAtencao.aula_id == aula_id)
+        compactadas = compactadas.where(MetricaAtencaoMinuto.aula_id == aula_id)
+        intervalos = intervalos.where(IntervaloAtencao.aula_id == aula_id)
+
+    partes = union_all(brutas, compactadas, intervalos).subquery()
+    return select(
+        partes.c.aula_id,
+        partes.c.aluno_id,
+        func.sum(partes.c.total_checks).label("total_checks"),
+        func.coalesce(func.sum(partes.c.checks_na_tela), 0).label("checks_na_tela"),
+        func.coalesce(func.sum(partes.c.soma_fadiga), 0.0).label("soma_fadiga"),
+        func.coalesce(func.sum(partes.c.soma_desvios), 0).label("soma_desvios"),
+        func.coalesce(func.sum(partes.c.soma_interrupcoes), 0).label("soma_interrupcoes"),
+    ).group_by(partes.c.aula_id, partes.c.aluno_id).subquery()
+
+
+def linhas_brutas(db, aula_id):
+    """
+    Somas por aluno sobre as tabelas brutas (e as amostras de atenção
+    compactadas), agregadas no próprio banco (GROUP BY aluno_id + JOIN em
+    alunos), no formato de linha de montar_resultado
+    """
+    atencao = atencao_por_aluno(aula_id)
+
+    interacao = select(
+        SessaoInteracao.aluno_id.label("aluno_id"),
+        func.sum(SessaoInteracao.tempo_permanencia).label("total_tempo"),
+        func.sum(SessaoInteracao.cliques_materiais).label("total_cliques"),
+    ).where(SessaoInteracao.aula_id == aula_id).group_by(SessaoInteracao.aluno_id).subquery()
+
+    ids = union(select(atencao.c.aluno_id), select(interacao.c.aluno_id)).subquery()
+
+    return db.execute(
+        select(
+            ids.c.aluno_id,
+            Aluno.nome,
+            func.coalesce(atencao.c.total_checks, 0),
+            func.coalesce(atencao.c.checks_na_tela, 0),
+            func.coalesce(atencao.c.soma_fadiga, 0.0),
+            func.coalesce(atencao.c.soma_desvios, 0),
+            func.coalesce(atencao.c.soma_interrupcoes, 0),
+            func.coalesce(interacao.c.total_tempo, 0),
+            func.coalesce(interacao.c.total_cliques, 0),
+        ).select_from(ids)
+        .outerjoin(Aluno, Aluno.id == ids.c.aluno_id)
+        .outerjoin(atencao, atencao.c.aluno_id == ids.c.aluno_id)
+        .outerjoin(interacao, interacao.c.aluno_id == ids.c.aluno_id)
+        .order_by(ids.c.aluno_id)
+    ).all()
+
+
+def calcular_analise_bruta(db, aula_id, modelo=None):
+    """Cálculo de referência sobre as tabelas brutas, usado para verificar os agregados"""
+    return resultados_ordenados(linhas_brutas(db, aula_id), modelo)
+
+
+def reconstruir_agregados(db, aula_id=None):
+    """Recalcula os agregados a partir das tabelas brutas e compactadas (backfill)"""
+    filtro_interacao = [SessaoInteracao.aula_id == aula_id] if aula_id is not None else []
+
+    remover = delete(AgregadoEngajamento)
+    if aula_id is not None:
+        remover = remover.where(AgregadoEngajamento.aula_id == aula_id)
+    db.execute(remover)
+
+    atencao = db.execute(select(*atencao_por_aluno(aula_id).c)).all()
+
+    if atencao:
+        _upsert(db, [dict(zip(("aula_id", "aluno_id") + COLUNAS_ATENCAO, linha)) for linha in atencao],
+                COLUNAS_ATENCAO)
+
+    # Tempo e cliques: soma do último valor de cada sessão; snapshot da
+    # sessão atualizada por último
+    sessoes = db.query(
+        SessaoInteracao.aula_id,
+        SessaoInteracao.aluno_id,
+        SessaoInteracao.sessao_chave,
+        SessaoInteracao.tempo_permanencia,
+        SessaoInteracao.cliques_materiais,
+        SessaoInteracao.eventos_player,
+        SessaoInteracao.atualizada_em,
+    ).filter(*filtro_interacao).order_by(SessaoInteracao.atualizada_em, SessaoInteracao.id)
+
+    linhas = {}
+    for aula, aluno, chave, tempo, cliques, eventos, atualizada_em in sessoes:
+        linha = linhas.get((aula, aluno))
+        if linha is None:
+            linha = linhas[(aula, aluno)] = {
+                "aula_id": aula, "aluno_id": aluno, "total_tempo": 0, "total_cliques": 0,
+            }
+        linha["total_tempo"] += tempo or 0
+        linha["total_cliques"] += cliques or 0
+        linha.update({
+            "ultimo_tempo_permanencia": tempo,
+            "ultimos_cliques": cliques,
+            "ultimos_eventos_player": eventos,
+            "ultima_interacao_em": atualizada_em,
+            "sessao_atual": chave,
+        })
+    if linhas:
+        _upsert(db, list(linhas.values()), COLUNAS_INTERACAO, COLUNAS_SNAPSHOT)
+
+    atualizar_ranking(db, aula_id=aula_id)
+
+
+def verificar_agregados(db, aula_id):
+    """Compara os agregados com o cálculo bruto; retorna as divergências"""
+    modelo = modelo_atual()
+    esperado = {r["aluno_id"]: r for r in calcular_analise_bruta(db, aula_id, modelo)}
+    obtido = {r["aluno_id"]: r for r in calcular_analise(db, aula_id, modelo)}
+    divergencias = []
+    for aluno_id in sorted(set(esperado) | set(obtido)):
+        if esperado.get(aluno_id) != obtido.get(aluno_id):
+            divergencias.append({
+                "aluno_id": aluno_id,
+                "esperado": esperado.get(aluno_id),
+                "obtido": obtido.get(aluno_id)
+            })
+
+    # Risco gravado para o ranking (linhas já calculadas pelo modelo atual)
+    gravados = db.query(AgregadoEngajamento.aluno_id, AgregadoEngajamento.risco_evasao).filter(
+        AgregadoEngajamento.aula_id == aula_id, AgregadoEngajamento.modelo_risco == modelo.assinatura)
+    for aluno_id, risco in gravados:
+        if aluno_id in obtido and risco != obtido[aluno_id]["risco_evasao"]:
+            divergencias.append({
+                "aluno_id": aluno_id,
+                "esperado": {"risco_evasao": obtido[aluno_id]["risco_evasao"]},
+                "obtido": {"risco_evasao": risco},
+            })
+    return divergencias
+
+
+def aulas_com_metricas(db, aula_id=None):
+    """Aulas com amostras de atenção ou sessões de interação (ou só aula_id)"""
+    if aula_id is not None:
+        return [aula_id]
+    ids = {a for (a,) in db.query(MetricaAtencao.aula_id).distinct()}
+    ids |= {a for (a,) in db.query(MetricaAtencaoMinuto.aula_id).distinct()}
+    ids |= {a for (a,) in db.query(IntervaloAtencao.aula_id).distinct()}
+    ids |= {a for (a,) in db.query(SessaoInteracao.aula_id).distinct()}
+    return sorted(ids)
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    aula_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    db = SessionLocal()
+    try:
+        if comando == "reconstruir":
+            reconstruir_agregados(db, aula_id)
+            db.commit()
+            print("✅ Agregados reconstruídos")
+        elif comando == "verificar":
+            total = 0
+            for aula in aulas_com_metricas(db, aula_id):
+                divergencias = verificar_agregados(db, aula)
+                total += len(divergencias)
+                for d in divergencias:
+                    print(f"❌ Aula {aula}, aluno {d['aluno_id']}: {d['esperado']} != {d['obtido']}")
+            if total:
+                sys.exit(1)
+            print("✅ Agregados conferem com as tabelas brutas")
+        else:
+            print("Uso: python agregados.py [reconstruir|verificar] [aula_id]")
+            sys.exit(2)
+    finally:
+        db.close()
@@ -0,0 +1,144 @@
+"""
+Avaliação de modelos de risco sobre o histórico
+
+Recalcula o risco de evasão de todos os alunos de todas as aulas a partir
+das tabelas brutas e compactadas (como calcular_analise_bruta) com um ou
+mais modelos (arquivos no formato de modelo_risco) e compara cada modelo
+com o primeiro: distribuição nas faixas do painel do docente, risco médio
+e quantos alunos mudam de faixa. As aulas são distribuídas entre processos
+(ProcessPoolExecutor); cada processo lê as somas de uma aula uma única vez
+e avalia todos os modelos sobre elas.
+
+Uso via linha de comando (a partir de backend/):
+    python avaliacao_risco.py [modelo.json ...] [--processos N] [--aulas 1 2 ...] [--json]
+
+Sem arquivos, avalia o modelo configurado (MODELO_RISCO_ARQUIVO).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from agregados import aulas_com_metricas, linhas_brutas, resultados_ordenados
+from database import SessionLocal, engine
+from modelo_risco import ModeloInvalidoError, ModeloRisco, modelo_atual
+
+# Mesmas faixas do painel do docente
+RISCO_ALTO = 70
+RISCO_MEDIO = 40
+
+_modelos = None  # compilados uma vez por processo
+
+
+def faixa(risco):
+    if risco >= RISCO_ALTO:
+        return "alto"
+    if risco >= RISCO_MEDIO:
+        return "medio"
+    return "baixo"
+
+
+def _iniciar_processo(configuracoes):
+    global _modelos
+    # Conexões herdadas do processo pai (fork) não podem ser reutilizadas
+    engine.dispose(close=False)
+    _modelos = [ModeloRisco.de_configuracao(c) for c in configuracoes]
+
+
+def _avaliar_aula(aula_id):
+    """Totais de cada modelo na aula (listas na ordem dos modelos)"""
+    db = SessionLocal()
+    try:
+        linhas = linhas_brutas(db, aula_id)
+    finally:
+        db.close()
+
+    riscos = [
+        {r["aluno_id"]: r["risco_evasao"] for r in resultados_ordenados(linhas, modelo)}
+        for modelo in _modelos
+    ]
+    referencia = riscos[0]
+    totais = []
+    for por_aluno in riscos:
+        total = {"alunos": len(por_aluno), "soma_risco": 0, "alto": 0, "medio": 0, "baixo": 0,
+                 "mudancas_de_faixa": 0, "soma_diferenca": 0}
+        for aluno_id, risco in por_aluno.items():
+            total["soma_risco"] += risco
+            total[faixa(risco)] += 1
+            if faixa(risco) != faixa(referencia[aluno_id]):
+                total["mudancas_de_faixa"] += 1
+            total["soma_diferenca"] += abs(risco - referencia[aluno_id])
+        totais.append(total)
+    return totais
+
+
+def avaliar_modelos(configuracoes, aulas=None, processos=None):
+    """
+    Avalia os modelos (configurações em dict) sobre as aulas (todas as que
+    têm métricas, se None). Retorna um resumo por modelo.
+    """
+    if aulas is None:
+        db = SessionLocal()
+        try:
+            aulas = aulas_com_metricas(db)
+        finally:
+            db.close()
+
+    processos = processos or os.cpu_count() or 1
+    if processos == 1 or len(aulas) <= 1:
+        _iniciar_processo(configuracoes)
+        por_aula = [_avaliar_aula(aula) for aula in aulas]
+    else:
+        with ProcessPoolExecutor(processos, initializer=_iniciar_processo, initargs=(configuracoes,)) as executor:
+            por_aula = list(executor.map(_avaliar_aula, aulas, chunksize=max(1, len(aulas) // (processos * 4))))
+
+    resumo = []
+    for i, configuracao in enumerate(configuracoes):
+        soma = {}
+        for totais in por_aula:
+            for chave, valor in totais[i].items():
+                soma[chave] = soma.get(chave, 0) + valor
+        alunos = soma.get("alunos", 0)
+        resumo.append({
+            "modelo": configuracao.get("nome", "sem_nome"),
+            "aulas": len(aulas),
+            "alunos_avaliados": alunos,
+            "risco_medio": round(soma["soma_risco"] / alunos, 2) if alunos else 0,
+            "alto": soma.get("alto", 0),
+            "medio": soma.get("medio", 0),
+            "baixo": soma.get("baixo", 0),
+            "mudancas_de_faixa": soma.get("mudancas_de_faixa", 0),
+            "diferenca_media": round(soma["soma_diferenca"] / alunos, 2) if alunos else 0,
+        })
+    return resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara modelos de risco sobre o histórico de métricas")
+    parser.add_argument("modelos", nargs="*", help="arquivos JSON de modelo; o primeiro é a referência")
+    parser.add_argument("--processos", type=int, default=None, help="padrão: número de CPUs")
+    parser.add_argument("--aulas", type=int, nargs="+", default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        modelos = [ModeloRisco.de_arquivo(c) for c in args.modelos] or [modelo_atual()]
+    except (OSError, ModeloInvalidoError) as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    inicio = time.perf_counter()
+    resumo = avaliar_modelos([m.configuracao() for m in modelos], args.aulas, args.processos)
+    duracao = time.perf_counter() - inicio
+
+    if args.json:
+        print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    else:
+        for r in resumo:
+            print(f"📊 {r['modelo']}: {r['alunos_avaliados']} alunos em {r['aulas']} aulas, "
+                  f"risco médio {r['risco_medio']} | alto {r['alto']}, médio {r['medio']}, baixo {r['baixo']} | "
+                  f"{r['mudancas_de_faixa']} mudanças de faixa, diferença média {r['diferenca_media']}")
+        print(f"✅ Avaliação concluída em {duracao:.2f}s")
@@ -0,0 +1,73 @@
+"""
+Cache de resultados em memória (LRU com TTL)
+
+Usado para respostas caras de recalcular e lidas com frequência pelos
+painéis. A invalidação é explícita, por chave, a partir dos pontos de
+escrita. Cada chave tem uma geração: um cálculo que começou antes de uma
+invalidação não grava o resultado, para não devolver dados anteriores à
+escrita.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, tamanho_max, ttl_s, relogio=time.monotonic):
+        self.tamanho_max = tamanho_max
+        self.ttl_s = ttl_s
+        self.relogio = relogio
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._geracoes = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+        self.despejos = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Valor em cache para `chave`, ou calcular() gravado no cache"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                if item[0] > self.relogio():
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return item[1]
+                del self._itens[chave]
+                self.expirados += 1
+            self.falhas += 1
+            geracao = self._geracoes.get(chave, 0)
+
+        valor = calcular()
+
+        with self._lock:
+            if self.tamanho_max > 0 and self._geracoes.get(chave, 0) == geracao:
+                self._itens[chave] = (self.relogio() + self.ttl_s, valor)
+                self._itens.move_to_end(chave)
+                while len(self._itens) > self.tamanho_max:
+                    self._itens.popitem(last=False)
+                    self.despejos += 1
+        return valor
+
+    def invalidar(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+                if self._itens.pop(chave, None) is not None:
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            for chave in self._itens:
+                self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._itens.clear()
+
+    def taxa_acerto(self):
+        consultas = self.acertos + self.falhas
+        return self.acertos / consultas if consultas else 0.0
@@ -1,15 +1,140 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./monitoramento.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./monitoramento.db")
+
+# Modo assíncrono (AsyncSession + aiosqlite) nos endpoints de alta frequência
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "sim")
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Aplicados em cada nova conexão SQLite. WAL permite leituras simultâneas
+# a uma escrita; synchronous=NORMAL só faz fsync no checkpoint do WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),  # negativo = KiB (20 MB)
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def _aplicar_pragmas(pragmas):
+    def ao_conectar(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nome}={valor}")
+        finally:
+            cursor.close()
+    return ao_conectar
+
+
+def _opcoes_engine(url, pragmas, kwargs):
+    em_memoria = url in ("sqlite://", "sqlite:///:memory:")
+
+    if url.startswith("sqlite"):
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+        pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+        if em_memoria:
+            pragmas.pop("journal_mode", None)
+            pragmas.pop("mmap_size", None)
+    else:
+        pragmas = {}
+
+    if not em_memoria:
+        kwargs.setdefault("pool_size", POOL_SIZE)
+        kwargs.setdefault("max_overflow", MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", POOL_TIMEOUT)
+    kwargs.setdefault("pool_pre_ping", not url.startswith("sqlite"))
+    return pragmas, kwargs
+
+
+def criar_engine(url=None, pragmas=None, **kwargs):
+    """
+    Cria o engine da aplicação. Para SQLite aplica SQLITE_PRAGMAS (ou
+    `pragmas`) em cada conexão; `pragmas={}` mantém os padrões do SQLite.
+    """
+    url = url or SQLALCHEMY_DATABASE_URL
+    pragmas, kwargs = _opcoes_engine(url, pragmas, kwargs)
+
+    novo_engine = create_engine(url, **kwargs)
+    if pragmas:
+        event.listen(novo_engine, "connect", _aplicar_pragmas(pragmas))
+    return novo_engine
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def url_async(url):
+    """Troca o driver da URL pelo equivalente assíncrono"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    if url.startswith("postgresql:"):
+        return "postgresql+asyncpg:" + url[len("postgresql:"):]
+    return url
+
+
+def criar_engine_async(url=None, pragmas=None, **kwargs):
+    """Engine assíncrono (requer aiosqlite) com os mesmos pragmas e pool"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    url = url or SQLALCHEMY_DATABASE_URL
+    pragmas, kwargs = _opcoes_engine(url, pragmas, kwargs)
+    if "pool_size" in kwargs:
+        # aiosqlite usa NullPool por padrão; reaproveitar conexões evita
+        # reabrir o arquivo (e reaplicar os pragmas) a cada requisição
+        kwargs.setdefault("poolclass", AsyncAdaptedQueuePool)
+
+    novo_engine = create_async_engine(url_async(url), **kwargs)
+    if pragmas:
+        event.listen(novo_engine.sync_engine, "connect", _aplicar_pragmas(pragmas))
+    return novo_engine
+
+
+def insert_com_conflito(db, modelo):
+    """INSERT com suporte a ON CONFLICT (upsert) para o dialeto da sessão"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(modelo)
+
+
+def travar_escrita(db, *tabelas):
+    """
+    Garante que a transação de `db` detém a escrita antes de ler valores
+    que serão a base de uma atualização (leitura seguida de escrita). No
+    SQLite o driver só abre a transação no primeiro INSERT/UPDATE: uma
+    leitura antes disso vê um snapshot que outro processo ou thread pode
+    alterar antes da nossa escrita. BEGIN IMMEDIATE pega a trava de escrita
+    já na leitura; no PostgreSQL, LOCK TABLE nas `tabelas` faz o mesmo.
+    """
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "sqlite":
+        # depois de um INSERT/UPDATE a transação já detém a escrita
+        if not db.connection().connection.driver_connection.in_transaction:
+            db.execute(text("BEGIN IMMEDIATE"))
+    elif dialeto == "postgresql":
+        for tabela in tabelas:
+            db.execute(text(f"LOCK TABLE {tabela} IN SHARE ROW EXCLUSIVE MODE"))
+
+
+engine = criar_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
 
+    async_engine = criar_engine_async()
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
+Base = declarative_base()
@@ -0,0 +1,188 @@
+"""
+Estado compartilhado entre processos (vários workers)
+
+Com `uvicorn --workers N` ou gunicorn, cada worker tem seus próprios
+caches em memória (mineração, gabaritos). Uma escrita atendida por um
+worker invalida só o cache dele; os outros continuariam servindo o
+resultado antigo até o TTL expirar. Sem depender de um broker externo, o
+próprio banco serve de canal:
+
+- cada invalidação local também é anotada e publicada, a cada
+  ESTADO_COMPARTILHADO_INTERVALO_S, como um incremento da versão da chave
+  em `versoes_compartilhadas` (um único commit por intervalo, fora do
+  caminho das requisições);
+- no mesmo ciclo, cada worker lê as versões alteradas desde a última
+  leitura e descarta do seu cache as chaves que mudaram em outro processo.
+
+Uma escrita em um worker chega aos caches dos outros em até dois
+intervalos. O painel (painel.py) e os agregados já leem do banco e o
+modelo de risco é recarregado pelo mtime do arquivo em cada processo, então
+não precisam disso. As gravações que leem um valor para calcular o próximo
+(os deltas de sessoes.registrar_interacoes) pegam a trava de escrita do
+banco antes da leitura (database.travar_escrita), senão dois workers
+partiriam do mesmo valor.
+
+Ativo quando WEB_CONCURRENCY > 1 (variável lida pelo uvicorn e pelo
+gunicorn para o número de workers) ou com ESTADO_COMPARTILHADO=1.
+
+`trava()` é uma trava de arquivo entre processos da mesma máquina, usada
+para que só um worker aplique as migrações e rode a compactação periódica.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from database import SQLALCHEMY_DATABASE_URL, SessionLocal, insert_com_conflito
+from models import VersaoCompartilhada
+
+try:
+    import fcntl
+except ImportError:  # Windows: um único processo
+    fcntl = None
+
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+ATIVO = os.getenv("ESTADO_COMPARTILHADO", "1" if WORKERS > 1 else "0").lower() in ("1", "true", "sim")
+INTERVALO_S = float(os.getenv("ESTADO_COMPARTILHADO_INTERVALO_S", "1.0"))
+DIRETORIO_TRAVAS = os.getenv("TRAVAS_DIR", tempfile.gettempdir())
+
+# Versões gravadas há mais tempo que isso antes da última leitura não são
+# relidas; cobre o atraso entre o carimbo de hora e o commit de quem publica
+MARGEM_LEITURA = timedelta(seconds=10)
+
+
+@contextmanager
+def trava(nome, url=SQLALCHEMY_DATABASE_URL, bloquear=True):
+    """
+    Trava exclusiva entre processos para `nome` no banco `url`. Com
+    bloquear=False não espera: produz False se outro processo a detém.
+    """
+    if fcntl is None:
+        yield True
+        return
+    sufixo = hashlib.sha1(str(url).encode()).hexdigest()[:12]
+    caminho = os.path.join(DIRETORIO_TRAVAS, f"monitoramento-{sufixo}-{nome}.lock")
+    with open(caminho, "a") as arquivo:
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+class EstadoCompartilhado:
+    def __init__(self, session_factory=SessionLocal, intervalo_s=INTERVALO_S, ativo=ATIVO):
+        self.session_factory = session_factory
+        self.intervalo_s = intervalo_s
+        self.ativo = ativo
+        self._caches = {}  # escopo -> (cache, tipo da chave)
+        self._pendentes = {}  # escopo -> chaves a publicar
+        self._versoes = {}  # (escopo, chave) -> última versão conhecida
+        # versões anteriores ao início do processo não importam: os caches começam vazios
+        self._lido_ate = datetime.now()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._parar = threading.Event()
+        self.publicadas = 0
+        self.invalidacoes_remotas = 0
+
+    def registrar(self, escopo, cache, tipo_chave=int):
+        """Passa a sincronizar o CacheLRU `cache` sob o nome `escopo`"""
+        self._caches[escopo] = (cache, tipo_chave)
+
+    def publicar(self, escopo, chaves):
+        """Anota chaves invalidadas localmente para invalidar nos outros workers"""
+        if not self.ativo:
+            return
+        with self._lock:
+            self._pendentes.setdefault(escopo, set()).update(str(c) for c in chaves)
+
+    def sincronizar(self):
+        """Publica as invalidações pendentes e aplica as dos outros processos"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+
+        db = self.session_factory()
+        try:
+            agora = datetime.now()
+            if pendentes:
+                try:
+                    self._publicar(db, pendentes, agora)
+                except Exception:
+                    db.rollback()
+                    with self._lock:
+                        for escopo, chaves in pendentes.items():
+                            self._pendentes.setdefault(escopo, set()).update(chaves)
+                    raise
+
+            consulta = select(
+                VersaoCompartilhada.escopo, VersaoCompartilhada.chave, VersaoCompartilhada.versao
+            ).where(VersaoCompartilhada.atualizada_em >= self._lido_ate - MARGEM_LEITURA)
+            self._lido_ate = agora
+            alteradas = {}
+            for escopo, chave, versao in db.execute(consulta):
+                if self._versoes.get((escopo, chave)) == versao:
+                    continue
+                self._versoes[(escopo, chave)] = versao
+                if escopo in self._caches:
+                    alteradas.setdefault(escopo, []).append(chave)
+        finally:
+            db.close()
+
+        for escopo, chaves in alteradas.items():
+            cache, tipo_chave = self._caches[escopo]
+            cache.invalidar(*(tipo_chave(c) for c in chaves))
+            self.invalidacoes_remotas += len(chaves)
+
+    def _publicar(self, db, pendentes, agora):
+        stmt = insert_com_conflito(db, VersaoCompartilhada)
+        stmt = stmt.values([
+            {"escopo": escopo, "chave": chave, "versao": 1, "atualizada_em": agora}
+            for escopo, chaves in pendentes.items() for chave in chaves
+        ]).on_conflict_do_update(
+            index_elements=[VersaoCompartilhada.escopo, VersaoCompartilhada.chave],
+            set_={"versao": VersaoCompartilhada.versao + 1, "atualizada_em": agora},
+        ).returning(VersaoCompartilhada.escopo, VersaoCompartilhada.chave, VersaoCompartilhada.versao)
+        publicadas = db.execute(stmt).all()
+        db.commit()
+        # as próprias publicações não invalidam o cache deste processo
+        for escopo, chave, versao in publicadas:
+            self._versoes[(escopo, chave)] = versao
+        self.publicadas += len(publicadas)
+
+    def iniciar(self):
+        if not self.ativo or (self._thread and self._thread.is_alive()):
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="estado-compartilhado", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=5.0):
+        """Publica o que estiver pendente e encerra a thread"""
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _executar(self):
+        while True:
+            parar = self._parar.wait(self.intervalo_s)
+            try:
+                self.sincronizar()
+            except Exception as e:
+                print(f"❌ Erro ao sincronizar o estado compartilhado: {e}")
+            if parar:
+                break
+
+
+estado_compartilhado = EstadoCompartilhado()
@@ -0,0 +1,218 @@
+"""
+Estatísticas por pergunta dos quizzes, mantidas a cada resposta
+
+Cada resposta gravada incrementa, na mesma transação, o contador de
+`estatisticas_quiz` de cada (quiz, pergunta, opção escolhida) e os totais
+do quiz em `resultados_quiz`. A tela do docente lê só esses
+contadores — uma linha por opção distinta de cada pergunta — em vez de
+reler o JSON de todas as respostas.
+
+A opção é a resposta do aluno serializada em JSON (chaves ordenadas), para
+que respostas de qualquer tipo caibam na mesma coluna. Respostas com mais
+de 255 caracteres depois de serializadas são contadas juntas em OUTRAS.
+
+Uso via linha de comando (a partir de backend/):
+    python estatisticas_quiz.py reconstruir [quiz_id]
+    python estatisticas_quiz.py verificar [quiz_id]
+"""
+
+import json
+import math
+import sys
+
+from sqlalchemy import delete, select
+
+from database import SessionLocal, insert_com_conflito
+from models import EstatisticaQuiz, RespostaQuiz, ResultadoQuiz
+
+
+TAMANHO_OPCAO = 255
+OUTRAS = "*"  # nunca é um JSON válido, não colide com uma opção real
+TAMANHO_LOTE = 5000
+
+
+def _opcao(valor):
+    texto = json.dumps(valor, sort_keys=True, ensure_ascii=False)
+    return texto if len(texto) <= TAMANHO_OPCAO else OUTRAS
+
+
+def _contar(linhas):
+    """Contagens por (quiz, pergunta, opção) e totais por quiz de um lote de respostas"""
+    opcoes = {}
+    totais = {}
+    for r in linhas:
+        quiz_id = r["quiz_id"]
+        total = totais.get(quiz_id)
+        if total is None:
+            total = totais[quiz_id] = {"quiz_id": quiz_id, "total_respostas": 0, "soma_pontuacao": 0.0}
+        total["total_respostas"] += 1
+        total["soma_pontuacao"] += r["pontuacao"] or 0
+        for pergunta_id, valor in (r["respostas"] or {}).items():
+            if len(pergunta_id) > TAMANHO_OPCAO:
+                continue  # não existe em nenhum gabarito
+            chave = (quiz_id, pergunta_id, _opcao(valor))
+            opcoes[chave] = opcoes.get(chave, 0) + 1
+    return opcoes, totais
+
+
+def registrar_respostas(db, linhas):
+    """Acumula respostas corrigidas (dicts com as colunas de RespostaQuiz)"""
+    opcoes, totais = _contar(linhas)
+    if not totais:
+        return
+
+    stmt = insert_com_conflito(db, ResultadoQuiz)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ResultadoQuiz.quiz_id],
+        set_={
+            "total_respostas": ResultadoQuiz.total_respostas + stmt.excluded.total_respostas,
+            "soma_pontuacao": ResultadoQuiz.soma_pontuacao + stmt.excluded.soma_pontuacao,
+        }
+    ), list(totais.values()))
+
+    if opcoes:
+        stmt = insert_com_conflito(db, EstatisticaQuiz)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[EstatisticaQuiz.quiz_id, EstatisticaQuiz.pergunta_id, EstatisticaQuiz.opcao],
+            set_={"respostas": EstatisticaQuiz.respostas + stmt.excluded.respostas}
+        ), [
+            {"quiz_id": q, "pergunta_id": p, "opcao": o, "respostas": n}
+            for (q, p, o), n in opcoes.items()
+        ])
+
+
+def calcular_estatisticas(db, gabarito):
+    """
+    Acertos e distribuição das respostas de cada pergunta do quiz. As
+    perguntas seguem a ordem do gabarito; perguntas respondidas que não
+    estão no gabarito vêm no fim. A taxa de acerto é sobre o total de
+    respostas do quiz (pergunta em branco conta como erro, como na nota).
+    """
+    total = db.get(ResultadoQuiz, gabarito.quiz_id)
+    total_respostas = total.total_respostas if total else 0
+    soma_pontuacao = total.soma_pontuacao if total else 0.0
+
+    por_pergunta = {}
+    for pergunta_id, opcao, respostas in db.query(
+        EstatisticaQuiz.pergunta_id, EstatisticaQuiz.opcao, EstatisticaQuiz.respostas
+    ).filter(EstatisticaQuiz.quiz_id == gabarito.quiz_id):
+        por_pergunta.setdefault(pergunta_id, []).append((opcao, respostas))
+
+    extras = sorted(p for p in por_pergunta if p not in gabarito.respostas_certas)
+    perguntas = []
+    for pergunta_id in list(gabarito.respostas_certas) + extras:
+        tem_gabarito = pergunta_id in gabarito.respostas_certas
+        certa = _opcao(gabarito.respostas_certas[pergunta_id]) if tem_gabarito else None
+        distribuicao = []
+        respondidas = acertos = outras = 0
+        for opcao, respostas in por_pergunta.get(pergunta_id, ()):
+            respondidas += respostas
+            if opcao == OUTRAS:
+                outras += respostas
+                continue
+            correta = opcao == certa
+            if correta:
+                acertos += respostas
+            distribuicao.append({"opcao": json.loads(opcao), "respostas": respostas, "correta": correta})
+        distribuicao.sort(key=lambda d: -d["respostas"])
+        perguntas.append({
+            "pergunta_id": pergunta_id,
+            "resposta_certa": gabarito.respostas_certas.get(pergunta_id),
+            "respostas": respondidas,
+            "acertos": acertos,
+            "taxa_acerto": round(acertos / total_respostas * 100, 2) if total_respostas and tem_gabarito else 0,
+            "distribuicao": distribuicao,
+            "outras_respostas": outras,
+        })
+
+    return {
+        "quiz_id": gabarito.quiz_id,
+        "total_respostas": total_respostas,
+        "media_pontuacao": round(soma_pontuacao / total_respostas, 2) if total_respostas else 0,
+        "perguntas": perguntas,
+    }
+
+
+def _respostas(db, quiz_id=None):
+    stmt = select(RespostaQuiz.quiz_id, RespostaQuiz.respostas, RespostaQuiz.pontuacao)
+    if quiz_id is not None:
+        stmt = stmt.where(RespostaQuiz.quiz_id == quiz_id)
+    resultado = db.execute(stmt.execution_options(yield_per=TAMANHO_LOTE))
+    for lote in resultado.mappings().partitions():
+        yield lote
+
+
+def reconstruir_estatisticas(db, quiz_id=None):
+    """Recalcula os contadores a partir de respostas_quiz (backfill)"""
+    for modelo in (EstatisticaQuiz, ResultadoQuiz):
+        remover = delete(modelo)
+        if quiz_id is not None:
+            remover = remover.where(modelo.quiz_id == quiz_id)
+        db.execute(remover)
+
+    for lote in _respostas(db, quiz_id):
+        registrar_respostas(db, [dict(r) for r in lote])
+
+
+def verificar_estatisticas(db, quiz_id):
+    """Compara os contadores do quiz com a recontagem das respostas; retorna as divergências"""
+    opcoes, totais = _contar(r for lote in _respostas(db, quiz_id) for r in lote)
+    esperado = {(p, o): n for (_, p, o), n in opcoes.items()}
+    obtido = {
+        (p, o): n for p, o, n in db.query(
+            EstatisticaQuiz.pergunta_id, EstatisticaQuiz.opcao, EstatisticaQuiz.respostas
+        ).filter(EstatisticaQuiz.quiz_id == quiz_id, EstatisticaQuiz.respostas != 0)
+    }
+    divergencias = [
+        {"chave": chave, "esperado": esperado.get(chave), "obtido": obtido.get(chave)}
+        for chave in sorted(set(esperado) | set(obtido))
+        if esperado.get(chave) != obtido.get(chave)
+    ]
+
+    total = db.get(ResultadoQuiz, quiz_id)
+    esperado_total = totais.get(quiz_id, {"total_respostas": 0, "soma_pontuacao": 0.0})
+    obtido_total = {
+        "total_respostas": total.total_respostas if total else 0,
+        "soma_pontuacao": total.soma_pontuacao if total else 0.0,
+    }
+    # a soma em ponto flutuante depende da ordem dos lotes
+    if (esperado_total["total_respostas"] != obtido_total["total_respostas"]
+            or not math.isclose(esperado_total["soma_pontuacao"], obtido_total["soma_pontuacao"], abs_tol=1e-6)):
+        divergencias.append({"chave": "total", "esperado": esperado_total, "obtido": obtido_total})
+    return divergencias
+
+
+def quizzes_com_respostas(db, quiz_id=None):
+    """Quizzes com respostas gravadas ou contadores (ou só quiz_id)"""
+    if quiz_id is not None:
+        return [quiz_id]
+    ids = {q for (q,) in db.query(RespostaQuiz.quiz_id).distinct()}
+    ids |= {q for (q,) in db.query(ResultadoQuiz.quiz_id)}
+    return sorted(ids)
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    quiz_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    db = SessionLocal()
+    try:
+        if comando == "reconstruir":
+            reconstruir_estatisticas(db, quiz_id)
+            db.commit()
+            print("✅ Estatísticas dos quizzes reconstruídas")
+        elif comando == "verificar":
+            total = 0
+            for quiz in quizzes_com_respostas(db, quiz_id):
+                divergencias = verificar_estatisticas(db, quiz)
+                total += len(divergencias)
+                for d in divergencias:
+                    print(f"❌ Quiz {quiz}, {d['chave']}: {d['esperado']} != {d['obtido']}")
+            if total:
+                sys.exit(1)
+            print("✅ Estatísticas conferem com as respostas gravadas")
+        else:
+            print("Uso: python estatisticas_quiz.py [reconstruir|verificar] [quiz_id]")
+            sys.exit(2)
+    finally:
+        db.close()
@@ -0,0 +1,251 @@
+"""
+Exportação das métricas brutas para análise offline
+
+Lê as linhas em lotes de EXPORTACAO_TAMANHO_LOTE com yield_per (cursor do
+lado do servidor no PostgreSQL, fetchmany no SQLite) e entrega cada lote
+já serializado, então a memória usada não depende do tamanho da tabela.
+Formatos: CSV e, com pyarrow instalado, Parquet (um row group por lote) e
+Arrow IPC (stream). Colunas JSON saem como texto JSON.
+
+Uso via linha de comando (a partir de backend/):
+    python exportacao.py atencao --saida atencao.parquet [--aula 1] [--aluno 2]
+        [--inicio 2025-03-01] [--fim 2025-03-02T12:00] [--formato csv|parquet|arrow]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, select
+
+from database import SessionLocal
+from models import (IntervaloAtencao, Intervencao, LogInteracao, MetricaAtencao, MetricaAtencaoMinuto,
+                    MetricaInteracao, Quiz, RespostaQuiz, SessaoInteracao)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+TAMANHO_LOTE = int(os.getenv("EXPORTACAO_TAMANHO_LOTE", "5000"))
+
+# nome na URL -> (modelo, coluna usada no filtro de período)
+TABELAS = {
+    "atencao": (MetricaAtencao, MetricaAtencao.timestamp),
+    "atencao_minuto": (MetricaAtencaoMinuto, MetricaAtencaoMinuto.minuto),
+    "atencao_intervalos": (IntervaloAtencao, IntervaloAtencao.inicio),
+    "interacao": (MetricaInteracao, MetricaInteracao.timestamp),
+    "sessoes_interacao": (SessaoInteracao, SessaoInteracao.atualizada_em),
+    "logs_interacao": (LogInteracao, LogInteracao.timestamp),
+    "respostas_quiz": (RespostaQuiz, RespostaQuiz.respondido_em),
+    "intervencoes": (Intervencao, Intervencao.timestamp),
+}
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+class ExportacaoInvalidaError(ValueError):
+    """Tabela ou formato de exportação desconhecido ou indisponível"""
+
+
+def _consulta(tabela, aula_id, aluno_id, inicio, fim):
+    modelo, tempo = TABELAS[tabela]
+    colunas = list(modelo.__table__.columns)
+    if modelo is RespostaQuiz:
+        # respostas não têm aula_id; vem do quiz
+        colunas.append(Quiz.aula_id)
+        stmt = select(*colunas).outerjoin(Quiz, Quiz.id == RespostaQuiz.quiz_id)
+        coluna_aula = Quiz.aula_id
+    else:
+        stmt = select(*colunas)
+        coluna_aula = modelo.aula_id
+
+    if aula_id is not None:
+        stmt = stmt.where(coluna_aula == aula_id)
+    if aluno_id is not None:
+        stmt = stmt.where(modelo.aluno_id == aluno_id)
+    if inicio is not None:
+        stmt = stmt.where(tempo >= inicio)
+    if fim is not None:
+        stmt = stmt.where(tempo < fim)
+    return stmt, colunas
+
+
+def _tipo_arrow(coluna):
+    tipo = coluna.type
+    if isinstance(tipo, Boolean):
+        return pa.bool_()
+    if isinstance(tipo, Integer):
+        return pa.int64()
+    if isinstance(tipo, Float):
+        return pa.float64()
+    if isinstance(tipo, DateTime):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+class _Buffer:
+    """Destino de escrita do pyarrow que guarda os bytes até serem consumidos"""
+
+    closed = False
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def consumir(self):
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+class Exportacao:
+    """
+    Iterável de bytes no formato pedido. A sessão do banco é aberta na
+    primeira iteração e fechada ao final (ou se o consumidor desistir).
+    """
+
+    def __init__(self, tabela, formato="csv", aula_id=None, aluno_id=None, inicio=None, fim=None,
+                 tamanho_lote=TAMANHO_LOTE, session_factory=SessionLocal):
+        if tabela not in TABELAS:
+            raise ExportacaoInvalidaError(f"Tabela desconhecida: {tabela} (disponíveis: {', '.join(TABELAS)})")
+        if formato not in FORMATOS:
+            raise ExportacaoInvalidaError(f"Formato desconhecido: {formato} (disponíveis: {', '.join(FORMATOS)})")
+        if formato != "csv" and pa is None:
+            raise ExportacaoInvalidaError(f"Formato {formato} requer o pacote pyarrow")
+        self.tabela = tabela
+        self.formato = formato
+        self.tamanho_lote = tamanho_lote
+        self.session_factory = session_factory
+        self.stmt, self.colunas = _consulta(tabela, aula_id, aluno_id, inicio, fim)
+        self.nomes = [c.name for c in self.colunas]
+        self._json = [isinstance(c.type, JSON) for c in self.colunas]
+        self.linhas = 0
+
+    @property
+    def tipo_conteudo(self):
+        return FORMATOS[self.formato]
+
+    def _lotes(self):
+        db = self.session_factory()
+        try:
+            resultado = db.execute(self.stmt.execution_options(yield_per=self.tamanho_lote))
+            for lote in resultado.partitions():
+                self.linhas += len(lote)
+                yield [
+                    tuple(json.dumps(v, ensure_ascii=False) if j and v is not None else v
+                          for v, j in zip(linha, self._json))
+                    for linha in lote
+                ]
+        finally:
+            db.close()
+
+    def __iter__(self):
+        if self.formato == "csv":
+            return self._csv()
+        return self._arrow()
+
+    def _csv(self):
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(self.nomes)
+        for lote in self._lotes():
+            escritor.writerows(
+                tuple(v.isoformat() if isinstance(v, datetime) else v for v in linha) for linha in lote
+            )
+            yield saida.getvalue().encode("utf-8")
+            saida.seek(0)
+            saida.truncate()
+        if saida.tell():
+            yield saida.getvalue().encode("utf-8")
+
+    def _arrow(self):
+        schema = pa.schema([(c.name, _tipo_arrow(c)) for c in self.colunas])
+        destino = _Buffer()
+        if self.formato == "parquet":
+            escritor = pq.ParquetWriter(destino, schema)
+            gravar = escritor.write_table
+            converter = pa.Table.from_arrays
+        else:
+            escritor = pa.ipc.new_stream(destino, schema)
+            gravar = escritor.write_batch
+            converter = pa.RecordBatch.from_arrays
+
+        try:
+            for lote in self._lotes():
+                colunas = list(zip(*lote))
+                gravar(converter([pa.array(valores, tipo) for valores, tipo in zip(colunas, schema.types)],
+                                 schema=schema))
+                yield destino.consumir()
+        finally:
+            escritor.close()
+        yield destino.consumir()
+
+
+def _data(texto):
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida: {texto} (use AAAA-MM-DD ou AAAA-MM-DDTHH:MM)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta métricas brutas em CSV, Parquet ou Arrow")
+    parser.add_argument("tabela", choices=list(TABELAS))
+    parser.add_argument("--saida", required=True, help="arquivo de destino; - para a saída padrão")
+    parser.add_argument("--formato", choices=list(FORMATOS), help="padrão: extensão do arquivo de saída, ou csv")
+    parser.add_argument("--aula", type=int)
+    parser.add_argument("--aluno", type=int)
+    parser.add_argument("--inicio", type=_data)
+    parser.add_argument("--fim", type=_data)
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE)
+    args = parser.parse_args()
+
+    formato = args.formato or os.path.splitext(args.saida)[1].lstrip(".").lower()
+    if formato not in FORMATOS:
+        formato = "csv"
+
+    try:
+        exportacao = Exportacao(args.tabela, formato, args.aula, args.aluno, args.inicio, args.fim,
+                                args.tamanho_lote)
+    except ExportacaoInvalidaError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+
+    inicio = time.perf_counter()
+    tamanho = 0
+    destino = sys.stdout.buffer if args.saida == "-" else open(args.saida, "wb")
+    try:
+        for parte in exportacao:
+            destino.write(parte)
+            tamanho += len(parte)
+    finally:
+        if destino is not sys.stdout.buffer:
+            destino.close()
+    print(f"✅ {exportacao.linhas} linhas de {args.tabela} exportadas em {formato} "
+          f"({tamanho / 1024:.1f} KB, {time.perf_counter() - inicio:.2f}s)", file=sys.stderr)
@@ -0,0 +1,102 @@
+"""
+Formato binário do lote de métricas (POST /api/metricas/lote/binario)
+
+No JSON de /api/metricas/lote cada amostra de atenção repete os nomes dos
+campos e é validada campo a campo pelo pydantic. No formato binário as
+amostras de atenção têm layout fixo e são decodificadas em bloco com
+struct.iter_unpack; as de interação, de conteúdo variável (eventos do
+player, anotações) e no máximo uma por envio, seguem em JSON no fim do
+corpo e continuam validadas pelo pydantic.
+
+Layout (little-endian):
+
+    cabeçalho  4 bytes   "MA", versão (uint8 = 1), reservado (uint8 = 0)
+               2 bytes   número de amostras de atenção N (uint16)
+    atenção    N x 17    aluno_id (uint32), aula_id (uint32),
+                         fadiga_score (float32), desvio_olhar (uint16),
+                         interrupcoes (uint16), gaze_na_tela (uint8, 0/1)
+    interação  restante  opcional: lista JSON de amostras de interação,
+                         com os campos de /api/metricas/lote
+
+Content-Type: application/octet-stream.
+"""
+
+import math
+import struct
+
+CONTENT_TYPE = "application/octet-stream"
+ASSINATURA = b"MA"
+VERSAO = 1
+
+CABECALHO = struct.Struct("<2sBBH")
+AMOSTRA_ATENCAO = struct.Struct("<IIfHHB")
+MAXIMO_AMOSTRAS = 0xFFFF
+
+
+class LoteInvalidoError(ValueError):
+    pass
+
+
+def decodificar_lote(corpo, timestamp):
+    """
+    Decodifica um lote binário. Retorna (linhas de atenção, no formato de
+    ingestao.linha_atencao, com `timestamp`; bytes JSON das amostras de
+    interação, ou b"" se não houver).
+    """
+    corpo = memoryview(corpo)
+    if len(corpo) < CABECALHO.size:
+        raise LoteInvalidoError("Lote binário sem cabeçalho")
+    assinatura, versao, _, quantidade = CABECALHO.unpack_from(corpo)
+    if assinatura != ASSINATURA:
+        raise LoteInvalidoError("Lote binário com assinatura inválida")
+    if versao != VERSAO:
+        raise LoteInvalidoError(f"Versão do lote binário não suportada: {versao}")
+    fim = CABECALHO.size + quantidade * AMOSTRA_ATENCAO.size
+    if len(corpo) < fim:
+        raise LoteInvalidoError(f"Lote binário truncado: {quantidade} amostras de atenção anunciadas")
+
+    amostras = list(AMOSTRA_ATENCAO.iter_unpack(corpo[CABECALHO.size:fim]))
+    if amostras:
+        # validação em bloco: só os campos que o layout não restringe sozinho
+        _, _, fadigas, _, _, gazes = zip(*amostras)
+        if max(gazes) > 1:
+            raise LoteInvalidoError("gaze_na_tela deve ser 0 ou 1")
+        if not all(map(math.isfinite, fadigas)):
+            raise LoteInvalidoError("fadiga_score deve ser um número finito")
+
+    atencao = [
+        {
+            "aluno_id": aluno_id,
+            "aula_id": aula_id,
+            "gaze_na_tela": gaze == 1,
+            # float32: arredonda para não gravar 0.30000001192092896
+            "fadiga_score": round(fadiga, 6),
+            "desvio_olhar": desvio,
+            "interrupcoes": interrupcoes,
+            "timestamp": timestamp,
+        }
+        for aluno_id, aula_id, fadiga, desvio, interrupcoes, gaze in amostras
+    ]
+
+    interacao = bytes(corpo[fim:]).strip()
+    if not atencao and not interacao:
+        raise LoteInvalidoError("Lote binário vazio")
+    return atencao, interacao
+
+
+def codificar_lote(atencao, interacao=b""):
+    """
+    Codifica amostras de atenção (dicts com os campos de
+    MetricaAtencaoCreate) e a lista JSON de interação já serializada; usado
+    pelo benchmark e como referência para os clientes
+    """
+    if len(atencao) > MAXIMO_AMOSTRAS:
+        raise LoteInvalidoError(f"No máximo {MAXIMO_AMOSTRAS} amostras de atenção por lote")
+    partes = [CABECALHO.pack(ASSINATURA, VERSAO, 0, len(atencao))]
+    partes.extend(
+        AMOSTRA_ATENCAO.pack(m["aluno_id"], m["aula_id"], m["fadiga_score"], m["desvio_olhar"],
+                             m["interrupcoes"], 1 if m["gaze_na_tela"] else 0)
+        for m in atencao
+    )
+    partes.append(interacao)
+    return b"".join(partes)
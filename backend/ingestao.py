@@ -0,0 +1,233 @@
+"""
+Fila de ingestão de métricas com escrita em lote (group commit)
+
+As amostras de atenção e interação enviadas por todos os alunos são
+enfileiradas e gravadas por uma única thread escritora, que junta o que
+chegou em poucos milissegundos em um único INSERT em lote (atenção) e um
+único upsert de sessões (interação), na mesma transação, junto com os
+agregados por aluno (agregados.py), a linha do tempo da turma
+(linha_tempo.py) e as intervenções disparadas pelas regras sobre as
+amostras (intervencoes.py). Com ATENCAO_INTERVALOS=1, as amostras de
+atenção são gravadas como intervalos (intervalos_atencao.py). Respostas de
+quiz já corrigidas entram no mesmo lote, junto com os contadores por
+pergunta (estatisticas_quiz.py). Cada requisição recebe um Future que só
+é concluído depois do commit do lote que contém suas amostras.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from agregados import aplicar_atencao
+from database import SessionLocal
+from estatisticas_quiz import registrar_respostas
+from intervalos_atencao import intervalos_atencao
+from intervencoes import motor_intervencoes
+from linha_tempo import registrar_atencao
+from models import MetricaAtencao, RespostaQuiz
+from sessoes import registrar_interacoes
+
+
+TAMANHO_LOTE = int(os.getenv("INGESTAO_TAMANHO_LOTE", "500"))
+INTERVALO_MS = float(os.getenv("INGESTAO_INTERVALO_MS", "20"))
+CAPACIDADE = int(os.getenv("INGESTAO_CAPACIDADE", "10000"))
+TIMEOUT_ENFILEIRAR = float(os.getenv("INGESTAO_TIMEOUT_ENFILEIRAR", "0.5"))
+
+
+class FilaCheiaError(Exception):
+    """Fila de ingestão sem espaço para novas amostras (backpressure)"""
+
+
+class _Pedido:
+    """Amostras de uma requisição aguardando gravação"""
+
+    __slots__ = ("atencao", "interacao", "respostas_quiz", "future")
+
+    def __init__(self, atencao, interacao, respostas_quiz=()):
+        self.atencao = atencao
+        self.interacao = interacao
+        self.respostas_quiz = respostas_quiz
+        self.future = Future()
+
+    def __len__(self):
+        return len(self.atencao) + len(self.interacao) + len(self.respostas_quiz)
+
+
+class FilaIngestao:
+    """Escritor único que agrupa amostras de vários clientes em um commit"""
+
+    def __init__(self, session_factory=SessionLocal, tamanho_lote=TAMANHO_LOTE,
+                 intervalo_ms=INTERVALO_MS, capacidade=CAPACIDADE):
+        self.session_factory = session_factory
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo_ms / 1000
+        self.capacidade = capacidade
+        self._fila = queue.Queue()
+        self._pendentes = 0
+        self._lock = threading.Lock()
+        self._espaco = threading.Condition(self._lock)
+        self._thread = None
+        self._parar = threading.Event()
+        # Chamadas após cada commit com o conjunto de aula_ids gravados
+        self.ao_gravar = []
+
+    @property
+    def pendentes(self):
+        """Número de amostras enfileiradas e ainda não gravadas"""
+        return self._pendentes
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="fila-ingestao", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=5.0):
+        """Grava o que estiver pendente e encerra a thread escritora"""
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submeter(self, atencao, interacao, respostas_quiz=(), timeout=TIMEOUT_ENFILEIRAR):
+        """
+        Enfileira amostras (listas de dicts com as colunas das tabelas) e
+        retorna um Future concluído com o número de linhas gravadas. Os
+        dicts de respostas_quiz recebem o "id" gerado ao serem gravados.
+        Levanta FilaCheiaError se não houver espaço dentro do timeout.
+        """
+        pedido = _Pedido(atencao, interacao, respostas_quiz)
+        tamanho = len(pedido)
+        if tamanho > self.capacidade:
+            raise FilaCheiaError("Lote maior que a capacidade da fila")
+
+        limite = time.monotonic() + timeout
+        with self._espaco:
+            while self._pendentes + tamanho > self.capacidade:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise FilaCheiaError("Fila de ingestão cheia")
+                self._espaco.wait(restante)
+            self._pendentes += tamanho
+
+        self._fila.put(pedido)
+        return pedido.future
+
+    def _executar(self):
+        while not (self._parar.is_set() and self._fila.empty()):
+            try:
+                primeiro = self._fila.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            pedidos = [primeiro]
+            tamanho = len(primeiro)
+            prazo = time.monotonic() + self.intervalo
+            while tamanho < self.tamanho_lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                tamanho += len(pedido)
+
+            try:
+                self._gravar(pedidos)
+            except Exception as e:
+                # a thread escritora não pode morrer: quem espera os Futures ficaria sem resposta
+                print(f"❌ Erro inesperado ao gravar lote de métricas: {e}")
+                for pedido in pedidos:
+                    if not pedido.future.done():
+                        pedido.future.set_exception(e)
+            finally:
+                with self._espaco:
+                    self._pendentes -= tamanho
+                    self._espaco.notify_all()
+
+    def _gravar(self, pedidos):
+        atencao = [linha for p in pedidos for linha in p.atencao]
+        interacao = [linha for p in pedidos for linha in p.interacao]
+        respostas_quiz = [linha for p in pedidos for linha in p.respostas_quiz]
+
+        abertos = janelas = db = None
+        try:
+            db = self.session_factory()
+            if atencao:
+                if intervalos_atencao.ativo:
+                    abertos = intervalos_atencao.gravar(db, atencao)
+                else:
+                    db.execute(insert(MetricaAtencao), atencao)
+                aplicar_atencao(db, atencao)
+                registrar_atencao(db, atencao)
+            if interacao:
+                registrar_interacoes(db, interacao)
+            if atencao or interacao:
+                janelas = motor_intervencoes.processar(db, atencao, interacao)
+            if respostas_quiz:
+                ids = db.execute(
+                    insert(RespostaQuiz).returning(RespostaQuiz.id, sort_by_parameter_order=True), respostas_quiz
+                ).scalars().all()
+                for linha, id_ in zip(respostas_quiz, ids):
+                    linha["id"] = id_
+                registrar_respostas(db, respostas_quiz)
+            db.commit()
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            for pedido in pedidos:
+                pedido.future.set_exception(e)
+            return
+        finally:
+            if db is not None:
+                db.close()
+        if abertos:
+            intervalos_atencao.confirmar(abertos)
+        if janelas:
+            motor_intervencoes.confirmar(janelas)
+
+        aulas = {linha["aula_id"] for linha in atencao} | {linha["aula_id"] for linha in interacao}
+        for funcao in self.ao_gravar:
+            try:
+                funcao(aulas)
+            except Exception as e:
+                print(f"❌ Erro após gravar lote de métricas: {e}")
+
+        for pedido in pedidos:
+            pedido.future.set_result(len(pedido))
+
+
+def linha_atencao(metrica, timestamp=None):
+    return {
+        "aluno_id": metrica.aluno_id,
+        "aula_id": metrica.aula_id,
+        "gaze_na_tela": metrica.gaze_na_tela,
+        "fadiga_score": metrica.fadiga_score,
+        "desvio_olhar": metrica.desvio_olhar,
+        "interrupcoes": metrica.interrupcoes,
+        "timestamp": timestamp or datetime.now(),
+    }
+
+
+def linha_interacao(metrica, timestamp=None):
+    return {
+        "aluno_id": metrica.aluno_id,
+        "aula_id": metrica.aula_id,
+        "tempo_permanencia": metrica.tempo_permanencia,
+        "eventos_player": metrica.eventos_player,
+        "cliques_materiais": metrica.cliques_materiais,
+        "conteudo_anotacoes": metrica.conteudo_anotacoes,
+        "sessao_chave": metrica.sessao_id,
+        "timestamp": timestamp or datetime.now(),
+    }
+
+
+fila_ingestao = FilaIngestao()
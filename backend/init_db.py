@@ -3,12 +3,13 @@ Script para inicializar o banco de dados com dados de exemplo
 """
 
 from database import engine, SessionLocal
-from models import Base, Aluno, Docente, Aula
+from models import Aluno, Docente, Aula
+from migracoes import aplicar_migracoes
 from datetime import datetime
 
 def init_db():
-    # Criar todas as tabelas
-    Base.metadata.create_all(bind=engine)
+    # Criar tabelas e aplicar migrações pendentes
+    aplicar_migracoes(engine)
     
     db = SessionLocal()
     
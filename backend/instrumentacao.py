@@ -0,0 +1,243 @@
+"""
+Instrumentação do backend: latência por rota, consultas SQL por requisição
+e medidores exportados em /metrics no formato texto do Prometheus
+
+- `MiddlewareInstrumentacao` (ASGI puro) mede cada requisição HTTP e a
+  agrega pelo template da rota (`/api/analise/{aula_id}`), para que a
+  cardinalidade não cresça com os ids;
+- eventos do SQLAlchemy em todos os engines contam consultas, linhas
+  afetadas e tempo de SQL, no total e na requisição corrente (ContextVar,
+  que o threadpool do Starlette propaga para os endpoints síncronos);
+- medidores registrados com `registrar_medidor` (profundidade da fila de
+  ingestão, conexões em uso no pool) são lidos na hora da coleta;
+- com REQUISICAO_LENTA_MS > 0, requisições mais lentas que o limite são
+  registradas com as consultas SQL mais demoradas.
+
+METRICAS_ATIVAS=0 desliga tudo (o middleware vira um repasse).
+"""
+
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+ATIVAS = os.getenv("METRICAS_ATIVAS", "1").lower() in ("1", "true", "sim")
+LENTA_MS = float(os.getenv("REQUISICAO_LENTA_MS", "0"))
+CONSULTAS_LENTAS = 3  # consultas listadas por requisição lenta
+
+# Limites dos buckets dos histogramas, em segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(BUCKETS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class _EstatisticasRequisicao:
+    """Consultas SQL feitas durante uma requisição"""
+
+    __slots__ = ("consultas", "tempo_sql", "linhas", "lentas")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.linhas = 0
+        self.lentas = []  # heap (duração, sql) com as mais demoradas
+
+
+_requisicao_atual = ContextVar("requisicao_atual", default=None)
+
+
+class Registro:
+    """Séries coletadas pelo processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}  # (metodo, rota) -> Histograma
+        self.respostas = {}  # (metodo, rota, status) -> contagem
+        self.sql_por_rota = {}  # (metodo, rota) -> [consultas, segundos, linhas afetadas]
+        self.consultas = {}  # tipo de comando -> [consultas, segundos, linhas]
+        self.medidores = {}  # nome -> (ajuda, funcao, tipo)
+
+    def registrar_requisicao(self, metodo, rota, status, duracao, estatisticas):
+        chave = (metodo, rota)
+        with self._lock:
+            histograma = self.latencias.get(chave)
+            if histograma is None:
+                histograma = self.latencias[chave] = Histograma()
+            histograma.observar(duracao)
+            chave_status = (metodo, rota, status)
+            self.respostas[chave_status] = self.respostas.get(chave_status, 0) + 1
+            sql = self.sql_por_rota.setdefault(chave, [0, 0.0, 0])
+            sql[0] += estatisticas.consultas
+            sql[1] += estatisticas.tempo_sql
+            sql[2] += estatisticas.linhas
+
+    def registrar_consulta(self, tipo, duracao, linhas):
+        with self._lock:
+            total = self.consultas.get(tipo)
+            if total is None:
+                total = self.consultas[tipo] = [0, 0.0, 0]
+            total[0] += 1
+            total[1] += duracao
+            total[2] += linhas
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            latencias = {k: (list(h.contagens), h.soma, h.total) for k, h in self.latencias.items()}
+            respostas = dict(self.respostas)
+            sql_por_rota = {k: list(v) for k, v in self.sql_por_rota.items()}
+            consultas = {k: list(v) for k, v in self.consultas.items()}
+
+        linhas = [
+            "# HELP http_requisicoes_total Requisições HTTP atendidas",
+            "# TYPE http_requisicoes_total counter",
+        ]
+        for (metodo, rota, status), total in sorted(respostas.items()):
+            linhas.append(f'http_requisicoes_total{{metodo="{metodo}",rota="{rota}",status="{status}"}} {total}')
+
+        linhas += [
+            "# HELP http_requisicao_duracao_segundos Latência das requisições HTTP",
+            "# TYPE http_requisicao_duracao_segundos histogram",
+        ]
+        for (metodo, rota), (contagens, soma, total) in sorted(latencias.items()):
+            rotulos = f'metodo="{metodo}",rota="{rota}"'
+            acumulado = 0
+            for limite, contagem in zip(BUCKETS, contagens):
+                acumulado += contagem
+                linhas.append(f'http_requisicao_duracao_segundos_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f'http_requisicao_duracao_segundos_bucket{{{rotulos},le="+Inf"}} {total}')
+            linhas.append(f"http_requisicao_duracao_segundos_sum{{{rotulos}}} {soma:.6f}")
+            linhas.append(f"http_requisicao_duracao_segundos_count{{{rotulos}}} {total}")
+
+        for nome, indice, ajuda in (
+            ("http_requisicao_consultas_sql_total", 0, "Consultas SQL feitas pelas requisições de cada rota"),
+            ("http_requisicao_sql_segundos_total", 1, "Tempo em SQL das requisições de cada rota"),
+            ("http_requisicao_linhas_afetadas_total", 2, "Linhas afetadas pelos comandos SQL das requisições de cada rota"),
+        ):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+            for (metodo, rota), valores in sorted(sql_por_rota.items()):
+                valor = f"{valores[indice]:.6f}" if indice == 1 else valores[indice]
+                linhas.append(f'{nome}{{metodo="{metodo}",rota="{rota}"}} {valor}')
+
+        for nome, indice, ajuda in (
+            ("db_consultas_total", 0, "Comandos SQL executados, por tipo"),
+            ("db_consultas_segundos_total", 1, "Tempo gasto nos comandos SQL, por tipo"),
+            ("db_linhas_afetadas_total", 2, "Linhas afetadas por INSERT/UPDATE/DELETE, por tipo"),
+        ):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+            for tipo, valores in sorted(consultas.items()):
+                valor = f"{valores[indice]:.6f}" if indice == 1 else valores[indice]
+                linhas.append(f'{nome}{{tipo="{tipo}"}} {valor}')
+
+        for nome, (ajuda, funcao, tipo) in sorted(self.medidores.items()):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}", f"{nome} {funcao()}"]
+
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+
+def registrar_medidor(nome, ajuda, funcao, tipo="gauge"):
+    """
+    Valor lido no momento da coleta, ex.: profundidade de uma fila (gauge)
+    ou contador mantido por outro módulo (tipo="counter")
+    """
+    registro.medidores[nome] = (ajuda, funcao, tipo)
+
+
+def _tipo_comando(sql):
+    comando = sql.lstrip()[:6].lower()
+    return comando if comando in ("select", "insert", "update", "delete") else "outro"
+
+
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("instrumentacao_inicio", []).append(time.perf_counter())
+
+
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info["instrumentacao_inicio"].pop()
+    linhas = max(cursor.rowcount, 0)
+    registro.registrar_consulta(_tipo_comando(statement), duracao, linhas)
+
+    estatisticas = _requisicao_atual.get()
+    if estatisticas is not None:
+        estatisticas.consultas += 1
+        estatisticas.tempo_sql += duracao
+        estatisticas.linhas += linhas
+        if LENTA_MS > 0:
+            item = (duracao, statement)
+            if len(estatisticas.lentas) < CONSULTAS_LENTAS:
+                heapq.heappush(estatisticas.lentas, item)
+            elif item > estatisticas.lentas[0]:
+                heapq.heapreplace(estatisticas.lentas, item)
+
+
+def _erro_ao_executar(contexto):
+    conexao = contexto.connection
+    if conexao is not None and conexao.info.get("instrumentacao_inicio"):
+        conexao.info["instrumentacao_inicio"].pop()
+
+
+def _registrar_lenta(metodo, caminho, duracao, estatisticas):
+    print(f"⚠️  Requisição lenta: {metodo} {caminho} {duracao * 1000:.0f} ms, "
+          f"{estatisticas.consultas} consultas SQL ({estatisticas.tempo_sql * 1000:.0f} ms)")
+    for tempo, sql in sorted(estatisticas.lentas, reverse=True):
+        print(f"    {tempo * 1000:.1f} ms  {' '.join(sql.split())[:500]}")
+
+
+class MiddlewareInstrumentacao:
+    """Middleware ASGI que mede as requisições HTTP"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ATIVAS or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estatisticas = _EstatisticasRequisicao()
+        token = _requisicao_atual.set(estatisticas)
+        status = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            _requisicao_atual.reset(token)
+            rota = scope.get("route")
+            rota = rota.path if rota is not None else "desconhecida"
+            registro.registrar_requisicao(scope["method"], rota, status[0], duracao, estatisticas)
+            if LENTA_MS > 0 and duracao * 1000 >= LENTA_MS:
+                _registrar_lenta(scope["method"], scope["path"], duracao, estatisticas)
+
+
+if ATIVAS:
+    event.listen(Engine, "before_cursor_execute", _antes_de_executar)
+    event.listen(Engine, "after_cursor_execute", _depois_de_executar)
+    event.listen(Engine, "handle_error", _erro_ao_executar)
@@ -0,0 +1,287 @@
+"""
+Amostras de atenção gravadas como intervalos (run-length)
+
+A maioria das amostras consecutivas de um aluno é igual à anterior: mesmo
+gaze_na_tela, desvio_olhar e interrupcoes, fadiga variando pouco. Com
+ATENCAO_INTERVALOS=1, a fila de ingestão grava as amostras em
+`intervalos_atencao`: uma amostra no mesmo estado do intervalo aberto do
+aluno, com fadiga a até ATENCAO_TOLERANCIA_FADIGA da primeira do intervalo
+e chegando até ATENCAO_LACUNA_MAXIMA_S depois da anterior, só estende o
+intervalo (fim, total_amostras, soma_fadiga); qualquer mudança abre outro.
+
+Contagens e somas continuam exatas, então a análise da turma e a
+mineração (agregados.atencao_por_aluno, que soma amostras brutas,
+compactadas e intervalos) dão o mesmo resultado. Só a fadiga de cada
+amostra se perde; amostras_reconstruidas() devolve as amostras de um
+intervalo com a fadiga média, igualmente espaçadas no tempo.
+
+A fila de ingestão e o endpoint de amostra única (POST
+/api/metricas/atencao) gravam pelo mesmo IntervalosAtencao. O intervalo
+aberto de cada (aula, aluno) fica em memória como cache; sem ele (aluno
+novo, reinício) o último intervalo do aluno é lido do banco, e com vários
+workers (estado_compartilhado.ATIVO) é lido do banco a cada lote, porque
+outro worker pode tê-lo estendido ou substituído. Duas gravações
+simultâneas do mesmo aluno podem abrir intervalos sobrepostos; contagens
+e somas continuam exatas.
+
+Uso via linha de comando (a partir de backend/):
+    python intervalos_atencao.py converter [aula_id]   # amostras brutas -> intervalos
+    python intervalos_atencao.py status
+"""
+
+import os
+import sys
+import threading
+from datetime import timedelta
+
+from sqlalchemy import and_, bindparam, case, func, insert, select, tuple_, update
+
+from database import SessionLocal
+from estado_compartilhado import ATIVO as COMPARTILHADO
+from models import IntervaloAtencao, MetricaAtencao
+
+
+ATIVO = os.getenv("ATENCAO_INTERVALOS", "0").lower() in ("1", "true", "sim")
+TOLERANCIA_FADIGA = float(os.getenv("ATENCAO_TOLERANCIA_FADIGA", "0.05"))
+LACUNA_MAXIMA_S = float(os.getenv("ATENCAO_LACUNA_MAXIMA_S", "10"))
+TAMANHO_LOTE = 5000
+LOTE_CHAVES = 500
+
+
+class _Aberto:
+    """Último intervalo de um (aula, aluno), que as próximas amostras podem estender"""
+
+    __slots__ = ("id", "estado", "fadiga_inicial", "fim", "linha")
+
+    def __init__(self, estado, fadiga_inicial, fim, id_=None, linha=None):
+        self.id = id_
+        self.estado = estado
+        self.fadiga_inicial = fadiga_inicial
+        self.fim = fim
+        self.linha = linha  # dict do INSERT enquanto o intervalo não foi gravado
+
+
+class IntervalosAtencao:
+    def __init__(self, tolerancia=TOLERANCIA_FADIGA, lacuna_s=LACUNA_MAXIMA_S, ativo=ATIVO,
+                 compartilhado=COMPARTILHADO):
+        self.ativo = ativo
+        self.compartilhado = compartilhado
+        self.tolerancia = tolerancia
+        self.lacuna = timedelta(seconds=lacuna_s)
+        self._abertos = {}  # (aula_id, aluno_id) -> _Aberto
+        self._limite_poda = 1024
+        self._lock = threading.Lock()
+        self.amostras = 0
+        self.intervalos_criados = 0
+
+    def _estende(self, aberto, estado, fadiga, momento):
+        return (aberto is not None and aberto.estado == estado
+                and aberto.fim <= momento <= aberto.fim + self.lacuna
+                and abs(fadiga - aberto.fadiga_inicial) <= self.tolerancia)
+
+    def _carregar(self, db, chaves):
+        """Último intervalo gravado de cada (aula, aluno) em `chaves`"""
+        tabela = IntervaloAtencao.__table__
+        carregados = {}
+        chaves = list(chaves)
+        for i in range(0, len(chaves), LOTE_CHAVES):
+            ultimos = (
+                select(tabela.c.aula_id, tabela.c.aluno_id, func.max(tabela.c.inicio).label("inicio"))
+                .where(tuple_(tabela.c.aula_id, tabela.c.aluno_id).in_(chaves[i:i + LOTE_CHAVES]))
+                .group_by(tabela.c.aula_id, tabela.c.aluno_id)
+                .subquery()
+            )
+            linhas = db.execute(
+                select(tabela).join(ultimos, and_(
+                    tabela.c.aula_id == ultimos.c.aula_id,
+                    tabela.c.aluno_id == ultimos.c.aluno_id,
+                    tabela.c.inicio == ultimos.c.inicio,
+                )).order_by(tabela.c.id)
+            )
+            for linha in linhas:
+                # intervalos antigos não têm fadiga_inicial: a média é a melhor referência
+                fadiga = linha.fadiga_inicial
+                if fadiga is None:
+                    fadiga = linha.soma_fadiga / linha.total_amostras if linha.total_amostras else 0.0
+                estado = (bool(linha.gaze_na_tela), linha.desvio_olhar, linha.interrupcoes)
+                carregados[(linha.aula_id, linha.aluno_id)] = _Aberto(estado, fadiga, linha.fim, id_=linha.id)
+        return carregados
+
+    def gravar(self, db, metricas, ids=None):
+        """
+        Grava amostras (dicts com as colunas de MetricaAtencao, na ordem de
+        chegada) estendendo ou abrindo intervalos. Retorna os intervalos
+        abertos, a passar para confirmar() depois do commit. Se `ids` for
+        uma lista, recebe o id do intervalo de cada amostra.
+        """
+        chaves = {(m["aula_id"], m["aluno_id"]) for m in metricas}
+        with self._lock:
+            if self.compartilhado:
+                conhecidos = {}
+            else:
+                conhecidos = {c: self._abertos[c] for c in chaves if c in self._abertos}
+        faltando = chaves - conhecidos.keys()
+        if faltando:
+            conhecidos.update(self._carregar(db, faltando))
+
+        abertos = {}
+        novos = []
+        extensoes = {}
+        destinos = []  # por amostra: id do intervalo estendido ou linha do INSERT
+        for m in metricas:
+            chave = (m["aula_id"], m["aluno_id"])
+            estado = (bool(m["gaze_na_tela"]), m["desvio_olhar"], m["interrupcoes"])
+            fadiga, momento = m["fadiga_score"], m["timestamp"]
+            aberto = abertos.get(chave) or conhecidos.get(chave)
+
+            if self._estende(aberto, estado, fadiga, momento):
+                if aberto.linha is not None:
+                    aberto.linha["fim"] = momento
+                    aberto.linha["total_amostras"] += 1
+                    aberto.linha["soma_fadiga"] += fadiga
+                    aberto.fim = momento
+                    destinos.append(aberto.linha)
+                else:
+                    e = extensoes.get(aberto.id)
+                    if e is None:
+                        e = extensoes[aberto.id] = {"b_id": aberto.id, "b_amostras": 0, "b_fadiga": 0.0}
+                    e["b_fim"] = momento
+                    e["b_amostras"] += 1
+                    e["b_fadiga"] += fadiga
+                    # os intervalos confirmados só mudam em confirmar()
+                    abertos[chave] = _Aberto(estado, aberto.fadiga_inicial, momento, id_=aberto.id)
+                    destinos.append(aberto.id)
+                continue
+
+            linha = {
+                "aula_id": chave[0], "aluno_id": chave[1], "inicio": momento, "fim": momento,
+                "gaze_na_tela": estado[0], "desvio_olhar": estado[1], "interrupcoes": estado[2],
+                "total_amostras": 1, "soma_fadiga": fadiga, "fadiga_inicial": fadiga,
+            }
+            novos.append(linha)
+            destinos.append(linha)
+            # uma amostra atrasada fica em um intervalo próprio, sem fechar o aberto
+            if aberto is None or momento >= aberto.fim:
+                abertos[chave] = _Aberto(estado, fadiga, momento, linha=linha)
+
+        if novos:
+            inseridos = db.execute(
+                insert(IntervaloAtencao).returning(IntervaloAtencao.id, sort_by_parameter_order=True), novos
+            ).scalars().all()
+            for linha, id_ in zip(novos, inseridos):
+                linha["id"] = id_
+        if extensoes:
+            tabela = IntervaloAtencao.__table__
+            # outro worker pode ter estendido o mesmo intervalo com amostras mais novas
+            db.execute(update(tabela).where(tabela.c.id == bindparam("b_id")).values(
+                fim=case((tabela.c.fim < bindparam("b_fim"), bindparam("b_fim")), else_=tabela.c.fim),
+                total_amostras=tabela.c.total_amostras + bindparam("b_amostras"),
+                soma_fadiga=tabela.c.soma_fadiga + bindparam("b_fadiga"),
+            ), list(extensoes.values()))
+
+        if ids is not None:
+            ids.extend(d if isinstance(d, int) else d["id"] for d in destinos)
+        for aberto in abertos.values():
+            if aberto.linha is not None:
+                aberto.id, aberto.linha = aberto.linha["id"], None
+        with self._lock:
+            self.amostras += len(metricas)
+            self.intervalos_criados += len(novos)
+        return abertos
+
+    def confirmar(self, abertos):
+        """Passa a estender os intervalos gravados por gravar() (chamar após o commit)"""
+        with self._lock:
+            for chave, aberto in abertos.items():
+                # a fila e o endpoint de amostra única gravam em threads diferentes
+                atual = self._abertos.get(chave)
+                if atual is None or aberto.fim >= atual.fim:
+                    self._abertos[chave] = aberto
+            if len(self._abertos) > self._limite_poda:
+                # intervalos sem amostras há mais que a lacuna não serão mais estendidos
+                recente = max(a.fim for a in self._abertos.values())
+                self._abertos = {c: a for c, a in self._abertos.items() if a.fim + self.lacuna >= recente}
+                self._limite_poda = max(1024, 2 * len(self._abertos))
+
+
+def amostras_reconstruidas(intervalo):
+    """
+    Amostras equivalentes a um intervalo (objeto ou linha com as colunas de
+    IntervaloAtencao): total_amostras amostras igualmente espaçadas entre
+    inicio e fim, com a fadiga média
+    """
+    n = intervalo.total_amostras
+    passo = (intervalo.fim - intervalo.inicio) / (n - 1) if n > 1 else timedelta(0)
+    media = intervalo.soma_fadiga / n if n else 0.0
+    for k in range(n):
+        yield {
+            "aula_id": intervalo.aula_id,
+            "aluno_id": intervalo.aluno_id,
+            "gaze_na_tela": intervalo.gaze_na_tela,
+            "fadiga_score": media,
+            "desvio_olhar": intervalo.desvio_olhar,
+            "interrupcoes": intervalo.interrupcoes,
+            "timestamp": intervalo.inicio + passo * k,
+        }
+
+
+def converter_amostras(db, aula_id=None, tolerancia=TOLERANCIA_FADIGA, lacuna_s=LACUNA_MAXIMA_S):
+    """
+    Regrava as amostras brutas como intervalos e as remove, com um commit
+    por aula. Os agregados e a linha do tempo não mudam. Retorna
+    (amostras convertidas, intervalos gravados).
+    """
+    aulas = [aula_id] if aula_id is not None else [
+        a for (a,) in db.query(MetricaAtencao.aula_id).distinct()]
+    total_amostras = total_intervalos = 0
+    for aula in aulas:
+        intervalos = IntervalosAtencao(tolerancia, lacuna_s, ativo=True, compartilhado=False)
+        colunas = [c for c in MetricaAtencao.__table__.columns if c.key != "id"]
+        resultado = db.execute(
+            select(*colunas).where(MetricaAtencao.aula_id == aula)
+            .order_by(MetricaAtencao.aluno_id, MetricaAtencao.timestamp, MetricaAtencao.id)
+            .execution_options(yield_per=TAMANHO_LOTE)
+        )
+        try:
+            for lote in resultado.mappings().partitions():
+                intervalos.confirmar(intervalos.gravar(db, lote))
+            db.query(MetricaAtencao).filter(MetricaAtencao.aula_id == aula).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        total_amostras += intervalos.amostras
+        total_intervalos += intervalos.intervalos_criados
+    return total_amostras, total_intervalos
+
+
+def _status(db):
+    brutas = db.query(func.count(MetricaAtencao.id)).scalar()
+    linhas, amostras = db.query(func.count(IntervaloAtencao.id), func.sum(IntervaloAtencao.total_amostras)).one()
+    print(f"metricas_atencao:   {brutas} amostras")
+    print(f"intervalos_atencao: {linhas} intervalos ({amostras or 0} amostras, "
+          f"{(amostras or 0) / linhas if linhas else 0:.1f} por intervalo)")
+
+
+intervalos_atencao = IntervalosAtencao()
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "status"
+    aula_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    from migracoes import aplicar_migracoes
+    aplicar_migracoes()
+
+    db = SessionLocal()
+    try:
+        if comando == "converter":
+            amostras, intervalos = converter_amostras(db, aula_id)
+            print(f"✅ {amostras} amostras convertidas em {intervalos} intervalos")
+        elif comando == "status":
+            _status(db)
+        else:
+            print("Uso: python intervalos_atencao.py [converter|status] [aula_id]")
+            sys.exit(2)
+    finally:
+        db.close()
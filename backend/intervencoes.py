@@ -0,0 +1,305 @@
+"""
+Motor de intervenções adaptativas no servidor
+
+As regras que o StudentView aplicava a cada quadro da câmera (atenção
+desviada, fadiga acima de 0.7, pouca interação) passam a ser avaliadas no
+backend, sobre as amostras que chegam pela ingestão, na mesma transação
+em que são gravadas. As intervenções disparadas ficam em `intervencoes`,
+lidas pelo aluno e pelo painel do docente em GET /api/intervencoes/{aula_id}.
+
+Para cada (aula, aluno), uma janela deslizante com as últimas
+INTERVENCOES_JANELA_AMOSTRAS amostras de atenção (15 = 30 s na cadência de
+2 s) fica em um buffer circular compacto: um byte por amostra para o olhar
+fora da tela e dois para a fadiga em milésimos, com somas correntes, então
+cada amostra custa O(1) e a memória é fixa por aluno. Regras:
+
+- attention: pelo menos INTERVENCOES_LIMITE_DESATENCAO das amostras da
+  janela com o olhar fora da tela;
+- fatigue: fadiga média da janela acima de INTERVENCOES_LIMITE_FADIGA;
+- interaction: amostra de interação com mais de INTERVENCOES_INTERACAO_APOS_S
+  segundos de sessão e menos de 2 cliques e eventos do player.
+
+As regras da janela só valem com INTERVENCOES_MINIMO_AMOSTRAS amostras; uma
+lacuna maior que INTERVENCOES_LACUNA_MAXIMA_S entre amostras (o aluno saiu
+e voltou) esvazia a janela. Cada tipo de intervenção respeita um intervalo
+mínimo de INTERVENCOES_COOLDOWN_S por aluno, no tempo das amostras. Janelas
+sem amostras há INTERVENCOES_INATIVIDADE_S são descartadas.
+
+processar() avalia cópias das janelas dos alunos do lote, que só
+substituem as da memória em confirmar(), depois do commit: uma falha no
+commit descarta as amostras, as intervenções e os cooldowns juntos. Com
+vários workers (estado_compartilhado.ATIVO) as amostras de um aluno se
+dividem entre processos, então a janela e os cooldowns de cada aluno do
+lote são lidos de `janelas_intervencao` e gravados de volta na mesma
+transação, com a trava de escrita do banco (database.travar_escrita)
+tomada antes da leitura: dois workers com amostras do mesmo aluno avaliam
+uma depois da outra, e a segunda vê os cooldowns da primeira em vez de
+disparar a mesma intervenção de novo. O upsert também não substitui uma
+janela por outra com amostras mais antigas. Em um único worker ficam só
+em memória e, depois de um reinício, a janela recomeça vazia.
+"""
+
+import os
+import threading
+from array import array
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, tuple_
+
+from database import insert_com_conflito, travar_escrita
+from estado_compartilhado import ATIVO as COMPARTILHADO
+from models import Intervencao, JanelaIntervencao
+
+
+ATIVO = os.getenv("INTERVENCOES_ATIVAS", "1").lower() in ("1", "true", "sim")
+JANELA_AMOSTRAS = int(os.getenv("INTERVENCOES_JANELA_AMOSTRAS", "15"))
+MINIMO_AMOSTRAS = int(os.getenv("INTERVENCOES_MINIMO_AMOSTRAS", "5"))
+LIMITE_DESATENCAO = float(os.getenv("INTERVENCOES_LIMITE_DESATENCAO", "0.5"))
+LIMITE_FADIGA = float(os.getenv("INTERVENCOES_LIMITE_FADIGA", "0.7"))
+INTERACAO_APOS_S = int(os.getenv("INTERVENCOES_INTERACAO_APOS_S", "120"))
+MINIMO_INTERACOES = 2
+COOLDOWN_S = float(os.getenv("INTERVENCOES_COOLDOWN_S", "30"))
+LACUNA_MAXIMA_S = float(os.getenv("INTERVENCOES_LACUNA_MAXIMA_S", "30"))
+INATIVIDADE_S = float(os.getenv("INTERVENCOES_INATIVIDADE_S", "300"))
+
+# tipos com os mesmos nomes e mensagens que o StudentView usava
+MENSAGENS = {
+    "attention": "Detectamos que sua atenção desviou. Mantenha o foco na tela.",
+    "fatigue": "Você parece cansado. Recomendamos uma pausa de 2 minutos.",
+    "interaction": "Você não está interagindo com o material. Que tal fazer algumas anotações?",
+}
+
+_INICIO = datetime.min
+LOTE_CHAVES = 500
+
+
+class _Janela:
+    """Últimas amostras de atenção de um (aula, aluno) e os cooldowns dele"""
+
+    __slots__ = ("fora", "fadiga", "posicao", "tamanho", "soma_fora", "soma_fadiga", "ultima", "liberado")
+
+    def __init__(self, capacidade):
+        self.fora = bytearray(capacidade)  # 1 = olhar fora da tela
+        self.fadiga = array("H", bytes(2 * capacidade))  # fadiga em milésimos
+        self.posicao = 0
+        self.tamanho = 0
+        self.soma_fora = 0
+        self.soma_fadiga = 0
+        self.ultima = _INICIO
+        self.liberado = None  # tipo -> momento a partir do qual pode disparar de novo
+
+    def limpar(self):
+        self.posicao = self.tamanho = self.soma_fora = self.soma_fadiga = 0
+
+    def copia(self):
+        janela = _Janela.__new__(_Janela)
+        janela.fora = bytearray(self.fora)
+        janela.fadiga = array("H", self.fadiga)
+        janela.posicao = self.posicao
+        janela.tamanho = self.tamanho
+        janela.soma_fora = self.soma_fora
+        janela.soma_fadiga = self.soma_fadiga
+        janela.ultima = self.ultima
+        janela.liberado = dict(self.liberado) if self.liberado is not None else None
+        return janela
+
+    @classmethod
+    def da_linha(cls, linha, capacidade):
+        """Janela gravada em janelas_intervencao; vazia se a capacidade mudou"""
+        janela = cls(capacidade)
+        if len(linha.fora) == capacidade and len(linha.fadiga) == 2 * capacidade:
+            janela.fora[:] = linha.fora
+            janela.fadiga = array("H", linha.fadiga)
+            janela.posicao = linha.posicao
+            janela.tamanho = linha.tamanho
+            janela.soma_fora = sum(janela.fora)
+            janela.soma_fadiga = sum(janela.fadiga)
+            janela.ultima = linha.ultima
+        liberado = {tipo: getattr(linha, f"liberado_{tipo}") for tipo in MENSAGENS}
+        janela.liberado = {tipo: momento for tipo, momento in liberado.items() if momento is not None} or None
+        return janela
+
+    def linha(self, chave):
+        liberado = self.liberado or {}
+        return {
+            "aula_id": chave[0], "aluno_id": chave[1], "fora": bytes(self.fora), "fadiga": self.fadiga.tobytes(),
+            "posicao": self.posicao, "tamanho": self.tamanho, "ultima": self.ultima,
+            **{f"liberado_{tipo}": liberado.get(tipo) for tipo in MENSAGENS},
+        }
+
+
+class MotorIntervencoes:
+    def __init__(self, janela=JANELA_AMOSTRAS, minimo=MINIMO_AMOSTRAS, limite_desatencao=LIMITE_DESATENCAO,
+                 limite_fadiga=LIMITE_FADIGA, interacao_apos_s=INTERACAO_APOS_S, cooldown_s=COOLDOWN_S,
+                 lacuna_s=LACUNA_MAXIMA_S, inatividade_s=INATIVIDADE_S, ativo=ATIVO,
+                 compartilhado=COMPARTILHADO):
+        self.ativo = ativo
+        self.compartilhado = compartilhado
+        self.capacidade = janela
+        self.minimo = min(minimo, janela)
+        self.limite_desatencao = limite_desatencao
+        # comparado com a soma em milésimos da janela
+        self.limite_fadiga = limite_fadiga * 1000
+        self.interacao_apos_s = interacao_apos_s
+        self.cooldown = timedelta(seconds=cooldown_s)
+        self.lacuna = timedelta(seconds=lacuna_s)
+        self.inatividade = timedelta(seconds=inatividade_s)
+        self._janelas = {}  # (aula_id, aluno_id) -> _Janela
+        self._limite_poda = 1024
+        self._lock = threading.Lock()
+        self.amostras = 0
+        self.disparadas = 0
+        self.suprimidas = 0
+
+    def __len__(self):
+        return len(self._janelas)
+
+    def avaliar(self, atencao=(), interacao=()):
+        """
+        Passa amostras (dicts com as colunas de MetricaAtencao e de
+        MetricaInteracao, com timestamp) pelas regras, atualizando as
+        janelas em memória, e retorna as intervenções disparadas, como dicts
+        com as colunas de Intervencao
+        """
+        with self._lock:
+            disparos = self._avaliar(self._janelas, atencao, interacao)
+            if len(self._janelas) > self._limite_poda:
+                self._podar()
+        return disparos
+
+    def processar(self, db, atencao=(), interacao=()):
+        """
+        Avalia as amostras e grava as intervenções na transação de `db` (sem
+        commit). Retorna as janelas alteradas, a passar para confirmar()
+        depois do commit.
+        """
+        if not self.ativo:
+            return None
+        chaves = {(m["aula_id"], m["aluno_id"]) for m in atencao}
+        chaves.update((m["aula_id"], m["aluno_id"]) for m in interacao)
+        if self.compartilhado:
+            travar_escrita(db, JanelaIntervencao.__tablename__, Intervencao.__tablename__)
+            janelas = self._carregar(db, chaves)
+        else:
+            with self._lock:
+                janelas = {c: self._janelas[c].copia() for c in chaves if c in self._janelas}
+        with self._lock:
+            disparos = self._avaliar(janelas, atencao, interacao)
+        if self.compartilhado and janelas:
+            stmt = insert_com_conflito(db, JanelaIntervencao)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[JanelaIntervencao.aula_id, JanelaIntervencao.aluno_id],
+                set_={c: stmt.excluded[c] for c in _COLUNAS_ESTADO},
+                where=JanelaIntervencao.ultima <= stmt.excluded.ultima,
+            ), [janela.linha(chave) for chave, janela in janelas.items()])
+        if disparos:
+            db.execute(insert(Intervencao), disparos)
+        return janelas
+
+    def confirmar(self, janelas):
+        """Passa a usar as janelas avaliadas por processar() (chamar após o commit)"""
+        if self.compartilhado:
+            return
+        with self._lock:
+            for chave, janela in janelas.items():
+                # a fila e os endpoints de amostra única gravam em threads diferentes
+                atual = self._janelas.get(chave)
+                if atual is None or janela.ultima >= atual.ultima:
+                    self._janelas[chave] = janela
+            if len(self._janelas) > self._limite_poda:
+                self._podar()
+
+    def _carregar(self, db, chaves):
+        """Janelas gravadas em janelas_intervencao para (aula, aluno) em `chaves`"""
+        janelas = {}
+        chaves = list(chaves)
+        for i in range(0, len(chaves), LOTE_CHAVES):
+            linhas = db.execute(select(JanelaIntervencao).where(
+                tuple_(JanelaIntervencao.aula_id, JanelaIntervencao.aluno_id).in_(chaves[i:i + LOTE_CHAVES])
+            )).scalars()
+            for linha in linhas:
+                janelas[(linha.aula_id, linha.aluno_id)] = _Janela.da_linha(linha, self.capacidade)
+        return janelas
+
+    def _avaliar(self, janelas, atencao, interacao):
+        disparos = []
+        for m in atencao:
+            self._atencao(janelas, m, disparos)
+        for m in interacao:
+            self._interacao(janelas, m, disparos)
+        self.amostras += len(atencao) + len(interacao)
+        return disparos
+
+    def _janela(self, janelas, chave):
+        janela = janelas.get(chave)
+        if janela is None:
+            janela = janelas[chave] = _Janela(self.capacidade)
+        return janela
+
+    def _atencao(self, janelas, m, disparos):
+        chave = (m["aula_id"], m["aluno_id"])
+        janela = self._janela(janelas, chave)
+        momento = m["timestamp"]
+        if momento - janela.ultima > self.lacuna:
+            janela.limpar()
+        if momento > janela.ultima:
+            janela.ultima = momento
+
+        fora = 0 if m["gaze_na_tela"] else 1
+        fadiga = min(max(int(m["fadiga_score"] * 1000 + 0.5), 0), 0xFFFF)
+        p = janela.posicao
+        if janela.tamanho == self.capacidade:
+            janela.soma_fora -= janela.fora[p]
+            janela.soma_fadiga -= janela.fadiga[p]
+        else:
+            janela.tamanho += 1
+        janela.fora[p] = fora
+        janela.fadiga[p] = fadiga
+        janela.soma_fora += fora
+        janela.soma_fadiga += fadiga
+        janela.posicao = p + 1 if p + 1 < self.capacidade else 0
+
+        n = janela.tamanho
+        if n < self.minimo:
+            return
+        if janela.soma_fora >= self.limite_desatencao * n:
+            self._disparar(janela, chave, "attention", momento, round(janela.soma_fora / n, 3), disparos)
+        if janela.soma_fadiga > self.limite_fadiga * n:
+            self._disparar(janela, chave, "fatigue", momento, round(janela.soma_fadiga / n / 1000, 3), disparos)
+
+    def _interacao(self, janelas, m, disparos):
+        if (m["tempo_permanencia"] or 0) <= self.interacao_apos_s:
+            return
+        eventos = m["eventos_player"] if isinstance(m["eventos_player"], dict) else {}
+        interacoes = (m["cliques_materiais"] or 0) + sum(
+            v for v in eventos.values() if isinstance(v, (int, float)) and not isinstance(v, bool))
+        if interacoes < MINIMO_INTERACOES:
+            chave = (m["aula_id"], m["aluno_id"])
+            janela = self._janela(janelas, chave)
+            if m["timestamp"] > janela.ultima:
+                janela.ultima = m["timestamp"]
+            self._disparar(janela, chave, "interaction", m["timestamp"], interacoes, disparos)
+
+    def _disparar(self, janela, chave, tipo, momento, valor, disparos):
+        if janela.liberado is None:
+            janela.liberado = {}
+        elif momento < janela.liberado.get(tipo, _INICIO):
+            self.suprimidas += 1
+            return
+        janela.liberado[tipo] = momento + self.cooldown
+        disparos.append({
+            "aula_id": chave[0], "aluno_id": chave[1], "tipo": tipo, "mensagem": MENSAGENS[tipo],
+            "valor": valor, "timestamp": momento,
+        })
+        self.disparadas += 1
+
+    def _podar(self):
+        # janelas sem amostras há mais que a inatividade não guardam nada útil
+        recente = max(j.ultima for j in self._janelas.values())
+        self._janelas = {c: j for c, j in self._janelas.items() if j.ultima + self.inatividade >= recente}
+        self._limite_poda = max(1024, 2 * len(self._janelas))
+
+
+_COLUNAS_ESTADO = ["fora", "fadiga", "posicao", "tamanho", "ultima"] + [f"liberado_{tipo}" for tipo in MENSAGENS]
+
+motor_intervencoes = MotorIntervencoes()
@@ -0,0 +1,284 @@
+"""
+Linha do tempo da atenção da turma, mantida a cada amostra
+
+Cada amostra de atenção gravada soma, na mesma transação, na linha de
+`atencao_aula_intervalos` do seu intervalo de LINHA_TEMPO_BASE_S segundos
+(amostras, amostras na tela, soma da fadiga). Para contar alunos ativos
+sem contar duas vezes o mesmo aluno, cada (aula, intervalo, aluno) é
+anotado em `presencas_atencao_intervalo` com ON CONFLICT DO NOTHING: só
+as presenças realmente inseridas incrementam alunos_ativos.
+
+A curva de uma aula de 2 horas são ~720 linhas da aula lidas pela chave
+primária, agrupadas em intervalos maiores (múltiplos da base) em Python.
+Ao agrupar, alunos_ativos é o maior valor entre os intervalos da base.
+
+Amostras já compactadas por minuto (retencao.py) entram, na reconstrução,
+no intervalo do início do minuto; as gravadas como intervalos
+(intervalos_atencao.py), reconstruídas amostra a amostra.
+
+Uso via linha de comando (a partir de backend/):
+    python linha_tempo.py reconstruir [aula_id]
+    python linha_tempo.py verificar [aula_id]
+"""
+
+import math
+import os
+import re
+import sys
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+
+from database import SessionLocal, insert_com_conflito
+from intervalos_atencao import amostras_reconstruidas
+from models import (AtencaoAulaIntervalo, IntervaloAtencao, MetricaAtencao, MetricaAtencaoMinuto,
+                    PresencaAtencaoIntervalo)
+
+
+BASE_S = int(os.getenv("LINHA_TEMPO_BASE_S", "10"))
+TAMANHO_LOTE = 5000
+
+COLUNAS_SOMA = ("total_amostras", "amostras_na_tela", "soma_fadiga", "alunos_ativos")
+UNIDADES = {"s": 1, "m": 60, "h": 3600}
+
+
+class IntervaloInvalidoError(ValueError):
+    """Tamanho de intervalo que não é múltiplo da base ou não divide o dia"""
+
+
+def intervalo_segundos(texto):
+    """'30s', '5m', '1h' ou '90' -> segundos; levanta IntervaloInvalidoError"""
+    encontrado = re.fullmatch(r"\s*(\d+)\s*([smh]?)\s*", str(texto))
+    if not encontrado:
+        raise IntervaloInvalidoError(f"Intervalo inválido: {texto}")
+    segundos = int(encontrado.group(1)) * UNIDADES.get(encontrado.group(2) or "s")
+    if segundos <= 0 or segundos % BASE_S or 86400 % segundos:
+        raise IntervaloInvalidoError(
+            f"Intervalo deve ser múltiplo de {BASE_S}s e dividir o dia: {texto}")
+    return segundos
+
+
+def inicio_intervalo(momento, segundos=BASE_S):
+    """Início do intervalo de `segundos` (alinhado à meia-noite) que contém `momento`"""
+    decorridos = momento.hour * 3600 + momento.minute * 60 + momento.second
+    meia_noite = momento.replace(hour=0, minute=0, second=0, microsecond=0)
+    return meia_noite + timedelta(seconds=decorridos - decorridos % segundos)
+
+
+def _acumular(itens):
+    """
+    Somas por (aula, intervalo) e presenças (aula, intervalo, aluno) de
+    itens (aula_id, aluno_id, inicio, amostras, amostras_na_tela, soma_fadiga)
+    """
+    intervalos = {}
+    presencas = set()
+    for aula_id, aluno_id, inicio, amostras, na_tela, fadiga in itens:
+        chave = (aula_id, inicio)
+        i = intervalos.get(chave)
+        if i is None:
+            i = intervalos[chave] = {
+                "aula_id": aula_id, "inicio": inicio,
+                "total_amostras": 0, "amostras_na_tela": 0, "soma_fadiga": 0.0, "alunos_ativos": 0,
+            }
+        i["total_amostras"] += amostras
+        i["amostras_na_tela"] += na_tela
+        i["soma_fadiga"] += fadiga
+        presencas.add((aula_id, inicio, aluno_id))
+    return intervalos, presencas
+
+
+def _gravar(db, itens):
+    intervalos, presencas = _acumular(itens)
+    if not intervalos:
+        return
+
+    stmt = insert_com_conflito(db, PresencaAtencaoIntervalo).on_conflict_do_nothing().returning(
+        PresencaAtencaoIntervalo.aula_id, PresencaAtencaoIntervalo.inicio
+    )
+    novas = db.execute(stmt, [
+        {"aula_id": a, "inicio": inicio, "aluno_id": aluno} for a, inicio, aluno in presencas
+    ]).all()
+    for chave in novas:
+        intervalos[tuple(chave)]["alunos_ativos"] += 1
+
+    stmt = insert_com_conflito(db, AtencaoAulaIntervalo)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[AtencaoAulaIntervalo.aula_id, AtencaoAulaIntervalo.inicio],
+        set_={c: getattr(AtencaoAulaIntervalo, c) + stmt.excluded[c] for c in COLUNAS_SOMA}
+    ), list(intervalos.values()))
+
+
+def _itens_amostras(metricas):
+    for m in metricas:
+        yield (m["aula_id"], m["aluno_id"], inicio_intervalo(m["timestamp"]),
+               1, 1 if m["gaze_na_tela"] else 0, m["fadiga_score"])
+
+
+def registrar_atencao(db, metricas):
+    """Acumula amostras de atenção (dicts com as colunas de MetricaAtencao)"""
+    _gravar(db, _itens_amostras(metricas))
+
+
+def calcular_linha_tempo(db, aula_id, segundos=None, inicio=None, fim=None):
+    """
+    Atenção da turma por intervalo de `segundos` (múltiplo de BASE_S, que é
+    o padrão), só dos intervalos com amostras, em ordem. `inicio` e `fim`
+    restringem ao período, alinhado ao intervalo.
+    """
+    segundos = segundos or BASE_S
+    consulta = db.query(
+        AtencaoAulaIntervalo.inicio,
+        AtencaoAulaIntervalo.total_amostras,
+        AtencaoAulaIntervalo.amostras_na_tela,
+        AtencaoAulaIntervalo.soma_fadiga,
+        AtencaoAulaIntervalo.alunos_ativos,
+    ).filter(AtencaoAulaIntervalo.aula_id == aula_id)
+    if inicio is not None:
+        consulta = consulta.filter(AtencaoAulaIntervalo.inicio >= inicio_intervalo(inicio, segundos))
+    if fim is not None:
+        consulta = consulta.filter(AtencaoAulaIntervalo.inicio < fim)
+
+    pontos = []
+    atual = None
+    for momento, amostras, na_tela, fadiga, ativos in consulta.order_by(AtencaoAulaIntervalo.inicio):
+        chave = inicio_intervalo(momento, segundos)
+        if atual is None or atual[0] != chave:
+            atual = [chave, 0, 0, 0.0, 0]
+            pontos.append(atual)
+        atual[1] += amostras
+        atual[2] += na_tela
+        atual[3] += fadiga
+        atual[4] = max(atual[4], ativos)
+
+    return [
+        {
+            "inicio": chave,
+            "fim": chave + timedelta(seconds=segundos),
+            "amostras": amostras,
+            "score_atencao": round(na_tela / amostras * 100, 2) if amostras else 0,
+            "score_fadiga": round(fadiga / amostras, 2) if amostras else 0,
+            "alunos_ativos": ativos,
+        }
+        for chave, amostras, na_tela, fadiga, ativos in pontos
+    ]
+
+
+def _amostras_brutas(db, aula_id=None):
+    stmt = select(MetricaAtencao.aula_id, MetricaAtencao.aluno_id, MetricaAtencao.timestamp,
+                  MetricaAtencao.gaze_na_tela, MetricaAtencao.fadiga_score)
+    if aula_id is not None:
+        stmt = stmt.where(MetricaAtencao.aula_id == aula_id)
+    resultado = db.execute(stmt.execution_options(yield_per=TAMANHO_LOTE))
+    for lote in resultado.mappings().partitions():
+        yield lote
+
+
+def reconstruir_linha_tempo(db, aula_id=None):
+    """Recalcula a linha do tempo a partir das amostras brutas e compactadas (backfill)"""
+    for modelo in (AtencaoAulaIntervalo, PresencaAtencaoIntervalo):
+        remover = delete(modelo)
+        if aula_id is not None:
+            remover = remover.where(modelo.aula_id == aula_id)
+        db.execute(remover)
+
+    minutos = db.query(
+        MetricaAtencaoMinuto.aula_id, MetricaAtencaoMinuto.aluno_id, MetricaAtencaoMinuto.minuto,
+        MetricaAtencaoMinuto.total_amostras, MetricaAtencaoMinuto.amostras_na_tela,
+        MetricaAtencaoMinuto.soma_fadiga,
+    )
+    if aula_id is not None:
+        minutos = minutos.filter(MetricaAtencaoMinuto.aula_id == aula_id)
+    lote = []
+    for aula, aluno, minuto, amostras, na_tela, fadiga in minutos.yield_per(TAMANHO_LOTE):
+        lote.append((aula, aluno, inicio_intervalo(minuto), amostras, na_tela, fadiga))
+        if len(lote) >= TAMANHO_LOTE:
+            _gravar(db, lote)
+            lote = []
+    _gravar(db, lote)
+
+    for amostras in _amostras_brutas(db, aula_id):
+        registrar_atencao(db, amostras)
+
+    intervalos = db.query(IntervaloAtencao)
+    if aula_id is not None:
+        intervalos = intervalos.filter(IntervaloAtencao.aula_id == aula_id)
+    lote = []
+    for intervalo in intervalos.yield_per(TAMANHO_LOTE):
+        lote.extend(amostras_reconstruidas(intervalo))
+        if len(lote) >= TAMANHO_LOTE:
+            registrar_atencao(db, lote)
+            lote = []
+    registrar_atencao(db, lote)
+
+
+def verificar_linha_tempo(db, aula_id):
+    """
+    Compara a linha do tempo com a recontagem das amostras brutas, nos
+    intervalos posteriores à compactação (amostras gravadas como intervalos
+    não têm o momento exato de cada uma e não são conferidas); retorna as
+    divergências
+    """
+    primeira = db.query(func.min(MetricaAtencao.timestamp)).filter(MetricaAtencao.aula_id == aula_id).scalar()
+    if primeira is None:
+        return []
+    desde = inicio_intervalo(primeira)
+
+    intervalos, presencas = _acumular(_itens_amostras(m for lote in _amostras_brutas(db, aula_id) for m in lote))
+    for a, inicio, _ in presencas:
+        intervalos[(a, inicio)]["alunos_ativos"] += 1
+    esperado = {inicio: i for (_, inicio), i in intervalos.items()}
+    obtido = {
+        linha.inicio: {c: getattr(linha, c) for c in COLUNAS_SOMA}
+        for linha in db.query(AtencaoAulaIntervalo).filter(
+            AtencaoAulaIntervalo.aula_id == aula_id, AtencaoAulaIntervalo.inicio >= desde)
+    }
+
+    divergencias = []
+    for inicio in sorted(set(esperado) | set(obtido)):
+        e, o = esperado.get(inicio), obtido.get(inicio)
+        # a soma em ponto flutuante depende da ordem dos lotes
+        if (e is None or o is None
+                or any(e[c] != o[c] for c in COLUNAS_SOMA if c != "soma_fadiga")
+                or not math.isclose(e["soma_fadiga"], o["soma_fadiga"], abs_tol=1e-6)):
+            divergencias.append({
+                "inicio": inicio,
+                "esperado": e and {c: e[c] for c in COLUNAS_SOMA},
+                "obtido": o,
+            })
+    return divergencias
+
+
+def aulas_com_atencao(db, aula_id=None):
+    """Aulas com amostras de atenção ou linha do tempo (ou só aula_id)"""
+    if aula_id is not None:
+        return [aula_id]
+    ids = {a for (a,) in db.query(MetricaAtencao.aula_id).distinct()}
+    ids |= {a for (a,) in db.query(AtencaoAulaIntervalo.aula_id).distinct()}
+    return sorted(ids)
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "verificar"
+    aula_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    db = SessionLocal()
+    try:
+        if comando == "reconstruir":
+            reconstruir_linha_tempo(db, aula_id)
+            db.commit()
+            print("✅ Linha do tempo reconstruída")
+        elif comando == "verificar":
+            total = 0
+            for aula in aulas_com_atencao(db, aula_id):
+                divergencias = verificar_linha_tempo(db, aula)
+                total += len(divergencias)
+                for d in divergencias:
+                    print(f"❌ Aula {aula}, {d['inicio']}: {d['esperado']} != {d['obtido']}")
+            if total:
+                sys.exit(1)
+            print("✅ Linha do tempo confere com as amostras gravadas")
+        else:
+            print("Uso: python linha_tempo.py [reconstruir|verificar] [aula_id]")
+            sys.exit(2)
+    finally:
+        db.close()
@@ -1,19 +1,92 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+from typing import Any, Generic, List, Literal, Optional, TypeVar, Union
+from contextlib import asynccontextmanager
 from datetime import datetime
+from sqlalchemy import insert
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import os
+import threading
 import uvicorn
-from database import engine, Base, SessionLocal
-from models import Aluno, Aula, MetricaInteracao, MetricaAtencao, Docente, Quiz, RespostaQuiz, ResumoPersonalizado, LogInteracao
-
-# Criar todas as tabelas
-Base.metadata.create_all(bind=engine)
+from database import engine, SessionLocal, AsyncSessionLocal, DB_ASYNC
+from models import Aluno, Aula, MetricaAtencao, Quiz, ResumoPersonalizado, LogInteracao, SessaoInteracao, Intervencao
+from ingestao import fila_ingestao, FilaCheiaError, linha_atencao, linha_interacao
+from agregados import aplicar_atencao, atualizar_rankings, calcular_analise, ranking_turma
+from linha_tempo import IntervaloInvalidoError, calcular_linha_tempo, intervalo_segundos, registrar_atencao
+from sessoes import registrar_interacoes
+from migracoes import aplicar_migracoes
+from painel import difusor_analise
+from instrumentacao import MiddlewareInstrumentacao, registrar_medidor, registro
+from mineracao import cache_mineracao, invalidar_aulas, obter_mineracao
+from modelo_risco import modelo_atual, modelo_configurado
+from paginacao import CursorInvalidoError, paginar
+from quizzes import cache_gabaritos, linha_resposta_quiz, obter_gabarito
+from estatisticas_quiz import calcular_estatisticas
+from exportacao import Exportacao, ExportacaoInvalidaError, TABELAS
+from estado_compartilhado import WORKERS, estado_compartilhado
+from formato_binario import CONTENT_TYPE as CONTENT_TYPE_BINARIO, LoteInvalidoError, decodificar_lote
+from intervalos_atencao import intervalos_atencao
+from intervencoes import motor_intervencoes
+import retencao
+
+# orjson (opcional) serializa as respostas JSON bem mais rápido que o json
+# da biblioteca padrão
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as RespostaJSON
+except ImportError:
+    RespostaJSON = JSONResponse
+
+# Criar tabelas e aplicar migrações pendentes
+aplicar_migracoes(engine)
+
+TIMEOUT_ACK_LOTE = float(os.getenv("INGESTAO_TIMEOUT_ACK", "2.0"))
+
+def _atualizar_rankings(modelo=None):
+    try:
+        alteradas = atualizar_rankings(modelo)
+    except Exception as e:
+        print(f"❌ Erro ao recalcular o risco do ranking: {e}")
+        return
+    if alteradas:
+        print(f"✅ Risco do ranking recalculado com o modelo atual em {alteradas} linhas")
+
+def atualizar_rankings_em_segundo_plano(modelo=None):
+    # fora das requisições: o ranking é lido pelo índice de risco_evasao
+    threading.Thread(target=_atualizar_rankings, args=(modelo,), name="ranking-modelo", daemon=True).start()
+
+async def compactar_periodicamente():
+    while True:
+        await asyncio.sleep(retencao.INTERVALO_H * 3600)
+        try:
+            await run_in_threadpool(retencao.executar_compactacao)
+        except Exception as e:
+            print(f"❌ Erro na compactação das métricas de atenção: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    fila_ingestao.iniciar()
+    estado_compartilhado.iniciar()
+    atualizar_rankings_em_segundo_plano()
+    compactacao = asyncio.create_task(compactar_periodicamente()) if retencao.INTERVALO_H > 0 else None
+    yield
+    if compactacao:
+        compactacao.cancel()
+    await difusor_analise.encerrar()
+    fila_ingestao.parar()
+    estado_compartilhado.parar()
 
 app = FastAPI(
     title="Monitoramento de Engajamento em Aulas Online",
     description="Sistema de monitoramento de atenção e engajamento de alunos em aulas online",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RespostaJSON
 )
 
 # Configurar CORS
@@ -25,6 +98,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latência por rota e consultas SQL por requisição, exportadas em /metrics
+app.add_middleware(MiddlewareInstrumentacao)
+registrar_medidor("ingestao_fila_amostras_pendentes", "Amostras enfileiradas e ainda não gravadas",
+                  lambda: fila_ingestao.pendentes)
+registrar_medidor("ingestao_fila_capacidade", "Capacidade da fila de ingestão", lambda: fila_ingestao.capacidade)
+registrar_medidor("db_pool_conexoes_em_uso", "Conexões do pool em uso",
+                  lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+registrar_medidor("painel_websockets_inscritos", "Painéis conectados ao WebSocket de análise",
+                  lambda: difusor_analise.inscritos())
+for nome, atributo, ajuda in (
+    ("acertos", "acertos", "Consultas à mineração servidas pelo cache"),
+    ("falhas", "falhas", "Consultas à mineração recalculadas no banco"),
+    ("invalidacoes", "invalidacoes", "Resultados da mineração descartados por escritas na aula"),
+    ("despejos", "despejos", "Resultados da mineração descartados pelo limite de tamanho"),
+):
+    registrar_medidor(f"cache_mineracao_{nome}_total", ajuda,
+                      lambda atributo=atributo: getattr(cache_mineracao, atributo), tipo="counter")
+registrar_medidor("cache_mineracao_itens", "Aulas com resultado da mineração em cache", lambda: len(cache_mineracao))
+registrar_medidor("cache_gabaritos_acertos_total", "Respostas de quiz corrigidas com o gabarito em cache",
+                  lambda: cache_gabaritos.acertos, tipo="counter")
+registrar_medidor("cache_gabaritos_falhas_total", "Gabaritos lidos do banco", lambda: cache_gabaritos.falhas,
+                  tipo="counter")
+registrar_medidor("estado_compartilhado_publicadas_total", "Invalidações de cache publicadas para os outros workers",
+                  lambda: estado_compartilhado.publicadas, tipo="counter")
+registrar_medidor("estado_compartilhado_invalidacoes_remotas_total",
+                  "Chaves de cache descartadas por escritas em outros workers",
+                  lambda: estado_compartilhado.invalidacoes_remotas, tipo="counter")
+registrar_medidor("atencao_intervalos_amostras_total", "Amostras de atenção gravadas como intervalos",
+                  lambda: intervalos_atencao.amostras, tipo="counter")
+registrar_medidor("atencao_intervalos_criados_total", "Intervalos de atenção abertos (linhas inseridas)",
+                  lambda: intervalos_atencao.intervalos_criados, tipo="counter")
+registrar_medidor("intervencoes_amostras_total", "Amostras avaliadas pelas regras de intervenção",
+                  lambda: motor_intervencoes.amostras, tipo="counter")
+registrar_medidor("intervencoes_disparadas_total", "Intervenções disparadas e gravadas",
+                  lambda: motor_intervencoes.disparadas, tipo="counter")
+registrar_medidor("intervencoes_suprimidas_total", "Intervenções não disparadas por estarem no intervalo mínimo",
+                  lambda: motor_intervencoes.suprimidas, tipo="counter")
+registrar_medidor("intervencoes_janelas", "Alunos com janela de amostras em memória", lambda: len(motor_intervencoes))
+registrar_medidor("modelo_risco_recargas_total", "Recargas do arquivo do modelo de risco",
+                  lambda: modelo_configurado.recargas, tipo="counter")
+
+# Escritas gravadas pela fila de ingestão invalidam a mineração das aulas
+fila_ingestao.ao_gravar.append(invalidar_aulas)
+# Um modelo de risco novo recalcula o risco gravado no ranking
+modelo_configurado.ao_recarregar.append(atualizar_rankings_em_segundo_plano)
+
 # Schemas
 class AlunoCreate(BaseModel):
     nome: str
@@ -42,6 +161,7 @@ class MetricaInteracaoCreate(BaseModel):
     eventos_player: dict
     cliques_materiais: int
     conteudo_anotacoes: Optional[str] = None
+    sessao_id: Optional[str] = Field(None, max_length=64)  # gerado pelo cliente a cada carregamento
 
 class MetricaAtencaoCreate(BaseModel):
     aluno_id: int
@@ -51,10 +171,10 @@ class MetricaAtencaoCreate(BaseModel):
     desvio_olhar: int
     interrupcoes: int
 
-class IntervencaoFeedback(BaseModel):
-    tipo: str
-    mensagem: str
-    timestamp: datetime
+class LoteMetricas(BaseModel):
+    amostras: List[Union[MetricaAtencaoCreate, MetricaInteracaoCreate]] = Field(..., min_length=1)
+
+_amostras_interacao = TypeAdapter(List[MetricaInteracaoCreate])
 
 class QuizCreate(BaseModel):
     aula_id: int
@@ -84,6 +204,108 @@ class LogInteracaoCreate(BaseModel):
     tipo_interacao: str
     detalhes: dict
 
+# Schemas de resposta: serializados direto dos objetos do ORM
+class RespostaORM(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+class AlunoResposta(RespostaORM):
+    id: int
+    nome: str
+    email: str
+
+class AulaResposta(RespostaORM):
+    id: int
+    titulo: str
+    descricao: Optional[str] = None
+    docente_id: Optional[int] = None
+
+class MetricaAtencaoResposta(RespostaORM):
+    id: int
+    aluno_id: int
+    aula_id: int
+    gaze_na_tela: bool
+    fadiga_score: float
+    desvio_olhar: int
+    interrupcoes: int
+    timestamp: datetime
+
+class SessaoInteracaoResposta(RespostaORM):
+    id: int
+    aluno_id: int
+    aula_id: int
+    sessao_chave: str
+    tempo_permanencia: Optional[int] = None
+    eventos_player: Optional[dict] = None
+    cliques_materiais: Optional[int] = None
+    conteudo_anotacoes: Optional[str] = None
+    iniciada_em: datetime
+    atualizada_em: datetime
+
+class QuizResposta(RespostaORM):
+    id: int
+    aula_id: int
+    titulo: str
+    descricao: Optional[str] = None
+    perguntas: Any = None
+    respostas_certas: Any = None
+    criado_em: datetime
+
+class RespostaQuizResposta(RespostaORM):
+    id: int
+    quiz_id: int
+    aluno_id: int
+    respostas: dict
+    pontuacao: float
+    tempo_resposta: int
+    respondido_em: datetime
+
+class ResumoPersonalizadoResposta(RespostaORM):
+    id: int
+    aluno_id: int
+    aula_id: int
+    titulo: str
+    conteudo: Optional[str] = None
+    topicos_principais: Optional[List[str]] = None
+    pontos_destaque: Optional[List[str]] = None
+    recomendacoes: Optional[str] = None
+    criado_em: datetime
+
+class LogInteracaoResposta(RespostaORM):
+    id: int
+    aluno_id: int
+    aula_id: int
+    tipo_interacao: str
+    detalhes: Any = None
+    timestamp: datetime
+
+class IntervencaoFeedback(RespostaORM):
+    id: int
+    aluno_id: int
+    aula_id: int
+    tipo: str
+    mensagem: str
+    valor: Optional[float] = None
+    timestamp: datetime
+
+class ConfirmacaoId(BaseModel):
+    id: int
+
+T = TypeVar("T")
+
+class Pagina(BaseModel, Generic[T]):
+    itens: List[T]
+    proximo_cursor: Optional[str] = None
+    cursor_recente: Optional[str] = None
+
+# Confirmação dos endpoints de escrita de alta frequência (query ?confirmacao=):
+# "completa" devolve o registro gravado, "id" só {"id": ...} e "nenhuma"
+# responde 204 sem corpo
+Confirmacao = Literal["completa", "id", "nenhuma"]
+
+# Ordenação do ranking de /api/analise (agregados.ORDENACOES): maior risco
+# ou menor score de atenção primeiro
+OrdemRanking = Literal["risco_evasao", "score_atencao"]
+
 # Session dependency
 def get_db():
     db = SessionLocal()
@@ -92,20 +314,48 @@ def get_db():
     finally:
         db.close()
 
-# Endpoints de Alunos
-@app.post("/api/alunos", response_model=dict)
-def criar_aluno(aluno: AlunoCreate):
+async def get_db_async():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Sessão dos endpoints de alta frequência: AsyncSession com DB_ASYNC=1,
+# senão a sessão síncrona de sempre
+sessao_db = get_db_async if DB_ASYNC else get_db
+
+async def executar_db(db, funcao, *args):
+    """Executa funcao(sessao_sincrona, *args) sem bloquear o event loop"""
+    if DB_ASYNC:
+        return await db.run_sync(funcao, *args)
+    return await run_in_threadpool(funcao, db, *args)
+
+def _criar(objeto, esquema):
+    """
+    Grava o objeto e monta a resposta antes do commit, com o id obtido no
+    flush; depois do commit os atributos expiram e lê-los faria outro SELECT
+    """
     db = SessionLocal()
     try:
-        novo_aluno = Aluno(nome=aluno.nome, email=aluno.email)
-        db.add(novo_aluno)
+        db.add(objeto)
+        db.flush()
+        resposta = esquema.model_validate(objeto)
         db.commit()
-        db.refresh(novo_aluno)
-        return {"id": novo_aluno.id, "nome": novo_aluno.nome, "email": novo_aluno.email}
+        return resposta
     finally:
         db.close()
 
-@app.get("/api/alunos/{aluno_id}")
+def _confirmar(resposta, confirmacao):
+    if confirmacao == "nenhuma":
+        return Response(status_code=204)
+    if confirmacao == "id":
+        return RespostaJSON(content={"id": resposta.id if isinstance(resposta, BaseModel) else resposta["id"]})
+    return resposta
+
+# Endpoints de Alunos
+@app.post("/api/alunos", response_model=AlunoResposta)
+def criar_aluno(aluno: AlunoCreate):
+    return _criar(Aluno(nome=aluno.nome, email=aluno.email), AlunoResposta)
+
+@app.get("/api/alunos/{aluno_id}", response_model=AlunoResposta)
 def obter_aluno(aluno_id: int):
     db = SessionLocal()
     try:
@@ -117,233 +367,293 @@ def obter_aluno(aluno_id: int):
         db.close()
 
 # Endpoints de Aulas
-@app.post("/api/aulas")
+@app.post("/api/aulas", response_model=AulaResposta)
 def criar_aula(aula: AulaCreate):
-    db = SessionLocal()
+    return _criar(Aula(titulo=aula.titulo, descricao=aula.descricao, docente_id=aula.docente_id), AulaResposta)
+
+def _pagina(query, colunas, **kwargs):
     try:
-        nova_aula = Aula(
-            titulo=aula.titulo,
-            descricao=aula.descricao,
-            docente_id=aula.docente_id
-        )
-        db.add(nova_aula)
-        db.commit()
-        db.refresh(nova_aula)
-        return nova_aula
-    finally:
-        db.close()
+        return paginar(query, colunas, **kwargs)
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/aulas")
-def listar_aulas():
+@app.get("/api/aulas", response_model=Pagina[AulaResposta])
+def listar_aulas(limite: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None, desde: Optional[str] = None):
+    """Aulas em ordem de criação, paginadas por id"""
     db = SessionLocal()
     try:
-        aulas = db.query(Aula).all()
-        return aulas
+        return _pagina(db.query(Aula), [Aula.id], limite=limite, cursor=cursor, desde=desde)
     finally:
         db.close()
 
 # Endpoints de Métricas
-@app.post("/api/metricas/interacao")
-def registrar_metrica_interacao(metrica: MetricaInteracaoCreate):
-    db = SessionLocal()
+def _gravar_atencao(db, linha):
+    abertos = None
+    if intervalos_atencao.ativo:
+        # como na fila de ingestão; o id retornado é o do intervalo que recebeu a amostra
+        ids = []
+        abertos = intervalos_atencao.gravar(db, [linha], ids=ids)
+        id_, = ids
+    else:
+        id_ = db.execute(insert(MetricaAtencao).returning(MetricaAtencao.id), [linha]).scalar_one()
+    aplicar_atencao(db, [linha])
+    registrar_atencao(db, [linha])
+    janelas = motor_intervencoes.processar(db, [linha])
+    db.commit()
+    if abertos:
+        intervalos_atencao.confirmar(abertos)
+    if janelas:
+        motor_intervencoes.confirmar(janelas)
+    return {"id": id_, **linha}
+
+def _gravar_interacao(db, linha, confirmacao):
+    chave, = registrar_interacoes(db, [linha])
+    janelas = motor_intervencoes.processar(db, interacao=[linha])
+    db.commit()
+    if janelas:
+        motor_intervencoes.confirmar(janelas)
+    if confirmacao == "nenhuma":
+        return None
+    # a sessão pode ter começado em outra requisição (iniciada_em, id)
+    sessao = db.query(SessaoInteracao).filter(
+        SessaoInteracao.aula_id == linha["aula_id"],
+        SessaoInteracao.aluno_id == linha["aluno_id"],
+        SessaoInteracao.sessao_chave == chave
+    ).first()
+    return SessaoInteracaoResposta.model_validate(sessao)
+
+@app.post("/api/metricas/interacao", response_model=SessaoInteracaoResposta)
+async def registrar_metrica_interacao(metrica: MetricaInteracaoCreate, confirmacao: Confirmacao = "completa",
+                                      db=Depends(sessao_db)):
+    """Atualiza a sessão de interação do aluno e retorna seus contadores"""
+    sessao = await executar_db(db, _gravar_interacao, linha_interacao(metrica), confirmacao)
+    invalidar_aulas([metrica.aula_id])
+    return _confirmar(sessao, confirmacao)
+
+@app.post("/api/metricas/atencao", response_model=MetricaAtencaoResposta)
+async def registrar_metrica_atencao(metrica: MetricaAtencaoCreate, confirmacao: Confirmacao = "completa",
+                                    db=Depends(sessao_db)):
+    nova_metrica = await executar_db(db, _gravar_atencao, linha_atencao(metrica))
+    invalidar_aulas([metrica.aula_id])
+    return _confirmar(nova_metrica, confirmacao)
+
+@app.post("/api/metricas/lote")
+async def registrar_lote_metricas(lote: LoteMetricas):
+    """
+    Recebe amostras mistas de atenção e interação e as entrega à fila de
+    ingestão, que grava amostras de todos os clientes em um único commit.
+
+    Contrato de confirmação:
+    - 200 `gravado`: as amostras já estão persistidas no banco;
+    - 202 `enfileirado`: aceitas, mas o commit não terminou dentro do prazo;
+    - 503: fila cheia, o cliente deve reenviar após `Retry-After` segundos.
+    """
+    timestamp = datetime.now()
+    atencao = []
+    interacao = []
+    for amostra in lote.amostras:
+        if isinstance(amostra, MetricaAtencaoCreate):
+            atencao.append(linha_atencao(amostra, timestamp))
+        else:
+            interacao.append(linha_interacao(amostra, timestamp))
+    return await _submeter_lote(atencao, interacao)
+
+@app.post("/api/metricas/lote/binario", openapi_extra={
+    "requestBody": {"required": True, "content": {CONTENT_TYPE_BINARIO: {"schema": {"type": "string", "format": "binary"}}}}})
+async def registrar_lote_metricas_binario(request: Request):
+    """
+    Mesmo lote de /api/metricas/lote no formato binário de
+    formato_binario.py: as amostras de atenção são decodificadas em bloco,
+    sem um modelo pydantic por amostra. Mesmo contrato de confirmação.
+    """
+    timestamp = datetime.now()
     try:
-        nova_metrica = MetricaInteracao(
-            aluno_id=metrica.aluno_id,
-            aula_id=metrica.aula_id,
-            tempo_permanencia=metrica.tempo_permanencia,
-            eventos_player=metrica.eventos_player,
-            cliques_materiais=metrica.cliques_materiais,
-            conteudo_anotacoes=metrica.conteudo_anotacoes,
-            timestamp=datetime.now()
-        )
-        db.add(nova_metrica)
-        db.commit()
-        db.refresh(nova_metrica)
-        return nova_metrica
-    finally:
-        db.close()
+        atencao, interacao_json = decodificar_lote(await request.body(), timestamp)
+    except LoteInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    interacao = []
+    if interacao_json:
+        try:
+            amostras = _amostras_interacao.validate_json(interacao_json)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+        interacao = [linha_interacao(amostra, timestamp) for amostra in amostras]
+    return await _submeter_lote(atencao, interacao)
+
+async def _submeter_lote(atencao, interacao):
+    try:
+        # submeter pode esperar por espaço na fila (backpressure)
+        future = await run_in_threadpool(fila_ingestao.submeter, atencao, interacao)
+    except FilaCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-@app.post("/api/metricas/atencao")
-def registrar_metrica_atencao(metrica: MetricaAtencaoCreate):
-    db = SessionLocal()
+    resposta = {"atencao": len(atencao), "interacao": len(interacao)}
     try:
-        nova_metrica = MetricaAtencao(
-            aluno_id=metrica.aluno_id,
-            aula_id=metrica.aula_id,
-            gaze_na_tela=metrica.gaze_na_tela,
-            fadiga_score=metrica.fadiga_score,
-            desvio_olhar=metrica.desvio_olhar,
-            interrupcoes=metrica.interrupcoes,
-            timestamp=datetime.now()
-        )
-        db.add(nova_metrica)
-        db.commit()
-        db.refresh(nova_metrica)
-        return nova_metrica
-    finally:
-        db.close()
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), TIMEOUT_ACK_LOTE)
+    except asyncio.TimeoutError:
+        return RespostaJSON(status_code=202, content={"status": "enfileirado", **resposta})
+    except Exception:
+        raise HTTPException(status_code=500, detail="Falha ao gravar lote de métricas")
+    return {"status": "gravado", **resposta}
 
 # Endpoint de análise de risco
 @app.get("/api/analise/{aula_id}")
-def obter_analise_turma(aula_id: int):
+async def obter_analise_turma(aula_id: int, limite: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None,
+                              min_risco: Optional[float] = None,
+                              ordenar_por: Optional[OrdemRanking] = None, db=Depends(sessao_db)):
+    """
+    Sem parâmetros, a turma inteira por risco decrescente. Com limite,
+    cursor, min_risco ou ordenar_por, uma página do ranking mantido na
+    ingestão (custo proporcional ao limite, não ao tamanho da turma), com
+    `proximo_cursor` para as seguintes.
+    """
+    if limite is None and cursor is None and min_risco is None and ordenar_por is None:
+        # Scores calculados a partir dos agregados mantidos na ingestão
+        return {"aula_id": aula_id, "alunos": await executar_db(db, calcular_analise, aula_id)}
+    try:
+        pagina = await executar_db(db, ranking_turma, aula_id, limite, cursor, ordenar_por or "risco_evasao",
+                                   min_risco)
+    except CursorInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"aula_id": aula_id, **pagina}
+
+@app.get("/api/analise/{aula_id}/timeline")
+async def obter_linha_tempo(aula_id: int, bucket: Optional[str] = None, inicio: Optional[datetime] = None,
+                            fim: Optional[datetime] = None, db=Depends(sessao_db)):
+    """
+    Atenção da turma ao longo da aula por intervalo (`bucket`: 30s, 5m...,
+    múltiplo de LINHA_TEMPO_BASE_S), lida da linha do tempo mantida na ingestão
+    """
+    try:
+        segundos = intervalo_segundos(bucket) if bucket is not None else None
+    except IntervaloInvalidoError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    intervalos = await executar_db(db, calcular_linha_tempo, aula_id, segundos, inicio, fim)
+    return {"aula_id": aula_id, "intervalos": intervalos}
+
+@app.get("/api/intervencoes/{aula_id}", response_model=Pagina[IntervencaoFeedback])
+def listar_intervencoes(aula_id: int, aluno_id: Optional[int] = None, limite: Optional[int] = Query(None, ge=1),
+                        cursor: Optional[str] = None, desde: Optional[str] = None):
+    """
+    Intervenções disparadas na aula (ou só as do aluno) em ordem de
+    disparo; `desde` traz só as disparadas depois
+    """
     db = SessionLocal()
     try:
-        # Buscar métricas de atenção e interação
-        metricas_atencao = db.query(MetricaAtencao).filter(
-            MetricaAtencao.aula_id == aula_id
-        ).all()
-        
-        metricas_interacao = db.query(MetricaInteracao).filter(
-            MetricaInteracao.aula_id == aula_id
-        ).all()
-        
-        # Calcular scores por aluno
-        alunos_dados = {}
-        
-        for metrica in metricas_atencao + metricas_interacao:
-            aluno_id = metrica.aluno_id
-            if aluno_id not in alunos_dados:
-                aluno = db.query(Aluno).filter(Aluno.id == aluno_id).first()
-                alunos_dados[aluno_id] = {
-                    "aluno": aluno,
-                    "metricas_atencao": [],
-                    "metricas_interacao": []
-                }
-        
-        for metrica in metricas_atencao:
-            alunos_dados[metrica.aluno_id]["metricas_atencao"].append(metrica)
-        
-        for metrica in metricas_interacao:
-            alunos_dados[metrica.aluno_id]["metricas_interacao"].append(metrica)
-        
-        # Calcular scores
-        resultados = []
-        for aluno_id, dados in alunos_dados.items():
-            # Score de atenção
-            atendio_on_screen = sum(1 for m in dados["metricas_atencao"] if m.gaze_na_tela)
-            total_checks = len(dados["metricas_atencao"])
-            score_atencao = (atendio_on_screen / total_checks * 100) if total_checks > 0 else 0
-            
-            # Score de fadiga
-            media_fadiga = sum(m.fadiga_score for m in dados["metricas_atencao"]) / len(dados["metricas_atencao"]) if dados["metricas_atencao"] else 0
-            
-            # Score de interação
-            total_tempo = sum(m.tempo_permanencia for m in dados["metricas_interacao"])
-            total_cliques = sum(m.cliques_materiais for m in dados["metricas_interacao"])
-            
-            # Risco de evasão (combinação dos scores)
-            risco_evasao = 0
-            if score_atencao < 50:
-                risco_evasao += 30
-            if media_fadiga > 0.7:
-                risco_evasao += 25
-            if total_cliques < 3:
-                risco_evasao += 25
-            if total_tempo < 300:  # menos de 5 minutos
-                risco_evasao += 20
-            
-            resultados.append({
-                "aluno_id": aluno_id,
-                "aluno_nome": dados["aluno"].nome,
-                "score_atencao": round(score_atencao, 2),
-                "score_fadiga": round(media_fadiga, 2),
-                "desvios_olhar": sum(m.desvio_olhar for m in dados["metricas_atencao"]),
-                "interrupcoes": sum(m.interrupcoes for m in dados["metricas_atencao"]),
-                "total_tempo": total_tempo,
-                "total_cliques": total_cliques,
-                "risco_evasao": min(risco_evasao, 100)
-            })
-        
-        # Ordenar por risco
-        resultados.sort(key=lambda x: x["risco_evasao"], reverse=True)
-        
-        return {"aula_id": aula_id, "alunos": resultados}
+        intervencoes = db.query(Intervencao).filter(Intervencao.aula_id == aula_id)
+        if aluno_id is not None:
+            intervencoes = intervencoes.filter(Intervencao.aluno_id == aluno_id)
+        return _pagina(intervencoes, [Intervencao.timestamp, Intervencao.id], limite=limite, cursor=cursor,
+                       desde=desde)
     finally:
         db.close()
 
+@app.get("/api/modelo-risco")
+def obter_modelo_risco():
+    # Regras em uso (recarregadas de MODELO_RISCO_ARQUIVO quando o arquivo muda)
+    return modelo_atual().configuracao()
+
+@app.websocket("/ws/analise/{aula_id}")
+async def stream_analise_turma(websocket: WebSocket, aula_id: int):
+    """Snapshot inicial da análise seguido de deltas por aluno"""
+    await websocket.accept()
+    try:
+        await difusor_analise.assinar(aula_id, websocket)
+        while True:
+            # O cliente não envia dados; a leitura só detecta a desconexão
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        difusor_analise.cancelar(aula_id, websocket)
+
 # Endpoints de Quiz
-@app.post("/api/quizzes")
+@app.post("/api/quizzes", response_model=QuizResposta)
 def criar_quiz(quiz: QuizCreate):
+    novo_quiz = Quiz(
+        aula_id=quiz.aula_id,
+        titulo=quiz.titulo,
+        descricao=quiz.descricao,
+        perguntas=quiz.perguntas,
+        respostas_certas=quiz.respostas_certas
+    )
+    return _criar(novo_quiz, QuizResposta)
+
+@app.get("/api/quizzes/{aula_id}", response_model=Pagina[QuizResposta])
+def listar_quizzes_aula(aula_id: int, limite: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None,
+                        desde: Optional[str] = None):
+    """Quizzes da aula em ordem de criação; `desde` traz só os criados depois"""
     db = SessionLocal()
     try:
-        novo_quiz = Quiz(
-            aula_id=quiz.aula_id,
-            titulo=quiz.titulo,
-            descricao=quiz.descricao,
-            perguntas=quiz.perguntas,
-            respostas_certas=quiz.respostas_certas
-        )
-        db.add(novo_quiz)
-        db.commit()
-        db.refresh(novo_quiz)
-        return novo_quiz
+        return _pagina(db.query(Quiz).filter(Quiz.aula_id == aula_id), [Quiz.criado_em, Quiz.id],
+                       limite=limite, cursor=cursor, desde=desde)
     finally:
         db.close()
 
-@app.get("/api/quizzes/{aula_id}")
-def listar_quizzes_aula(aula_id: int):
+def _corrigir_e_enfileirar(resposta):
     db = SessionLocal()
     try:
-        quizzes = db.query(Quiz).filter(Quiz.aula_id == aula_id).all()
-        return quizzes
+        gabarito = obter_gabarito(db, resposta.quiz_id)
     finally:
         db.close()
+    if gabarito is None:
+        raise HTTPException(status_code=404, detail="Quiz não encontrado")
+    linha = linha_resposta_quiz(resposta, gabarito)
+    # cópia entregue à fila, que recebe o id na thread escritora;
+    # submeter pode esperar por espaço na fila (backpressure)
+    gravada = dict(linha)
+    return linha, gravada, fila_ingestao.submeter([], [], [gravada])
+
+@app.post("/api/respostas-quiz", response_model=RespostaQuizResposta)
+async def registrar_resposta_quiz(resposta: RespostaQuizCreate, confirmacao: Confirmacao = "completa"):
+    """
+    Corrige com o gabarito em cache e grava pela fila de ingestão, junto
+    com as demais respostas que chegarem no mesmo intervalo. Responde 202
+    (sem `id`) se o commit não terminar dentro do prazo.
+    """
+    try:
+        linha, gravada, future = await run_in_threadpool(_corrigir_e_enfileirar, resposta)
+    except FilaCheiaError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-@app.post("/api/respostas-quiz")
-def registrar_resposta_quiz(resposta: RespostaQuizCreate):
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), TIMEOUT_ACK_LOTE)
+    except asyncio.TimeoutError:
+        return RespostaJSON(status_code=202, content=jsonable_encoder(linha))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Falha ao gravar resposta do quiz")
+    return _confirmar({"id": gravada["id"], **linha}, confirmacao)
+
+@app.get("/api/quizzes/{quiz_id}/estatisticas")
+def obter_estatisticas_quiz(quiz_id: int):
+    """
+    Acertos e distribuição das respostas por pergunta, lidos dos contadores
+    mantidos a cada resposta gravada (estatisticas_quiz.py)
+    """
     db = SessionLocal()
     try:
-        # Buscar respostas corretas
-        quiz = db.query(Quiz).filter(Quiz.id == resposta.quiz_id).first()
-        if not quiz:
+        gabarito = obter_gabarito(db, quiz_id)
+        if gabarito is None:
             raise HTTPException(status_code=404, detail="Quiz não encontrado")
-
-        # Calcular pontuação
-        pontuacao = 0
-        total_perguntas = len(quiz.respostas_certas)
-
-        for pergunta_id, resposta_aluno in resposta.respostas.items():
-            if pergunta_id in quiz.respostas_certas and quiz.respostas_certas[pergunta_id] == resposta_aluno:
-                pontuacao += 1
-
-        pontuacao_final = (pontuacao / total_perguntas) * 100 if total_perguntas > 0 else 0
-
-        nova_resposta = RespostaQuiz(
-            quiz_id=resposta.quiz_id,
-            aluno_id=resposta.aluno_id,
-            respostas=resposta.respostas,
-            pontuacao=pontuacao_final,
-            tempo_resposta=resposta.tempo_resposta
-        )
-        db.add(nova_resposta)
-        db.commit()
-        db.refresh(nova_resposta)
-        return nova_resposta
+        return calcular_estatisticas(db, gabarito)
     finally:
         db.close()
 
 # Endpoints de Resumos Personalizados
-@app.post("/api/resumos-personalizados")
+@app.post("/api/resumos-personalizados", response_model=ResumoPersonalizadoResposta)
 def criar_resumo_personalizado(resumo: ResumoPersonalizadoCreate):
-    db = SessionLocal()
-    try:
-        novo_resumo = ResumoPersonalizado(
-            aluno_id=resumo.aluno_id,
-            aula_id=resumo.aula_id,
-            titulo=resumo.titulo,
-            conteudo=resumo.conteudo,
-            topicos_principais=resumo.topicos_principais,
-            pontos_destaque=resumo.pontos_destaque,
-            recomendacoes=resumo.recomendacoes
-        )
-        db.add(novo_resumo)
-        db.commit()
-        db.refresh(novo_resumo)
-        return novo_resumo
-    finally:
-        db.close()
-
-@app.get("/api/resumos-personalizados/{aluno_id}/{aula_id}")
+    novo_resumo = ResumoPersonalizado(
+        aluno_id=resumo.aluno_id,
+        aula_id=resumo.aula_id,
+        titulo=resumo.titulo,
+        conteudo=resumo.conteudo,
+        topicos_principais=resumo.topicos_principais,
+        pontos_destaque=resumo.pontos_destaque,
+        recomendacoes=resumo.recomendacoes
+    )
+    return _criar(novo_resumo, ResumoPersonalizadoResposta)
+
+@app.get("/api/resumos-personalizados/{aluno_id}/{aula_id}", response_model=ResumoPersonalizadoResposta)
 def obter_resumo_personalizado(aluno_id: int, aula_id: int):
     db = SessionLocal()
     try:
@@ -358,76 +668,72 @@ def obter_resumo_personalizado(aluno_id: int, aula_id: int):
         db.close()
 
 # Endpoint de Logs de Interação
-@app.post("/api/logs-interacao")
-def registrar_log_interacao(log: LogInteracaoCreate):
-    db = SessionLocal()
-    try:
-        novo_log = LogInteracao(
-            aluno_id=log.aluno_id,
-            aula_id=log.aula_id,
-            tipo_interacao=log.tipo_interacao,
-            detalhes=log.detalhes
-        )
-        db.add(novo_log)
-        db.commit()
-        db.refresh(novo_log)
-        return novo_log
-    finally:
-        db.close()
-
-@app.get("/api/logs-interacao/{aluno_id}/{aula_id}")
-def obter_logs_interacao(aluno_id: int, aula_id: int):
+@app.post("/api/logs-interacao", response_model=LogInteracaoResposta)
+def registrar_log_interacao(log: LogInteracaoCreate, confirmacao: Confirmacao = "completa"):
+    novo_log = LogInteracao(
+        aluno_id=log.aluno_id,
+        aula_id=log.aula_id,
+        tipo_interacao=log.tipo_interacao,
+        detalhes=log.detalhes
+    )
+    resposta = _criar(novo_log, LogInteracaoResposta)
+    invalidar_aulas([log.aula_id])
+    return _confirmar(resposta, confirmacao)
+
+@app.get("/api/logs-interacao/{aluno_id}/{aula_id}", response_model=Pagina[LogInteracaoResposta])
+def obter_logs_interacao(aluno_id: int, aula_id: int, limite: Optional[int] = Query(None, ge=1),
+                         cursor: Optional[str] = None, desde: Optional[str] = None):
+    """Logs do aluno na aula, mais recentes primeiro"""
     db = SessionLocal()
     try:
         logs = db.query(LogInteracao).filter(
             LogInteracao.aluno_id == aluno_id,
             LogInteracao.aula_id == aula_id
-        ).order_by(LogInteracao.timestamp.desc()).all()
-        return logs
+        )
+        return _pagina(logs, [LogInteracao.timestamp, LogInteracao.id], limite=limite, cursor=cursor,
+                       desde=desde, decrescente=True)
     finally:
         db.close()
 
 # Endpoint de Análise de Dados Educacionais
 @app.get("/api/mineracao-dados/{aula_id}")
 def analisar_dados_educacionais(aula_id: int):
+    """Estatísticas da aula, servidas do cache até a próxima escrita na aula"""
     db = SessionLocal()
     try:
-        # Buscar todos os logs de interação da aula
-        logs = db.query(LogInteracao).filter(LogInteracao.aula_id == aula_id).all()
-
-        # Análise de padrões de interação
-        padroes_interacao = {}
-        for log in logs:
-            tipo = log.tipo_interacao
-            if tipo not in padroes_interacao:
-                padroes_interacao[tipo] = 0
-            padroes_interacao[tipo] += 1
-
-        # Buscar métricas de atenção e interação
-        metricas_atencao = db.query(MetricaAtencao).filter(MetricaAtencao.aula_id == aula_id).all()
-        metricas_interacao = db.query(MetricaInteracao).filter(MetricaInteracao.aula_id == aula_id).all()
-
-        # Calcular estatísticas
-        total_alunos = len(set(log.aluno_id for log in logs))
-
-        estatisticas = {
-            "total_alunos": total_alunos,
-            "padroes_interacao": padroes_interacao,
-            "media_atencao": sum(m.gaze_na_tela for m in metricas_atencao) / len(metricas_atencao) if metricas_atencao else 0,
-            "media_fadiga": sum(m.fadiga_score for m in metricas_atencao) / len(metricas_atencao) if metricas_atencao else 0,
-            "total_interacoes": len(logs),
-            "media_cliques": sum(m.cliques_materiais for m in metricas_interacao) / len(metricas_interacao) if metricas_interacao else 0
-        }
-
-        return estatisticas
+        return obter_mineracao(db, aula_id)
     finally:
         db.close()
 
+# Exportação das métricas brutas para análise offline
+@app.get("/api/exportacao/{tabela}")
+def exportar_metricas(tabela: str, formato: str = "csv", aula_id: Optional[int] = None,
+                      aluno_id: Optional[int] = None, inicio: Optional[datetime] = None,
+                      fim: Optional[datetime] = None):
+    """Linhas da tabela em CSV, Parquet ou Arrow, enviadas em lotes conforme são lidas"""
+    if tabela not in TABELAS:
+        raise HTTPException(status_code=404, detail=f"Tabela desconhecida: {tabela}")
+    try:
+        exportacao = Exportacao(tabela, formato, aula_id, aluno_id, inicio, fim)
+    except ExportacaoInvalidaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    nome = tabela + (f"_aula{aula_id}" if aula_id is not None else "") + f".{formato}"
+    return StreamingResponse(exportacao, media_type=exportacao.tipo_conteudo,
+                             headers={"Content-Disposition": f'attachment; filename="{nome}"'})
+
+@app.get("/metrics", include_in_schema=False)
+def metricas_prometheus():
+    return PlainTextResponse(registro.exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 def root():
     return {"message": "API de Monitoramento de Engajamento"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # WEB_CONCURRENCY=4 python main.py sobe 4 workers (ver estado_compartilhado.py)
+    if WORKERS > 1:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 
 
@@ -0,0 +1,245 @@
+"""
+Migrações de schema do banco de dados
+
+`Base.metadata.create_all` só cria tabelas inexistentes: não adiciona
+índices nem colunas novas a um monitoramento.db já existente. As
+migrações abaixo são aplicadas em ordem, uma única vez cada, e a versão
+aplicada fica registrada na tabela `schema_migracoes`. Todas são
+idempotentes. Só a migração 3 remove linhas: colapsa o histórico de
+`metricas_interacao` em sessões e apaga as amostras intermediárias de cada
+sessão (ficam a primeira, a última e as que cruzam um checkpoint); os
+totais por aluno não mudam. `status` marca as migrações que removem dados
+e um aviso é impresso antes de aplicá-las; faça um backup do banco antes
+se precisar das amostras originais.
+
+Uso via linha de comando (a partir de backend/):
+    python migracoes.py                    # aplica migrações pendentes
+    python migracoes.py status             # lista migrações aplicadas/pendentes
+    python migracoes.py verificar-planos   # confere EXPLAIN QUERY PLAN das consultas principais
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from database import Base, engine
+from estado_compartilhado import trava
+from models import MigracaoSchema
+
+
+def _adicionar_colunas_novas(bind):
+    """
+    ALTER TABLE ADD COLUMN para colunas declaradas nos modelos que ainda
+    não existem em tabelas já criadas (create_all não altera tabelas)
+    """
+    inspetor = inspect(bind)
+    with bind.begin() as conexao:
+        for tabela in Base.metadata.sorted_tables:
+            existentes = {c["name"] for c in inspetor.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes:
+                    continue
+                tipo = coluna.type.compile(dialect=bind.dialect)
+                conexao.execute(text(f'ALTER TABLE {tabela.name} ADD COLUMN "{coluna.name}" {tipo}'))
+
+
+def _criar_indices(db):
+    """Cria os índices declarados nos modelos que ainda não existem no banco"""
+    conexao = db.connection()
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=conexao, checkfirst=True)
+
+
+def _backfill_agregados(db):
+    from agregados import reconstruir_agregados
+    reconstruir_agregados(db)
+
+
+def _sessoes_interacao(db):
+    from agregados import reconstruir_agregados
+    from sessoes import colapsar_historico
+    _, removidas = colapsar_historico(db)
+    if removidas:
+        print(f"   {removidas} amostras intermediárias removidas de metricas_interacao")
+    reconstruir_agregados(db)
+
+
+def _estatisticas_quiz(db):
+    from estatisticas_quiz import reconstruir_estatisticas
+    reconstruir_estatisticas(db)
+
+
+def _ranking_risco(db):
+    from agregados import atualizar_ranking
+    _criar_indices(db)
+    atualizar_ranking(db)
+
+
+def _linha_tempo(db):
+    from linha_tempo import reconstruir_linha_tempo
+    reconstruir_linha_tempo(db)
+
+
+# (versão, descrição, função) — nunca renumerar nem remover entradas
+MIGRACOES = [
+    (1, "Índices compostos (aula_id, aluno_id, timestamp) nas tabelas de métricas e logs", _criar_indices),
+    (2, "Backfill de agregados_engajamento a partir das tabelas brutas", _backfill_agregados),
+    (3, "Colapsa o histórico de metricas_interacao em sessoes_interacao", _sessoes_interacao),
+    (4, "Estatísticas por pergunta dos quizzes a partir de respostas_quiz", _estatisticas_quiz),
+    (5, "Score de atenção e risco indexados em agregados_engajamento (ranking da turma)", _ranking_risco),
+    (6, "Linha do tempo da atenção por aula a partir das amostras de atenção", _linha_tempo),
+]
+
+# Versões que apagam linhas existentes (ver a docstring do módulo)
+MIGRACOES_REMOVEM_DADOS = {3: "metricas_interacao"}
+
+
+def aplicar_migracoes(bind=engine):
+    """
+    Cria tabelas e colunas novas e aplica as migrações pendentes; retorna
+    as versões aplicadas. Com vários workers subindo juntos, um aplica e os
+    outros esperam a trava e encontram o banco já atualizado.
+    """
+    with trava("migracoes", bind.url):
+        Base.metadata.create_all(bind=bind)
+        _adicionar_colunas_novas(bind)
+
+        aplicadas = []
+        with Session(bind=bind) as db:
+            concluidas = {versao for (versao,) in db.query(MigracaoSchema.versao)}
+            for versao, descricao, funcao in MIGRACOES:
+                if versao in concluidas:
+                    continue
+                tabela = MIGRACOES_REMOVEM_DADOS.get(versao)
+                if tabela and db.execute(text(f"SELECT 1 FROM {tabela} LIMIT 1")).first():
+                    print(f"⚠️  Migração {versao} ({descricao}) remove linhas de "
+                          f"{tabela}; faça um backup do banco antes se precisar delas")
+                try:
+                    funcao(db)
+                    db.add(MigracaoSchema(versao=versao, descricao=descricao, aplicada_em=datetime.now()))
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                aplicadas.append(versao)
+    return aplicadas
+
+
+# Consultas principais e o índice que cada uma deve usar
+CONSULTAS_VERIFICADAS = [
+    ("análise: métricas de atenção da aula",
+     "SELECT * FROM metricas_atencao WHERE aula_id = 1",
+     "ix_metricas_atencao_aula_aluno_timestamp"),
+    ("análise: métricas de interação da aula",
+     "SELECT * FROM metricas_interacao WHERE aula_id = 1",
+     "ix_metricas_interacao_aula_aluno_timestamp"),
+    ("análise: sessões de interação por aluno",
+     "SELECT aluno_id, sum(tempo_permanencia) FROM sessoes_interacao WHERE aula_id = 1 GROUP BY aluno_id",
+     "ix_sessoes_interacao_aula_aluno_sessao"),
+    ("análise: agregação de atenção por aluno",
+     "SELECT aluno_id, count(id), sum(fadiga_score) FROM metricas_atencao WHERE aula_id = 1 GROUP BY aluno_id",
+     "ix_metricas_atencao_aula_aluno_timestamp"),
+    ("análise: intervalos de atenção por aluno",
+     "SELECT aluno_id, sum(total_amostras), sum(soma_fadiga) FROM intervalos_atencao WHERE aula_id = 1 "
+     "GROUP BY aluno_id",
+     "ix_intervalos_atencao_aula_aluno_inicio"),
+    ("logs do aluno na aula, mais recentes primeiro",
+     "SELECT * FROM logs_interacao WHERE aluno_id = 1 AND aula_id = 1 ORDER BY timestamp DESC",
+     "ix_logs_interacao_aula_aluno_timestamp"),
+    ("logs do aluno na aula: página seguinte (cursor)",
+     "SELECT * FROM logs_interacao WHERE aluno_id = 1 AND aula_id = 1 AND (timestamp, id) < ('2025-01-01', 1) "
+     "ORDER BY timestamp DESC, id DESC LIMIT 51",
+     "ix_logs_interacao_aula_aluno_timestamp"),
+    ("análise: alunos de maior risco da aula",
+     "SELECT * FROM agregados_engajamento WHERE aula_id = 1 AND risco_evasao >= 40 "
+     "ORDER BY risco_evasao DESC, aluno_id DESC LIMIT 21",
+     "ix_agregados_engajamento_aula_risco"),
+    ("análise: ranking por risco, página seguinte (cursor)",
+     "SELECT * FROM agregados_engajamento WHERE aula_id = 1 AND (risco_evasao, aluno_id) < (70, 10) "
+     "ORDER BY risco_evasao DESC, aluno_id DESC LIMIT 21",
+     "ix_agregados_engajamento_aula_risco"),
+    ("análise: alunos de menor atenção da aula",
+     "SELECT * FROM agregados_engajamento WHERE aula_id = 1 ORDER BY score_atencao, aluno_id LIMIT 21",
+     "ix_agregados_engajamento_aula_score_atencao"),
+    ("linha do tempo da atenção da aula",
+     "SELECT * FROM atencao_aula_intervalos WHERE aula_id = 1 AND inicio >= '2025-01-01' ORDER BY inicio",
+     "sqlite_autoindex_atencao_aula_intervalos_1"),
+    ("intervenções da aula desde o cursor",
+     "SELECT * FROM intervencoes WHERE aula_id = 1 AND (timestamp, id) > ('2025-01-01', 1) "
+     "ORDER BY timestamp, id LIMIT 51",
+     "ix_intervencoes_aula_timestamp"),
+    ("intervenções do aluno na aula desde o cursor",
+     "SELECT * FROM intervencoes WHERE aula_id = 1 AND aluno_id = 1 AND (timestamp, id) > ('2025-01-01', 1) "
+     "ORDER BY timestamp, id LIMIT 51",
+     "ix_intervencoes_aula_aluno_timestamp"),
+    ("mineração: logs da aula",
+     "SELECT * FROM logs_interacao WHERE aula_id = 1",
+     "ix_logs_interacao_aula_aluno_timestamp"),
+    ("quizzes da aula",
+     "SELECT * FROM quizzes WHERE aula_id = 1",
+     "ix_quizzes_aula_criado_em"),
+    ("quizzes da aula criados depois do cursor",
+     "SELECT * FROM quizzes WHERE aula_id = 1 AND (criado_em, id) > ('2025-01-01', 1) ORDER BY criado_em, id LIMIT 51",
+     "ix_quizzes_aula_criado_em"),
+    ("respostas de um quiz",
+     "SELECT * FROM respostas_quiz WHERE quiz_id = 1",
+     "ix_respostas_quiz_quiz_aluno_respondido_em"),
+    ("resumo personalizado do aluno",
+     "SELECT * FROM resumos_personalizados WHERE aluno_id = 1 AND aula_id = 1",
+     "ix_resumos_personalizados_aluno_aula"),
+]
+
+
+def verificar_planos(bind=engine):
+    """
+    Executa EXPLAIN QUERY PLAN (SQLite) em cada consulta principal e
+    retorna as que não usam o índice esperado ou precisam de ordenação
+    em árvore temporária.
+    """
+    problemas = []
+    with bind.connect() as conexao:
+        for descricao, sql, indice in CONSULTAS_VERIFICADAS:
+            plano = [linha[-1] for linha in conexao.execute(text("EXPLAIN QUERY PLAN " + sql))]
+            usa_indice = any(f"INDEX {indice}" in passo for passo in plano)
+            ordena_em_memoria = any("USE TEMP B-TREE" in passo for passo in plano)
+            if not usa_indice or ordena_em_memoria:
+                problemas.append((descricao, indice, plano))
+    return problemas
+
+
+def _status(bind=engine):
+    with Session(bind=bind) as db:
+        concluidas = {m.versao: m for m in db.query(MigracaoSchema)}
+    for versao, descricao, _ in MIGRACOES:
+        migracao = concluidas.get(versao)
+        situacao = f"aplicada em {migracao.aplicada_em:%Y-%m-%d %H:%M}" if migracao else "pendente"
+        remove = f"  [remove dados de {MIGRACOES_REMOVEM_DADOS[versao]}]" if versao in MIGRACOES_REMOVEM_DADOS else ""
+        print(f"{versao:04d}  {situacao:<28}  {descricao}{remove}")
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "aplicar"
+
+    if comando == "aplicar":
+        aplicadas = aplicar_migracoes()
+        if aplicadas:
+            print(f"✅ Migrações aplicadas: {', '.join(str(v) for v in aplicadas)}")
+        else:
+            print("✅ Banco de dados já está atualizado")
+    elif comando == "status":
+        Base.metadata.create_all(bind=engine)
+        _status()
+    elif comando == "verificar-planos":
+        aplicar_migracoes()
+        problemas = verificar_planos()
+        for descricao, indice, plano in problemas:
+            print(f"❌ {descricao}: esperado {indice}, plano: {' | '.join(plano)}")
+        if problemas:
+            sys.exit(1)
+        print(f"✅ {len(CONSULTAS_VERIFICADAS)} consultas usam os índices esperados")
+    else:
+        print("Uso: python migracoes.py [aplicar|status|verificar-planos]")
+        sys.exit(2)
@@ -0,0 +1,65 @@
+"""
+Mineração de dados educacionais por aula (/api/mineracao-dados)
+
+As estatísticas são agregadas no banco (GROUP BY / COUNT DISTINCT / AVG)
+em vez de carregar todos os logs e métricas da aula, e o resultado fica
+em `cache_mineracao` até expirar ou até uma escrita na aula invalidá-lo
+(logs de interação e métricas, inclusive as gravadas pela fila de
+ingestão). Com vários workers, a invalidação chega aos outros processos
+por estado_compartilhado.py.
+"""
+
+import os
+
+from sqlalchemy import func
+
+from agregados import atencao_por_aluno
+from cache import CacheLRU
+from estado_compartilhado import estado_compartilhado
+from models import LogInteracao, SessaoInteracao
+
+
+CACHE_TAMANHO = int(os.getenv("MINERACAO_CACHE_TAMANHO", "256"))  # aulas; 0 desativa
+CACHE_TTL_S = float(os.getenv("MINERACAO_CACHE_TTL_S", "30"))
+
+cache_mineracao = CacheLRU(CACHE_TAMANHO, CACHE_TTL_S)
+estado_compartilhado.registrar("mineracao", cache_mineracao)
+
+
+def calcular_mineracao(db, aula_id):
+    # Padrões de interação: contagem de logs por tipo
+    padroes_interacao = dict(db.query(
+        LogInteracao.tipo_interacao, func.count(LogInteracao.id)
+    ).filter(LogInteracao.aula_id == aula_id).group_by(LogInteracao.tipo_interacao).all())
+
+    total_alunos = db.query(func.count(func.distinct(LogInteracao.aluno_id))).filter(
+        LogInteracao.aula_id == aula_id
+    ).scalar()
+
+    # Métricas de atenção (brutas + compactadas por minuto + intervalos) e interação
+    atencao = atencao_por_aluno(aula_id)
+    total_checks, checks_na_tela, soma_fadiga = db.query(
+        func.sum(atencao.c.total_checks), func.sum(atencao.c.checks_na_tela), func.sum(atencao.c.soma_fadiga)
+    ).one()
+    media_cliques = db.query(func.avg(SessaoInteracao.cliques_materiais)).filter(
+        SessaoInteracao.aula_id == aula_id
+    ).scalar()
+
+    return {
+        "total_alunos": total_alunos,
+        "padroes_interacao": padroes_interacao,
+        "media_atencao": checks_na_tela / total_checks if total_checks else 0,
+        "media_fadiga": soma_fadiga / total_checks if total_checks else 0,
+        "total_interacoes": sum(padroes_interacao.values()),
+        "media_cliques": float(media_cliques) if media_cliques is not None else 0
+    }
+
+
+def obter_mineracao(db, aula_id):
+    return cache_mineracao.obter_ou_calcular(aula_id, lambda: calcular_mineracao(db, aula_id))
+
+
+def invalidar_aulas(aulas):
+    """Descarta o resultado em cache das aulas que receberam escritas (também nos outros workers)"""
+    cache_mineracao.invalidar(*aulas)
+    estado_compartilhado.publicar("mineracao", aulas)
@@ -0,0 +1,203 @@
+"""
+Modelo de risco de evasão configurável
+
+As regras (campo, operador, limite, peso) e o teto do risco são lidos de
+um arquivo JSON (MODELO_RISCO_ARQUIVO) e compilados uma única vez em uma
+função Python com as comparações embutidas. O arquivo é relido quando
+muda (verificado no máximo a cada MODELO_RISCO_RECARGA_S segundos), sem
+reiniciar o backend; um arquivo inválido é ignorado e o modelo anterior
+continua valendo.
+
+Formato:
+    {
+        "nome": "padrao",
+        "maximo": 100,
+        "regras": [
+            {"campo": "score_atencao", "operador": "<", "limite": 50, "peso": 30},
+            ...
+        ]
+    }
+
+Campos disponíveis: score_atencao, media_fadiga, total_cliques,
+total_tempo, desvios_olhar e interrupcoes.
+"""
+
+import hashlib
+import json
+import math
+import operator
+import os
+import threading
+import time
+
+
+ARQUIVO = os.getenv("MODELO_RISCO_ARQUIVO", "./modelo_risco.json")
+RECARGA_S = float(os.getenv("MODELO_RISCO_RECARGA_S", "5"))
+
+CAMPOS = ("score_atencao", "media_fadiga", "total_cliques", "total_tempo", "desvios_olhar", "interrupcoes")
+OPERADORES = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# Limites usados até aqui no backend e no painel
+CONFIGURACAO_PADRAO = {
+    "nome": "padrao",
+    "maximo": 100,
+    "regras": [
+        {"campo": "score_atencao", "operador": "<", "limite": 50, "peso": 30},
+        {"campo": "media_fadiga", "operador": ">", "limite": 0.7, "peso": 25},
+        {"campo": "total_cliques", "operador": "<", "limite": 3, "peso": 25},
+        {"campo": "total_tempo", "operador": "<", "limite": 300, "peso": 20},  # menos de 5 minutos
+    ],
+}
+
+
+class ModeloInvalidoError(ValueError):
+    """Configuração de modelo de risco com campo, operador ou valor inválido"""
+
+
+def _numero(valor, nome):
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        raise ModeloInvalidoError(f"{nome} deve ser numérico: {valor!r}")
+    if not math.isfinite(valor):
+        raise ModeloInvalidoError(f"{nome} deve ser finito: {valor!r}")
+    return float(valor) if isinstance(valor, float) else int(valor)
+
+
+def _literal(valor):
+    """Número validado por _numero como literal Python (sem nan/inf, sem repr de subclasses)"""
+    return repr(float(valor)) if isinstance(valor, float) else repr(int(valor))
+
+
+def _constante_invalida(nome):
+    # json aceita NaN, Infinity e -Infinity, que não são JSON válido
+    raise ModeloInvalidoError(f"Valor não suportado: {nome}")
+
+
+class ModeloRisco:
+    def __init__(self, nome, regras, maximo=100):
+        self.nome = str(nome)
+        self.maximo = _numero(maximo, "maximo")
+        self.regras = []
+        for i, regra in enumerate(regras):
+            if not isinstance(regra, dict):
+                raise ModeloInvalidoError(f"Regra {i}: esperado um objeto, recebido {regra!r}")
+            campo, simbolo = regra.get("campo"), regra.get("operador")
+            if campo not in CAMPOS:
+                raise ModeloInvalidoError(f"Regra {i}: campo desconhecido {campo!r}")
+            if simbolo not in OPERADORES:
+                raise ModeloInvalidoError(f"Regra {i}: operador desconhecido {simbolo!r}")
+            self.regras.append((campo, simbolo, _numero(regra.get("limite"), f"Regra {i}: limite"),
+                                _numero(regra.get("peso"), f"Regra {i}: peso")))
+        self.avaliar = self._compilar()
+        try:
+            # o modelo só substitui o anterior se avaliar funciona
+            self.avaliar(*(0,) * len(CAMPOS))
+        except Exception as e:
+            raise ModeloInvalidoError(f"Modelo {self.nome!r} não avalia: {e}") from e
+        # Identifica as regras (não o nome): riscos gravados com outra assinatura estão desatualizados
+        self.assinatura = hashlib.sha1(json.dumps(
+            [self.maximo, self.regras], sort_keys=True).encode()).hexdigest()[:16]
+
+    @classmethod
+    def de_configuracao(cls, configuracao):
+        if not isinstance(configuracao, dict) or not isinstance(configuracao.get("regras"), list):
+            raise ModeloInvalidoError("Configuração deve ter uma lista 'regras'")
+        return cls(configuracao.get("nome", "sem_nome"), configuracao["regras"],
+                   configuracao.get("maximo", 100))
+
+    @classmethod
+    def de_arquivo(cls, caminho):
+        with open(caminho, encoding="utf-8") as f:
+            try:
+                configuracao = json.load(f, parse_constant=_constante_invalida)
+            except json.JSONDecodeError as e:
+                raise ModeloInvalidoError(f"{caminho}: {e}") from e
+        return cls.de_configuracao(configuracao)
+
+    def configuracao(self):
+        return {
+            "nome": self.nome,
+            "maximo": self.maximo,
+            "regras": [{"campo": c, "operador": o, "limite": l, "peso": p} for c, o, l, p in self.regras],
+        }
+
+    def _compilar(self):
+        """
+        Gera `def avaliar(score_atencao, ...): return min(<soma das regras>, maximo)`.
+        Campos e operadores vêm das listas acima e limites/pesos são
+        números validados, então o código gerado não contém texto do arquivo.
+        """
+        termos = [f"({_literal(peso)} if {campo} {simbolo} {_literal(limite)} else 0)"
+                  for campo, simbolo, limite, peso in self.regras]
+        zero = "0.0" if self.usa_float() else "0"
+        fonte = (f"def avaliar({', '.join(CAMPOS)}):\n"
+                 f"    return min({' + '.join([zero] + termos)}, {_literal(self.maximo)})\n")
+        escopo = {"min": min}
+        exec(compile(fonte, f"<modelo_risco {self.nome}>", "exec"), escopo)
+        return escopo["avaliar"]
+
+    def usa_float(self):
+        """Se o risco é float (algum peso ou o teto é float) em vez de int"""
+        return isinstance(self.maximo, float) or any(isinstance(peso, float) for *_, peso in self.regras)
+
+
+MODELO_PADRAO = ModeloRisco.de_configuracao(CONFIGURACAO_PADRAO)
+
+
+class ModeloConfigurado:
+    """Modelo lido de `arquivo`, recarregado quando o arquivo muda"""
+
+    def __init__(self, arquivo=ARQUIVO, recarga_s=RECARGA_S, relogio=time.monotonic):
+        self.arquivo = arquivo
+        self.recarga_s = recarga_s
+        self.relogio = relogio
+        self.recargas = 0
+        # Chamadas com o modelo novo a cada recarga (não na primeira leitura)
+        self.ao_recarregar = []
+        self._modelo = None
+        self._versao = None
+        self._verificado_em = 0.0
+        self._lock = threading.Lock()
+
+    def atual(self):
+        if self._modelo is not None and self.relogio() - self._verificado_em < self.recarga_s:
+            return self._modelo
+        with self._lock:
+            self._verificar()
+            return self._modelo
+
+    def _verificar(self):
+        self._verificado_em = self.relogio()
+        try:
+            estado = os.stat(self.arquivo)
+            versao = (estado.st_mtime_ns, estado.st_size)
+        except FileNotFoundError:
+            versao = None
+        if self._modelo is not None and versao == self._versao:
+            return
+
+        recarregado = False
+        try:
+            modelo = ModeloRisco.de_arquivo(self.arquivo) if versao else MODELO_PADRAO
+        except (OSError, ModeloInvalidoError) as e:
+            print(f"❌ Modelo de risco em {self.arquivo} ignorado: {e}")
+            modelo = self._modelo or MODELO_PADRAO
+        else:
+            if self._modelo is not None:
+                print(f"✅ Modelo de risco recarregado: {modelo.nome}")
+                self.recargas += 1
+                recarregado = modelo is not self._modelo
+        self._modelo = modelo
+        self._versao = versao
+        if recarregado:
+            for funcao in self.ao_recarregar:
+                try:
+                    funcao(modelo)
+                except Exception as e:
+                    print(f"❌ Erro após recarregar o modelo de risco: {e}")
+
+
+modelo_configurado = ModeloConfigurado()
+
+
+def modelo_atual():
+    return modelo_configurado.atual()
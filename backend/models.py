@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -37,6 +37,9 @@ class Aula(Base):
 
 class MetricaInteracao(Base):
     __tablename__ = "metricas_interacao"
+    __table_args__ = (
+        Index("ix_metricas_interacao_aula_aluno_timestamp", "aula_id", "aluno_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     aluno_id = Column(Integer, ForeignKey("alunos.id"))
@@ -52,6 +55,9 @@ class MetricaInteracao(Base):
 
 class MetricaAtencao(Base):
     __tablename__ = "metricas_atencao"
+    __table_args__ = (
+        Index("ix_metricas_atencao_aula_aluno_timestamp", "aula_id", "aluno_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     aluno_id = Column(Integer, ForeignKey("alunos.id"))
@@ -67,6 +73,9 @@ class MetricaAtencao(Base):
 
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        Index("ix_quizzes_aula_criado_em", "aula_id", "criado_em"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     aula_id = Column(Integer, ForeignKey("aulas.id"))
@@ -80,6 +89,10 @@ class Quiz(Base):
 
 class RespostaQuiz(Base):
     __tablename__ = "respostas_quiz"
+    __table_args__ = (
+        Index("ix_respostas_quiz_quiz_aluno_respondido_em", "quiz_id", "aluno_id", "respondido_em"),
+        Index("ix_respostas_quiz_aluno", "aluno_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
@@ -94,6 +107,9 @@ class RespostaQuiz(Base):
 
 class ResumoPersonalizado(Base):
     __tablename__ = "resumos_personalizados"
+    __table_args__ = (
+        Index("ix_resumos_personalizados_aluno_aula", "aluno_id", "aula_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     aluno_id = Column(Integer, ForeignKey("alunos.id"))
@@ -110,6 +126,9 @@ class ResumoPersonalizado(Base):
 
 class LogInteracao(Base):
     __tablename__ = "logs_interacao"
+    __table_args__ = (
+        Index("ix_logs_interacao_aula_aluno_timestamp", "aula_id", "aluno_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     aluno_id = Column(Integer, ForeignKey("alunos.id"))
@@ -122,3 +141,172 @@ class LogInteracao(Base):
     aula = relationship("Aula")
 
 
+
+class AgregadoEngajamento(Base):
+    __tablename__ = "agregados_engajamento"
+    __table_args__ = (
+        # Ranking por aula (consultas com limite em /api/analise)
+        Index("ix_agregados_engajamento_aula_risco", "aula_id", "risco_evasao", "aluno_id"),
+        Index("ix_agregados_engajamento_aula_score_atencao", "aula_id", "score_atencao", "aluno_id"),
+    )
+
+    aula_id = Column(Integer, ForeignKey("aulas.id"), primary_key=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"), primary_key=True)
+    total_checks = Column(Integer, default=0)  # amostras de atenção
+    checks_na_tela = Column(Integer, default=0)  # amostras com gaze_na_tela
+    soma_fadiga = Column(Float, default=0.0)
+    soma_desvios = Column(Integer, default=0)
+    soma_interrupcoes = Column(Integer, default=0)
+    total_tempo = Column(Integer, default=0)  # soma de tempo_permanencia
+    total_cliques = Column(Integer, default=0)  # soma de cliques_materiais
+    ultimo_tempo_permanencia = Column(Integer)  # snapshot da última interação
+    ultimos_cliques = Column(Integer)
+    ultimos_eventos_player = Column(JSON)
+    ultima_interacao_em = Column(DateTime)
+    sessao_atual = Column(String(64))  # sessão do snapshot acima
+    score_atencao = Column(Float)  # calculados das somas acima a cada gravação
+    risco_evasao = Column(Float)
+    modelo_risco = Column(String(16))  # assinatura do modelo que calculou risco_evasao
+
+    aluno = relationship("Aluno")
+    aula = relationship("Aula")
+
+class SessaoInteracao(Base):
+    """Uma linha por carregamento da aula pelo aluno, com os contadores mais recentes"""
+    __tablename__ = "sessoes_interacao"
+    __table_args__ = (
+        Index("ix_sessoes_interacao_aula_aluno_sessao", "aula_id", "aluno_id", "sessao_chave", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"))
+    aula_id = Column(Integer, ForeignKey("aulas.id"))
+    sessao_chave = Column(String(64))
+    tempo_permanencia = Column(Integer)  # em segundos, desde o início da sessão
+    eventos_player = Column(JSON)
+    cliques_materiais = Column(Integer)
+    conteudo_anotacoes = Column(Text)
+    iniciada_em = Column(DateTime, default=datetime.now)
+    atualizada_em = Column(DateTime, default=datetime.now)
+
+    aluno = relationship("Aluno")
+    aula = relationship("Aula")
+
+class MetricaAtencaoMinuto(Base):
+    """Amostras de atenção antigas compactadas por minuto (ver retencao.py)"""
+    __tablename__ = "metricas_atencao_minuto"
+
+    aula_id = Column(Integer, ForeignKey("aulas.id"), primary_key=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"), primary_key=True)
+    minuto = Column(DateTime, primary_key=True)  # início do minuto
+    total_amostras = Column(Integer, default=0)
+    amostras_na_tela = Column(Integer, default=0)
+    soma_fadiga = Column(Float, default=0.0)  # média = soma_fadiga / total_amostras
+    max_fadiga = Column(Float, default=0.0)
+    soma_desvios = Column(Integer, default=0)
+    soma_interrupcoes = Column(Integer, default=0)
+
+class IntervaloAtencao(Base):
+    """Amostras de atenção consecutivas no mesmo estado, gravadas como uma linha (ver intervalos_atencao.py)"""
+    __tablename__ = "intervalos_atencao"
+    __table_args__ = (
+        Index("ix_intervalos_atencao_aula_aluno_inicio", "aula_id", "aluno_id", "inicio"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"))
+    aula_id = Column(Integer, ForeignKey("aulas.id"))
+    inicio = Column(DateTime)  # timestamp da primeira amostra
+    fim = Column(DateTime)  # timestamp da última amostra
+    gaze_na_tela = Column(Boolean)  # estado comum a todas as amostras
+    desvio_olhar = Column(Integer)
+    interrupcoes = Column(Integer)
+    total_amostras = Column(Integer, default=0)
+    soma_fadiga = Column(Float, default=0.0)  # média = soma_fadiga / total_amostras
+    fadiga_inicial = Column(Float)  # fadiga da primeira amostra, referência da tolerância
+
+class AtencaoAulaIntervalo(Base):
+    """Somas de atenção da turma por intervalo de LINHA_TEMPO_BASE_S segundos (ver linha_tempo.py)"""
+    __tablename__ = "atencao_aula_intervalos"
+
+    aula_id = Column(Integer, ForeignKey("aulas.id"), primary_key=True)
+    inicio = Column(DateTime, primary_key=True)  # início do intervalo
+    total_amostras = Column(Integer, default=0)
+    amostras_na_tela = Column(Integer, default=0)
+    soma_fadiga = Column(Float, default=0.0)
+    alunos_ativos = Column(Integer, default=0)  # alunos com ao menos uma amostra no intervalo
+
+class PresencaAtencaoIntervalo(Base):
+    """Alunos já contados em alunos_ativos de cada intervalo"""
+    __tablename__ = "presencas_atencao_intervalo"
+
+    aula_id = Column(Integer, ForeignKey("aulas.id"), primary_key=True)
+    inicio = Column(DateTime, primary_key=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"), primary_key=True)
+
+class Intervencao(Base):
+    """Intervenção disparada pelo motor de regras sobre as amostras recebidas (ver intervencoes.py)"""
+    __tablename__ = "intervencoes"
+    __table_args__ = (
+        Index("ix_intervencoes_aula_timestamp", "aula_id", "timestamp"),
+        Index("ix_intervencoes_aula_aluno_timestamp", "aula_id", "aluno_id", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"))
+    aula_id = Column(Integer, ForeignKey("aulas.id"))
+    tipo = Column(String(32))  # attention, fatigue, interaction
+    mensagem = Column(Text)
+    valor = Column(Float)  # medida que disparou a regra (fração fora da tela, fadiga média, interações)
+    timestamp = Column(DateTime, default=datetime.now)  # momento da amostra que disparou
+
+class JanelaIntervencao(Base):
+    """Janela de amostras e cooldowns de um aluno, com vários workers (ver intervencoes.py)"""
+    __tablename__ = "janelas_intervencao"
+
+    aula_id = Column(Integer, ForeignKey("aulas.id"), primary_key=True)
+    aluno_id = Column(Integer, ForeignKey("alunos.id"), primary_key=True)
+    fora = Column(LargeBinary)  # buffer circular: 1 byte por amostra, 1 = olhar fora da tela
+    fadiga = Column(LargeBinary)  # buffer circular: fadiga em milésimos, uint16
+    posicao = Column(Integer, default=0)
+    tamanho = Column(Integer, default=0)
+    ultima = Column(DateTime)  # timestamp da amostra mais recente
+    liberado_attention = Column(DateTime)  # fim do cooldown de cada tipo
+    liberado_fatigue = Column(DateTime)
+    liberado_interaction = Column(DateTime)
+
+class ResultadoQuiz(Base):
+    """Totais das respostas de um quiz, mantidos a cada resposta gravada"""
+    __tablename__ = "resultados_quiz"
+
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    total_respostas = Column(Integer, default=0)
+    soma_pontuacao = Column(Float, default=0.0)
+
+class EstatisticaQuiz(Base):
+    """Quantas respostas escolheram cada opção de cada pergunta (ver estatisticas_quiz.py)"""
+    __tablename__ = "estatisticas_quiz"
+
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    pergunta_id = Column(String(255), primary_key=True)
+    opcao = Column(String(255), primary_key=True)  # resposta do aluno em JSON
+    respostas = Column(Integer, default=0)
+
+class VersaoCompartilhada(Base):
+    """Versão de cada chave de cache, para invalidar os caches dos outros workers (ver estado_compartilhado.py)"""
+    __tablename__ = "versoes_compartilhadas"
+    __table_args__ = (
+        Index("ix_versoes_compartilhadas_atualizada_em", "atualizada_em"),
+    )
+
+    escopo = Column(String(32), primary_key=True)
+    chave = Column(String(64), primary_key=True)
+    versao = Column(Integer, default=0)
+    atualizada_em = Column(DateTime, default=datetime.now)
+
+class MigracaoSchema(Base):
+    __tablename__ = "schema_migracoes"
+
+    versao = Column(Integer, primary_key=True)
+    descricao = Column(String(255))
+    aplicada_em = Column(DateTime, default=datetime.now)
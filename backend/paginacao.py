@@ -0,0 +1,124 @@
+"""
+Paginação por cursor (keyset) das listagens
+
+Em vez de OFFSET, cada página continua a partir da chave de ordenação do
+último item entregue, ex.: (timestamp, id) — a consulta usa o índice e o
+custo de uma página não depende de quantas vieram antes, nem pula ou
+repete itens quando chegam linhas novas. O cursor é opaco para o cliente.
+
+Resposta:
+    {"itens": [...], "proximo_cursor": "..." | null, "cursor_recente": "..." | null}
+
+`proximo_cursor` pede a página seguinte (null na última). `cursor_recente`
+é a chave do item mais novo visto; passado de volta como `desde`, traz só
+o que foi criado depois (atualização incremental).
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+
+from sqlalchemy import DateTime, tuple_
+
+
+LIMITE_PADRAO = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "50"))
+LIMITE_MAXIMO = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "200"))
+
+
+class CursorInvalidoError(ValueError):
+    """Cursor que não foi gerado por esta listagem"""
+
+
+def _codificar(dados):
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip("=")
+
+
+def _decodificar(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise CursorInvalidoError(f"Cursor inválido: {cursor}")
+
+
+def _serializar(valores):
+    return [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+
+
+def _valores(serializados, colunas):
+    """Chave serializada -> valores comparáveis com as colunas"""
+    if not isinstance(serializados, list) or len(serializados) != len(colunas):
+        raise CursorInvalidoError("Cursor não corresponde a esta listagem")
+    try:
+        return [
+            datetime.fromisoformat(v) if isinstance(coluna.type, DateTime) and v is not None else v
+            for v, coluna in zip(serializados, colunas)
+        ]
+    except (ValueError, TypeError):
+        raise CursorInvalidoError("Cursor não corresponde a esta listagem")
+
+
+def paginar(query, colunas, limite=None, cursor=None, desde=None, decrescente=False):
+    """
+    Uma página de `query` (ORM) ordenada pela chave `colunas`, que deve ser
+    única (terminar no id). Levanta CursorInvalidoError para cursores
+    malformados. Retorna o dict de resposta com os objetos em `itens`.
+    """
+    limite = min(limite or LIMITE_PADRAO, LIMITE_MAXIMO)
+    chave = tuple_(*colunas)
+
+    recente = None
+    if desde is not None:
+        recente = _decodificar(desde)
+        query = query.filter(chave > tuple_(*_valores(recente, colunas)))
+    if cursor is not None:
+        dados = _decodificar(cursor)
+        if not isinstance(dados, dict):
+            raise CursorInvalidoError(f"Cursor inválido: {cursor}")
+        posicao = tuple_(*_valores(dados.get("apos"), colunas))
+        query = query.filter(chave < posicao if decrescente else chave > posicao)
+        # o item mais novo da listagem veio na primeira página
+        recente = dados.get("recente") or recente
+
+    ordem = [c.desc() if decrescente else c.asc() for c in colunas]
+    itens = query.order_by(*ordem).limit(limite + 1).all()
+    mais = len(itens) > limite
+    itens = itens[:limite]
+
+    def chave_de(item):
+        return _serializar(getattr(item, c.key) for c in colunas)
+
+    if itens and not (decrescente and cursor is not None):
+        recente = chave_de(itens[0] if decrescente else itens[-1])
+
+    return {
+        "itens": itens,
+        "proximo_cursor": _codificar({"apos": chave_de(itens[-1]), "recente": recente}) if mais else None,
+        "cursor_recente": _codificar(recente) if recente is not None else None,
+    }
+
+
+def paginar_lista(itens, chave, limite=None, cursor=None, decrescente=False):
+    """
+    Mesma página e mesmo cursor de paginar, sobre uma lista já calculada:
+    `chave(item)` devolve a tupla de ordenação (única, terminando no id).
+    Para listagens cuja ordem no banco ainda não vale, ex.: o ranking
+    enquanto os riscos gravados são de outro modelo.
+    """
+    limite = min(limite or LIMITE_PADRAO, LIMITE_MAXIMO)
+    itens = sorted(itens, key=chave, reverse=decrescente)
+    if cursor is not None:
+        dados = _decodificar(cursor)
+        apos = dados.get("apos") if isinstance(dados, dict) else None
+        if not isinstance(apos, list) or (itens and len(apos) != len(chave(itens[0]))):
+            raise CursorInvalidoError(f"Cursor inválido: {cursor}")
+        try:
+            itens = [i for i in itens if (chave(i) < tuple(apos) if decrescente else chave(i) > tuple(apos))]
+        except TypeError:
+            raise CursorInvalidoError("Cursor não corresponde a esta listagem")
+    mais = len(itens) > limite
+    itens = itens[:limite]
+    return {
+        "itens": itens,
+        "proximo_cursor": _codificar({"apos": _serializar(chave(itens[-1])), "recente": None}) if mais else None,
+    }
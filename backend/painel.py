@@ -0,0 +1,133 @@
+"""
+Difusão da análise da turma para os painéis dos docentes (WebSocket)
+
+Em vez de cada painel consultar /api/analise a cada 3 segundos, o backend
+calcula a análise de cada aula uma vez por intervalo, independente de
+quantos docentes estejam assistindo, e envia a todos os inscritos apenas
+os alunos que mudaram desde o último envio.
+
+Mensagens enviadas ao cliente:
+    {"tipo": "snapshot", "aula_id": 1, "alunos": [...]}
+    {"tipo": "delta", "aula_id": 1, "alterados": [...], "removidos": [aluno_id, ...]}
+"""
+
+import asyncio
+import json
+import os
+
+from starlette.concurrency import run_in_threadpool
+
+from agregados import calcular_analise
+from database import SessionLocal
+
+
+INTERVALO_S = float(os.getenv("PAINEL_INTERVALO_S", "2.0"))
+TIMEOUT_ENVIO_S = float(os.getenv("PAINEL_TIMEOUT_ENVIO_S", "5.0"))
+
+
+def _calcular(aula_id):
+    db = SessionLocal()
+    try:
+        return calcular_analise(db, aula_id)
+    finally:
+        db.close()
+
+
+class _Canal:
+    """Estado de uma aula: inscritos, último snapshot e tarefa de atualização"""
+
+    def __init__(self):
+        self.inscritos = set()
+        self.alunos = None  # {aluno_id: resultado}
+        self.lock = asyncio.Lock()
+        self.tarefa = None
+
+
+class DifusorAnalise:
+    def __init__(self, calcular=_calcular, intervalo=INTERVALO_S):
+        self.calcular = calcular
+        self.intervalo = intervalo
+        self._canais = {}
+
+    def inscritos(self, aula_id=None):
+        """Inscritos na aula, ou em todas as aulas se aula_id for None"""
+        if aula_id is None:
+            return sum(len(canal.inscritos) for canal in self._canais.values())
+        canal = self._canais.get(aula_id)
+        return len(canal.inscritos) if canal else 0
+
+    async def assinar(self, aula_id, websocket):
+        """Envia o snapshot atual e passa a enviar deltas para o websocket"""
+        canal = self._canais.get(aula_id)
+        if canal is None:
+            canal = self._canais[aula_id] = _Canal()
+
+        async with canal.lock:
+            if canal.alunos is None:
+                resultados = await run_in_threadpool(self.calcular, aula_id)
+                canal.alunos = {r["aluno_id"]: r for r in resultados}
+            await websocket.send_text(json.dumps({
+                "tipo": "snapshot",
+                "aula_id": aula_id,
+                "alunos": _ordenar(canal.alunos.values())
+            }))
+            canal.inscritos.add(websocket)
+
+        if canal.tarefa is None or canal.tarefa.done():
+            canal.tarefa = asyncio.create_task(self._atualizar(aula_id, canal))
+
+    def cancelar(self, aula_id, websocket):
+        canal = self._canais.get(aula_id)
+        if canal is None:
+            return
+        canal.inscritos.discard(websocket)
+        if not canal.inscritos:
+            if canal.tarefa:
+                canal.tarefa.cancel()
+            del self._canais[aula_id]
+
+    async def encerrar(self):
+        tarefas = [c.tarefa for c in self._canais.values() if c.tarefa]
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self._canais.clear()
+
+    async def _atualizar(self, aula_id, canal):
+        while canal.inscritos:
+            await asyncio.sleep(self.intervalo)
+            resultados = await run_in_threadpool(self.calcular, aula_id)
+            atuais = {r["aluno_id"]: r for r in resultados}
+
+            async with canal.lock:
+                alterados = [r for aluno_id, r in atuais.items() if canal.alunos.get(aluno_id) != r]
+                removidos = [aluno_id for aluno_id in canal.alunos if aluno_id not in atuais]
+                canal.alunos = atuais
+                if not alterados and not removidos:
+                    continue
+
+                # Serializa uma única vez para todos os inscritos
+                mensagem = json.dumps({
+                    "tipo": "delta",
+                    "aula_id": aula_id,
+                    "alterados": alterados,
+                    "removidos": removidos
+                })
+                inscritos = list(canal.inscritos)
+                envios = await asyncio.gather(
+                    *(asyncio.wait_for(ws.send_text(mensagem), TIMEOUT_ENVIO_S) for ws in inscritos),
+                    return_exceptions=True
+                )
+                for ws, envio in zip(inscritos, envios):
+                    if isinstance(envio, BaseException):
+                        canal.inscritos.discard(ws)
+
+        if self._canais.get(aula_id) is canal and not canal.inscritos:
+            del self._canais[aula_id]
+
+
+def _ordenar(resultados):
+    return sorted(resultados, key=lambda x: x["risco_evasao"], reverse=True)
+
+
+difusor_analise = DifusorAnalise()
@@ -0,0 +1,98 @@
+"""
+Correção de quizzes com o gabarito em memória
+
+Quando o docente lança um quiz, a turma inteira responde em poucos
+segundos. O gabarito de cada quiz é lido do banco uma vez e mantido em
+`cache_gabaritos`; a correção das respostas seguintes não consulta o
+banco, e as respostas corrigidas são gravadas em lote pela fila de
+ingestão. Inserir, alterar ou remover um Quiz pelo ORM invalida o
+gabarito depois do commit, também nos outros workers quando há vários
+(estado_compartilhado.py); alterações feitas fora do ORM valem a partir
+da expiração (GABARITO_CACHE_TTL_S).
+"""
+
+import os
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from cache import CacheLRU
+from estado_compartilhado import estado_compartilhado
+from models import Quiz
+
+
+GABARITO_CACHE_TAMANHO = int(os.getenv("GABARITO_CACHE_TAMANHO", "1024"))  # quizzes; 0 desativa
+GABARITO_CACHE_TTL_S = float(os.getenv("GABARITO_CACHE_TTL_S", "300"))
+
+
+class Gabarito:
+    """Respostas certas de um quiz, prontas para corrigir"""
+
+    __slots__ = ("quiz_id", "respostas_certas", "total_perguntas")
+
+    def __init__(self, quiz_id, respostas_certas):
+        self.quiz_id = quiz_id
+        self.respostas_certas = dict(respostas_certas or {})
+        self.total_perguntas = len(self.respostas_certas)
+
+    def corrigir(self, respostas):
+        """Pontuação (0 a 100) das respostas do aluno"""
+        if not self.total_perguntas:
+            return 0
+        certas = self.respostas_certas
+        acertos = sum(1 for pergunta_id, resposta in respostas.items()
+                      if pergunta_id in certas and certas[pergunta_id] == resposta)
+        return (acertos / self.total_perguntas) * 100
+
+
+cache_gabaritos = CacheLRU(GABARITO_CACHE_TAMANHO, GABARITO_CACHE_TTL_S)
+estado_compartilhado.registrar("gabaritos", cache_gabaritos)
+
+
+def _carregar_gabarito(db, quiz_id):
+    respostas_certas = db.query(Quiz.respostas_certas).filter(Quiz.id == quiz_id).scalar()
+    if respostas_certas is None:
+        return None
+    return Gabarito(quiz_id, respostas_certas)
+
+
+def obter_gabarito(db, quiz_id):
+    """Gabarito do quiz (do cache quando possível), ou None se o quiz não existe"""
+    return cache_gabaritos.obter_ou_calcular(quiz_id, lambda: _carregar_gabarito(db, quiz_id))
+
+
+def linha_resposta_quiz(resposta, gabarito, timestamp=None):
+    return {
+        "quiz_id": resposta.quiz_id,
+        "aluno_id": resposta.aluno_id,
+        "respostas": resposta.respostas,
+        "pontuacao": gabarito.corrigir(resposta.respostas),
+        "tempo_resposta": resposta.tempo_resposta,
+        "respondido_em": timestamp or datetime.now(),
+    }
+
+
+# Invalidação: os ids alterados são guardados na sessão durante o flush e
+# descartados do cache só depois do commit, para que uma leitura
+# concorrente não volte a guardar o gabarito antigo.
+@event.listens_for(Quiz, "after_insert")
+@event.listens_for(Quiz, "after_update")
+@event.listens_for(Quiz, "after_delete")
+def _marcar_quiz_alterado(mapper, conexao, quiz):
+    sessao = object_session(quiz)
+    if sessao is not None:
+        sessao.info.setdefault("quizzes_alterados", set()).add(quiz.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_gabaritos(sessao):
+    alterados = sessao.info.pop("quizzes_alterados", None)
+    if alterados:
+        cache_gabaritos.invalidar(*alterados)
+        estado_compartilhado.publicar("gabaritos", alterados)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_alterados(sessao):
+    sessao.info.pop("quizzes_alterados", None)
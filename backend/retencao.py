@@ -0,0 +1,196 @@
+"""
+Retenção das amostras brutas de atenção
+
+`metricas_atencao` recebe uma linha por aluno a cada 2 segundos e ninguém
+lê essas amostras individualmente depois da aula. A compactação soma as
+amostras mais antigas que RETENCAO_ATENCAO_DIAS em baldes de um minuto
+por (aula, aluno) em `metricas_atencao_minuto` e remove as linhas brutas.
+Com ATENCAO_INTERVALOS=1 as amostras chegam em `intervalos_atencao`: os
+intervalos encerrados antes do limite entram nos mesmos baldes, com as
+amostras reconstruídas (fadiga média, igualmente espaçadas), e também são
+removidos. As presenças da linha do tempo (`presencas_atencao_intervalo`)
+anteriores ao limite são removidas em todas as aulas. A análise da turma e
+a mineração de dados leem as tabelas juntas (ver
+agregados.atencao_por_aluno), então o resultado não muda.
+
+Uso via linha de comando (a partir de backend/):
+    python retencao.py compactar [dias] [--vacuum]
+    python retencao.py status
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, case, func, select, text, type_coerce
+
+from database import SessionLocal, engine, insert_com_conflito
+from estado_compartilhado import trava
+from intervalos_atencao import amostras_reconstruidas
+from models import IntervaloAtencao, MetricaAtencao, MetricaAtencaoMinuto, PresencaAtencaoIntervalo
+
+
+RETENCAO_DIAS = float(os.getenv("RETENCAO_ATENCAO_DIAS", "30"))
+# Intervalo da compactação periódica no backend; 0 = só pela linha de comando
+INTERVALO_H = float(os.getenv("RETENCAO_INTERVALO_H", "0"))
+
+COLUNAS_SOMA = ("total_amostras", "amostras_na_tela", "soma_fadiga", "soma_desvios", "soma_interrupcoes")
+TAMANHO_LOTE = 5000
+
+
+def _minuto(db, coluna):
+    """Expressão que trunca um DateTime para o início do minuto"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("minute", coluna)
+    return type_coerce(func.strftime("%Y-%m-%d %H:%M:00", coluna), DateTime)
+
+
+def _upsert_minutos(db, linhas):
+    stmt = insert_com_conflito(db, MetricaAtencaoMinuto)
+    set_ = {c: getattr(MetricaAtencaoMinuto, c) + stmt.excluded[c] for c in COLUNAS_SOMA}
+    set_["max_fadiga"] = case(
+        (MetricaAtencaoMinuto.max_fadiga >= stmt.excluded.max_fadiga, MetricaAtencaoMinuto.max_fadiga),
+        else_=stmt.excluded.max_fadiga
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MetricaAtencaoMinuto.aula_id, MetricaAtencaoMinuto.aluno_id, MetricaAtencaoMinuto.minuto],
+        set_=set_
+    )
+    db.execute(stmt, linhas)
+
+
+def _somar_intervalos(db, baldes, filtro):
+    """Acumula em `baldes` as amostras reconstruídas dos intervalos; retorna quantas"""
+    amostras = 0
+    resultado = db.execute(select(IntervaloAtencao).where(*filtro).execution_options(yield_per=TAMANHO_LOTE))
+    for intervalo in resultado.scalars():
+        for m in amostras_reconstruidas(intervalo):
+            chave = (m["aula_id"], m["aluno_id"], m["timestamp"].replace(second=0, microsecond=0))
+            b = baldes.get(chave)
+            if b is None:
+                b = baldes[chave] = dict(zip(("aula_id", "aluno_id", "minuto"), chave),
+                                         **{c: 0 for c in COLUNAS_SOMA}, max_fadiga=0.0)
+            b["total_amostras"] += 1
+            b["amostras_na_tela"] += 1 if m["gaze_na_tela"] else 0
+            b["soma_fadiga"] += m["fadiga_score"]
+            b["soma_desvios"] += m["desvio_olhar"] or 0
+            b["soma_interrupcoes"] += m["interrupcoes"] or 0
+            b["max_fadiga"] = max(b["max_fadiga"], m["fadiga_score"])
+        amostras += intervalo.total_amostras
+    return amostras
+
+
+def compactar_atencao(db, dias=RETENCAO_DIAS, agora=None):
+    """
+    Compacta as amostras de atenção anteriores a `dias` atrás (alinhado ao
+    minuto), brutas ou em intervalos encerrados antes disso, e remove as
+    linhas originais e as presenças da linha do tempo. Faz um commit por
+    aula, para não segurar o lock de escrita do SQLite durante toda a
+    compactação. Retorna (baldes gravados, amostras removidas).
+    """
+    limite = (agora or datetime.now()) - timedelta(days=dias)
+    limite = limite.replace(second=0, microsecond=0)
+
+    aulas = {a for (a,) in db.query(MetricaAtencao.aula_id).filter(MetricaAtencao.timestamp < limite).distinct()}
+    aulas |= {a for (a,) in db.query(IntervaloAtencao.aula_id).filter(IntervaloAtencao.fim < limite).distinct()}
+    aulas |= {a for (a,) in db.query(PresencaAtencaoIntervalo.aula_id).filter(
+        PresencaAtencaoIntervalo.inicio < limite).distinct()}
+
+    total_baldes = 0
+    total_removidas = 0
+    for aula in sorted(aulas):
+        filtro = (MetricaAtencao.aula_id == aula, MetricaAtencao.timestamp < limite)
+        filtro_intervalos = (IntervaloAtencao.aula_id == aula, IntervaloAtencao.fim < limite)
+        minuto = _minuto(db, MetricaAtencao.timestamp)
+        baldes = db.execute(
+            select(
+                MetricaAtencao.aula_id,
+                MetricaAtencao.aluno_id,
+                minuto,
+                func.count(MetricaAtencao.id),
+                func.sum(case((MetricaAtencao.gaze_na_tela, 1), else_=0)),
+                func.coalesce(func.sum(MetricaAtencao.fadiga_score), 0.0),
+                func.coalesce(func.sum(MetricaAtencao.desvio_olhar), 0),
+                func.coalesce(func.sum(MetricaAtencao.interrupcoes), 0),
+                func.coalesce(func.max(MetricaAtencao.fadiga_score), 0.0),
+            ).where(*filtro).group_by(MetricaAtencao.aula_id, MetricaAtencao.aluno_id, minuto)
+        ).all()
+
+        # uma linha por balde: o upsert em lote não pode tocar o mesmo balde duas vezes
+        linhas = {
+            balde[:3]: dict(zip(("aula_id", "aluno_id", "minuto") + COLUNAS_SOMA + ("max_fadiga",), balde))
+            for balde in baldes
+        }
+        try:
+            removidas = _somar_intervalos(db, linhas, filtro_intervalos)
+            linhas = list(linhas.values())
+            for inicio in range(0, len(linhas), TAMANHO_LOTE):
+                _upsert_minutos(db, linhas[inicio:inicio + TAMANHO_LOTE])
+            removidas += db.query(MetricaAtencao).filter(*filtro).delete(synchronize_session=False)
+            db.query(IntervaloAtencao).filter(*filtro_intervalos).delete(synchronize_session=False)
+            # só servem para não contar duas vezes um aluno em alunos_ativos (linha_tempo.py)
+            db.query(PresencaAtencaoIntervalo).filter(
+                PresencaAtencaoIntervalo.aula_id == aula, PresencaAtencaoIntervalo.inicio < limite
+            ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        total_baldes += len(linhas)
+        total_removidas += removidas
+    return total_baldes, total_removidas
+
+
+def executar_compactacao(dias=RETENCAO_DIAS):
+    """Compacta em uma sessão própria; retorna None se outro processo já está compactando"""
+    with trava("retencao", bloquear=False) as obtida:
+        if not obtida:
+            return None
+        db = SessionLocal()
+        try:
+            return compactar_atencao(db, dias)
+        finally:
+            db.close()
+
+
+def _status():
+    with engine.connect() as conexao:
+        brutas = conexao.execute(select(func.count(MetricaAtencao.id), func.min(MetricaAtencao.timestamp))).one()
+        intervalos = conexao.execute(select(
+            func.count(IntervaloAtencao.id), func.sum(IntervaloAtencao.total_amostras), func.min(IntervaloAtencao.inicio)
+        )).one()
+        presencas = conexao.execute(select(func.count()).select_from(PresencaAtencaoIntervalo)).scalar()
+        baldes = conexao.execute(select(
+            func.count(), func.sum(MetricaAtencaoMinuto.total_amostras), func.max(MetricaAtencaoMinuto.minuto)
+        ).select_from(MetricaAtencaoMinuto)).one()
+    print(f"metricas_atencao:            {brutas[0]} amostras, mais antiga em {brutas[1]}")
+    print(f"intervalos_atencao:          {intervalos[0]} intervalos ({intervalos[1] or 0} amostras), "
+          f"mais antigo em {intervalos[2]}")
+    print(f"presencas_atencao_intervalo: {presencas} linhas")
+    print(f"metricas_atencao_minuto:     {baldes[0]} baldes ({baldes[1] or 0} amostras), até {baldes[2]}")
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    comando = argumentos[0] if argumentos else "status"
+
+    from migracoes import aplicar_migracoes
+    aplicar_migracoes()
+
+    if comando == "compactar":
+        dias = float(argumentos[1]) if len(argumentos) > 1 else RETENCAO_DIAS
+        resultado = executar_compactacao(dias)
+        if resultado is None:
+            print("❌ Outro processo está compactando as métricas de atenção")
+            sys.exit(1)
+        baldes, removidas = resultado
+        print(f"✅ {removidas} amostras com mais de {dias:g} dias compactadas em {baldes} baldes de 1 minuto")
+        if "--vacuum" in sys.argv:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+                conexao.execute(text("VACUUM"))
+            print("✅ VACUUM concluído")
+    elif comando == "status":
+        _status()
+    else:
+        print("Uso: python retencao.py [compactar [dias] [--vacuum]|status]")
+        sys.exit(2)
@@ -0,0 +1,219 @@
+"""
+Sessões de interação
+
+O StudentView envia a cada 2 segundos contadores acumulados desde o
+carregamento da página (`tempo_permanencia`, `cliques_materiais`). Somar
+todas essas amostras conta o mesmo tempo várias vezes e faz a tabela
+crescer sem limite. Aqui cada carregamento da página é uma sessão: uma
+linha em `sessoes_interacao` com os contadores mais recentes, atualizada
+a cada amostra, e `metricas_interacao` passa a receber apenas checkpoints
+periódicos. Os agregados recebem só a diferença em relação ao valor
+anterior da sessão, de modo que o total por aluno é a soma do último
+valor de cada sessão.
+"""
+
+import os
+import uuid
+
+from sqlalchemy import insert, tuple_
+
+from agregados import aplicar_interacao
+from database import insert_com_conflito, travar_escrita
+from models import AgregadoEngajamento, MetricaInteracao, SessaoInteracao
+
+
+# Intervalo (em tempo de sessão) entre checkpoints gravados em
+# metricas_interacao; 0 desativa os checkpoints
+CHECKPOINT_S = int(os.getenv("INTERACAO_CHECKPOINT_S", "60"))
+
+COLUNAS_CHECKPOINT = ("aluno_id", "aula_id", "tempo_permanencia", "eventos_player",
+                      "cliques_materiais", "conteudo_anotacoes", "timestamp")
+
+
+def _nova_chave():
+    return uuid.uuid4().hex
+
+
+def _cruza_checkpoint(anterior, atual):
+    return CHECKPOINT_S > 0 and atual // CHECKPOINT_S > anterior // CHECKPOINT_S
+
+
+def registrar_interacoes(db, linhas):
+    """
+    Aplica amostras de interação (dicts de `linha_interacao`, com
+    `sessao_chave` opcional) na ordem recebida: atualiza as sessões, grava
+    checkpoints e acumula os agregados, sem fazer commit. Retorna a chave
+    de sessão atribuída a cada amostra.
+
+    Sem `sessao_chave`, a amostra continua a sessão atual do aluno, a não
+    ser que o contador de tempo tenha voltado (página recarregada).
+
+    Os deltas dependem dos contadores lidos, então a leitura acontece com a
+    trava de escrita: duas gravações simultâneas (outro worker, ou o
+    endpoint de amostra única e a fila) não calculam o delta a partir do
+    mesmo valor.
+    """
+    pares = {(linha["aula_id"], linha["aluno_id"]) for linha in linhas}
+    travar_escrita(db, AgregadoEngajamento.__tablename__, SessaoInteracao.__tablename__)
+
+    # Sessão atual de cada aluno e seus últimos contadores vêm dos agregados
+    atuais = {}
+    ultimos = {}
+    for aula, aluno, chave, tempo, cliques in db.query(
+        AgregadoEngajamento.aula_id,
+        AgregadoEngajamento.aluno_id,
+        AgregadoEngajamento.sessao_atual,
+        AgregadoEngajamento.ultimo_tempo_permanencia,
+        AgregadoEngajamento.ultimos_cliques,
+    ).filter(tuple_(AgregadoEngajamento.aula_id, AgregadoEngajamento.aluno_id).in_(pares)):
+        if chave is not None:
+            atuais[(aula, aluno)] = chave
+            ultimos[(aula, aluno, chave)] = (tempo or 0, cliques or 0)
+
+    sessoes = {}
+    checkpoints = []
+    atualizacoes = []
+    chaves = []
+    for linha in linhas:
+        par = (linha["aula_id"], linha["aluno_id"])
+        tempo = linha["tempo_permanencia"]
+        cliques = linha["cliques_materiais"]
+
+        chave = linha.get("sessao_chave")
+        if chave is None:
+            atual = atuais.get(par)
+            if atual is not None and tempo >= ultimos[par + (atual,)][0]:
+                chave = atual
+            else:
+                chave = _nova_chave()
+                ultimos[par + (chave,)] = None
+
+        anterior = ultimos.get(par + (chave,), False)
+        if anterior is False:
+            # Sessão que não é a atual do aluno (ex.: outra aba aberta)
+            anterior = db.query(
+                SessaoInteracao.tempo_permanencia, SessaoInteracao.cliques_materiais
+            ).filter(
+                SessaoInteracao.aula_id == par[0],
+                SessaoInteracao.aluno_id == par[1],
+                SessaoInteracao.sessao_chave == chave
+            ).first()
+        nova = anterior is None
+        tempo_anterior, cliques_anterior = (0, 0) if nova else (anterior[0] or 0, anterior[1] or 0)
+
+        if nova or _cruza_checkpoint(tempo_anterior, tempo):
+            checkpoints.append({c: linha[c] for c in COLUNAS_CHECKPOINT})
+
+        ultimos[par + (chave,)] = (tempo, cliques)
+        atuais[par] = chave
+        chaves.append(chave)
+
+        # duas amostras de uma sessão nova no mesmo lote: vale o início da primeira
+        iniciada_em = sessoes[par + (chave,)]["iniciada_em"] if par + (chave,) in sessoes else linha["timestamp"]
+        sessoes[par + (chave,)] = {
+            "aula_id": par[0],
+            "aluno_id": par[1],
+            "sessao_chave": chave,
+            "tempo_permanencia": tempo,
+            "eventos_player": linha["eventos_player"],
+            "cliques_materiais": cliques,
+            "conteudo_anotacoes": linha["conteudo_anotacoes"],
+            "iniciada_em": iniciada_em,
+            "atualizada_em": linha["timestamp"],
+        }
+        atualizacoes.append({
+            "aula_id": par[0],
+            "aluno_id": par[1],
+            "sessao_chave": chave,
+            "delta_tempo": tempo - tempo_anterior,
+            "delta_cliques": cliques - cliques_anterior,
+            "tempo_permanencia": tempo,
+            "cliques_materiais": cliques,
+            "eventos_player": linha["eventos_player"],
+            "timestamp": linha["timestamp"],
+        })
+
+    if sessoes:
+        stmt = insert_com_conflito(db, SessaoInteracao)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SessaoInteracao.aula_id, SessaoInteracao.aluno_id, SessaoInteracao.sessao_chave],
+            set_={c: stmt.excluded[c] for c in ("tempo_permanencia", "eventos_player", "cliques_materiais",
+                                                 "conteudo_anotacoes", "atualizada_em")}
+        )
+        db.execute(stmt, list(sessoes.values()))
+    if checkpoints:
+        db.execute(insert(MetricaInteracao), checkpoints)
+    aplicar_interacao(db, atualizacoes)
+    return chaves
+
+
+def colapsar_historico(db, tamanho_lote=10000):
+    """
+    Converte o histórico de amostras de `metricas_interacao` em sessões:
+    cada sequência em que `tempo_permanencia` não diminui vira uma sessão
+    com os últimos contadores. Das amostras originais ficam apenas a
+    primeira e a última de cada sessão e as que cruzam um checkpoint.
+
+    Lê as amostras em lotes de `tamanho_lote` por keyset (aula, aluno,
+    timestamp, id) e remove as de cada lote antes de ler o próximo, então a
+    memória não depende do tamanho do histórico.
+    """
+    chave = (MetricaInteracao.aula_id, MetricaInteracao.aluno_id, MetricaInteracao.timestamp, MetricaInteracao.id)
+    total_sessoes = total_removidas = 0
+    sessao = None
+    candidata = None  # amostra removível, caso não seja a última da sessão
+    ultima = None
+    while True:
+        consulta = db.query(
+            MetricaInteracao.id,
+            MetricaInteracao.aula_id,
+            MetricaInteracao.aluno_id,
+            MetricaInteracao.tempo_permanencia,
+            MetricaInteracao.eventos_player,
+            MetricaInteracao.cliques_materiais,
+            MetricaInteracao.conteudo_anotacoes,
+            MetricaInteracao.timestamp,
+        )
+        if ultima is not None:
+            consulta = consulta.filter(tuple_(*chave) > tuple_(*ultima))
+        lote = consulta.order_by(*chave).limit(tamanho_lote).all()
+        if not lote:
+            break
+
+        fechadas = []
+        remover = []
+        for id_, aula, aluno, tempo, eventos, cliques, anotacoes, timestamp in lote:
+            tempo = tempo or 0
+            continua = (sessao is not None and sessao["aula_id"] == aula and sessao["aluno_id"] == aluno
+                        and tempo >= sessao["tempo_permanencia"])
+            if continua:
+                if candidata is not None:
+                    remover.append(candidata)
+                candidata = None if _cruza_checkpoint(sessao["tempo_permanencia"], tempo) else id_
+            else:
+                if sessao is not None:
+                    fechadas.append(sessao)
+                sessao = {
+                    "aula_id": aula, "aluno_id": aluno, "sessao_chave": f"historico-{id_}",
+                    "iniciada_em": timestamp,
+                }
+                candidata = None
+            sessao.update({
+                "tempo_permanencia": tempo, "eventos_player": eventos, "cliques_materiais": cliques,
+                "conteudo_anotacoes": anotacoes, "atualizada_em": timestamp,
+            })
+        ultima = (aula, aluno, timestamp, id_)
+
+        if fechadas:
+            db.execute(insert(SessaoInteracao), fechadas)
+        for inicio in range(0, len(remover), 500):
+            db.query(MetricaInteracao).filter(
+                MetricaInteracao.id.in_(remover[inicio:inicio + 500])
+            ).delete(synchronize_session=False)
+        total_sessoes += len(fechadas)
+        total_removidas += len(remover)
+
+    if sessao is not None:
+        db.execute(insert(SessaoInteracao), [sessao])
+        total_sessoes += 1
+    return total_sessoes, total_removidas
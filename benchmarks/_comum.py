@@ -0,0 +1,169 @@
+"""
+Utilitários compartilhados pelos benchmarks
+
+Os benchmarks importam os módulos do backend diretamente (como os scripts
+em backend/ fazem) e trabalham sobre um banco SQLite temporário, sem tocar
+no monitoramento.db da aplicação.
+"""
+
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base, criar_engine  # noqa: E402
+from models import Aluno, Aula, Docente, MetricaAtencao, MetricaInteracao, SessaoInteracao  # noqa: E402
+from sessoes import CHECKPOINT_S  # noqa: E402
+
+
+def banco_temporario(pragmas=None, caminho=None):
+    """
+    Cria um banco SQLite vazio em um diretório temporário (ou em
+    `caminho`), com os mesmos pragmas da aplicação (ou `pragmas`)
+    """
+    caminho = caminho or os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "bench.db")
+    engine = criar_engine(f"sqlite:///{caminho}", pragmas=pragmas)
+    Base.metadata.create_all(bind=engine)
+    return caminho, engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def popular_turma(engine, alunos, amostras, aula_id=1, semente=42, inicio=None, cadastros=True):
+    """
+    Simula uma aula: `alunos` alunos enviando `amostras` pares de métricas
+    de atenção e interação, na cadência de 2 segundos do StudentView. A
+    interação fica como o backend grava: uma sessão por aluno e um
+    checkpoint em metricas_interacao a cada CHECKPOINT_S segundos.
+    Com `cadastros=False` não insere docente e alunos (outras aulas da
+    mesma turma).
+    """
+    rnd = random.Random(semente)
+    inicio = inicio or datetime.now() - timedelta(seconds=2 * amostras)
+    with engine.begin() as conn:
+        if cadastros:
+            conn.execute(insert(Docente), [{"id": 1, "nome": "Docente", "email": "docente@bench"}])
+            conn.execute(insert(Aluno), [
+                {"id": i, "nome": f"Aluno {i}", "email": f"aluno{i}@bench"} for i in range(1, alunos + 1)
+            ])
+        conn.execute(insert(Aula), [{"id": aula_id, "titulo": f"Aula {aula_id}", "descricao": "", "docente_id": 1}])
+        for passo in range(amostras):
+            ts = inicio + timedelta(seconds=2 * passo)
+            atencao = []
+            interacao = []
+            checkpoint = passo == 0 or (CHECKPOINT_S > 0 and (2 * (passo + 1)) // CHECKPOINT_S > (2 * passo) // CHECKPOINT_S)
+            for aluno in range(1, alunos + 1):
+                gaze = rnd.random() < 0.8
+                atencao.append({
+                    "aluno_id": aluno, "aula_id": aula_id, "gaze_na_tela": gaze,
+                    "fadiga_score": rnd.random(), "desvio_olhar": 0 if gaze else 1,
+                    "interrupcoes": 0, "timestamp": ts,
+                })
+                if checkpoint:
+                    interacao.append(_interacao(aluno, aula_id, passo, ts))
+            conn.execute(insert(MetricaAtencao), atencao)
+            if interacao:
+                conn.execute(insert(MetricaInteracao), interacao)
+        if amostras:
+            fim = inicio + timedelta(seconds=2 * (amostras - 1))
+            conn.execute(insert(SessaoInteracao), [
+                dict(_interacao(aluno, aula_id, amostras - 1), sessao_chave=f"bench-{aluno}",
+                     iniciada_em=inicio, atualizada_em=fim)
+                for aluno in range(1, alunos + 1)
+            ])
+
+
+def _interacao(aluno, aula_id, passo, ts=None):
+    linha = {
+        "aluno_id": aluno, "aula_id": aula_id, "tempo_permanencia": 2 * (passo + 1),
+        "eventos_player": {"play": 1, "pause": 0, "seek": 0},
+        "cliques_materiais": passo // 30, "conteudo_anotacoes": "",
+    }
+    if ts is not None:
+        linha["timestamp"] = ts
+    return linha
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def servidor_uvicorn(caminho_banco, env=None, workers=1, timeout=30):
+    """
+    Sobe o backend com uvicorn em um subprocesso apontando para
+    `caminho_banco` e devolve a URL base quando estiver respondendo
+    """
+    porta = porta_livre()
+    ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{caminho_banco}", **(env or {}))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(porta), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND, env=ambiente,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        limite = time.monotonic() + timeout
+        while True:
+            try:
+                urllib.request.urlopen(url + "/", timeout=1)
+                break
+            except OSError:
+                if processo.poll() is not None or time.monotonic() > limite:
+                    raise RuntimeError("Backend não iniciou")
+                time.sleep(0.2)
+        yield url
+    finally:
+        processo.terminate()
+        processo.wait(timeout=10)
+
+
+class ContadorConsultas:
+    """Conta os comandos SQL executados por um engine"""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+@contextmanager
+def cronometro(resultado, chave="ms"):
+    inicio = time.perf_counter()
+    yield
+    resultado[chave] = round((time.perf_counter() - inicio) * 1000, 3)
+
+
+def percentis(amostras_ms):
+    if not amostras_ms:
+        return {"p50": None, "p95": None, "p99": None}
+    ordenadas = sorted(amostras_ms)
+
+    def p(q):
+        return round(ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))], 3)
+
+    return {"p50": p(0.50), "p95": p(0.95), "p99": p(0.99)}
+
+
+def emitir(resultados, como_json):
+    if como_json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False, default=str))
+        return
+    for linha in resultados:
+        print("  ".join(f"{k}={v}" for k, v in linha.items()))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark de regressão da análise de risco da turma
+
+Compara, para turmas de 30/300/3000 alunos, o número de consultas SQL e
+a latência de:
+- legado: implementação anterior (ORM completo + uma consulta de Aluno por aluno)
+- bruta_sql: agregação no banco sobre as tabelas brutas (GROUP BY + JOIN)
+- agregados: leitura dos agregados mantidos na ingestão
+- ranking_top20: os 20 alunos de maior risco pelo índice do ranking
+  (GET /api/analise/{aula_id}?limite=20); confere que são os 20 primeiros
+  da análise completa
+
+Uso:
+    python benchmarks/analise_turma.py [--alunos 30 300 3000 30000] [--amostras 30] [--json]
+"""
+
+import argparse
+import statistics
+import time
+
+from _comum import ContadorConsultas, banco_temporario, emitir, popular_turma
+
+from agregados import (calcular_analise, calcular_analise_bruta, montar_resultado, ranking_turma,
+                       reconstruir_agregados)
+from models import Aluno, MetricaAtencao, SessaoInteracao
+
+
+def analise_legada(db, aula_id):
+    """
+    Cópia da versão anterior de obter_analise_turma, usada como linha de
+    base (a interação lida das sessões, como nas demais implementações)
+    """
+    metricas_atencao = db.query(MetricaAtencao).filter(MetricaAtencao.aula_id == aula_id).all()
+    metricas_interacao = db.query(SessaoInteracao).filter(SessaoInteracao.aula_id == aula_id).all()
+
+    alunos_dados = {}
+    for metrica in metricas_atencao + metricas_interacao:
+        if metrica.aluno_id not in alunos_dados:
+            aluno = db.query(Aluno).filter(Aluno.id == metrica.aluno_id).first()
+            alunos_dados[metrica.aluno_id] = {"aluno": aluno, "atencao": [], "interacao": []}
+    for metrica in metricas_atencao:
+        alunos_dados[metrica.aluno_id]["atencao"].append(metrica)
+    for metrica in metricas_interacao:
+        alunos_dados[metrica.aluno_id]["interacao"].append(metrica)
+
+    resultados = [
+        montar_resultado(
+            aluno_id, dados["aluno"].nome, len(dados["atencao"]),
+            sum(1 for m in dados["atencao"] if m.gaze_na_tela),
+            sum(m.fadiga_score for m in dados["atencao"]),
+            sum(m.desvio_olhar for m in dados["atencao"]),
+            sum(m.interrupcoes for m in dados["atencao"]),
+            sum(m.tempo_permanencia for m in dados["interacao"]),
+            sum(m.cliques_materiais for m in dados["interacao"]),
+        )
+        for aluno_id, dados in alunos_dados.items()
+    ]
+    resultados.sort(key=lambda x: x["risco_evasao"], reverse=True)
+    return resultados
+
+
+IMPLEMENTACOES = {
+    "legado": analise_legada,
+    "bruta_sql": calcular_analise_bruta,
+    "agregados": calcular_analise,
+    "ranking_top20": lambda db, aula_id: ranking_turma(db, aula_id, limite=20)["alunos"],
+}
+
+
+def medir(sessao, contador, funcao, repeticoes):
+    tempos = []
+    consultas = 0
+    resultado = None
+    for _ in range(repeticoes):
+        db = sessao()
+        try:
+            antes = contador.total
+            inicio = time.perf_counter()
+            resultado = funcao(db, 1)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas = contador.total - antes
+        finally:
+            db.close()
+    return resultado, consultas, statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, nargs="+", default=[30, 300, 3000])
+    parser.add_argument("--amostras", type=int, default=30, help="amostras por aluno (2s cada)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    resultados = []
+    for alunos in args.alunos:
+        _, engine, sessao = banco_temporario()
+        popular_turma(engine, alunos, args.amostras)
+        db = sessao()
+        reconstruir_agregados(db)
+        db.commit()
+        db.close()
+
+        contador = ContadorConsultas(engine)
+        referencia = None
+        for nome, funcao in IMPLEMENTACOES.items():
+            saida, consultas, mediana = medir(sessao, contador, funcao, args.repeticoes)
+            por_aluno = {r["aluno_id"]: r for r in saida}
+            if referencia is None:
+                referencia = por_aluno
+                riscos = sorted((r["risco_evasao"] for r in saida), reverse=True)
+            if nome == "ranking_top20":
+                igual = (all(referencia[k] == r for k, r in por_aluno.items())
+                         and [r["risco_evasao"] for r in saida] == riscos[:len(saida)])
+            else:
+                igual = por_aluno == referencia
+            resultados.append({
+                "alunos": alunos,
+                "amostras": alunos * args.amostras * 2,
+                "implementacao": nome,
+                "consultas": consultas,
+                "mediana_ms": round(mediana, 2),
+                "igual_legado": igual,
+            })
+        engine.dispose()
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
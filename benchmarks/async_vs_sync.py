@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark do modo assíncrono (DB_ASYNC=1) contra o modo síncrono
+
+Sobe o backend com uvicorn em cada modo, sobre uma cópia do mesmo banco
+sintético, e simula N alunos concorrentes enviando métricas de atenção e
+interação (POSTs individuais, como o StudentView fazia) e alguns docentes
+consultando /api/analise. Reporta requisições por segundo e latência
+p50/p95/p99 por endpoint. Requer httpx e aiosqlite.
+
+Uso:
+    python benchmarks/async_vs_sync.py [--alunos 500] [--docentes 5] [--segundos 15] [--cadencia 0] [--json]
+
+--cadencia é o intervalo entre envios de cada aluno em segundos (2 no
+cliente real); 0 mede a vazão máxima.
+"""
+
+import argparse
+import asyncio
+import shutil
+import time
+
+import httpx
+
+from _comum import banco_temporario, emitir, percentis, popular_turma, servidor_uvicorn
+
+MODOS = {"sincrono": {"DB_ASYNC": "0"}, "assincrono": {"DB_ASYNC": "1"}}
+
+
+async def simular(url, args):
+    latencias = {"atencao": [], "interacao": [], "analise": []}
+    erros = [0]
+    fim = time.monotonic() + args.segundos
+
+    async def medir(cliente, chave, metodo, caminho, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.request(metodo, caminho, **kwargs)
+            if resposta.status_code >= 400:
+                erros[0] += 1
+                return
+        except httpx.HTTPError:
+            erros[0] += 1
+            return
+        latencias[chave].append((time.perf_counter() - inicio) * 1000)
+
+    async def aluno(cliente, aluno_id):
+        tempo = 0
+        while time.monotonic() < fim:
+            tempo += 2
+            await medir(cliente, "atencao", "POST", "/api/metricas/atencao", json={
+                "aluno_id": aluno_id, "aula_id": 1, "gaze_na_tela": True,
+                "fadiga_score": 0.3, "desvio_olhar": 0, "interrupcoes": 0,
+            })
+            await medir(cliente, "interacao", "POST", "/api/metricas/interacao", json={
+                "aluno_id": aluno_id, "aula_id": 1, "tempo_permanencia": tempo,
+                "eventos_player": {"play": 1, "pause": 0, "seek": 0}, "cliques_materiais": 1,
+            })
+            if args.cadencia:
+                await asyncio.sleep(args.cadencia)
+
+    async def docente(cliente):
+        while time.monotonic() < fim:
+            await medir(cliente, "analise", "GET", "/api/analise/1")
+            await asyncio.sleep(1)
+
+    limites = httpx.Limits(max_connections=args.alunos + args.docentes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        inicio = time.monotonic()
+        await asyncio.gather(
+            *(aluno(cliente, (i % args.alunos_banco) + 1) for i in range(args.alunos)),
+            *(docente(cliente) for _ in range(args.docentes)),
+        )
+        duracao = time.monotonic() - inicio
+
+    total = sum(len(v) for v in latencias.values())
+    linhas = []
+    for chave, valores in latencias.items():
+        linhas.append({
+            "endpoint": chave,
+            "requisicoes": len(valores),
+            **{f"{k}_ms": v for k, v in percentis(valores).items()},
+        })
+    return total / duracao, erros[0], linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=500)
+    parser.add_argument("--docentes", type=int, default=5)
+    parser.add_argument("--segundos", type=float, default=15)
+    parser.add_argument("--cadencia", type=float, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    args.alunos_banco = min(args.alunos, 500)
+
+    base, engine, _ = banco_temporario()
+    popular_turma(engine, args.alunos_banco, 10)
+    engine.dispose()
+
+    resultados = []
+    for modo, env in MODOS.items():
+        caminho = base.replace(".db", f"_{modo}.db")
+        shutil.copy(base, caminho)
+        with servidor_uvicorn(caminho, env) as url:
+            vazao, erros, linhas = asyncio.run(simular(url, args))
+        for linha in linhas:
+            resultados.append({"modo": modo, "req_por_s": round(vazao, 1), "erros": erros, **linha})
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
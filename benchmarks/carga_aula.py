@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Simulação de carga de uma aula online completa
+
+N alunos repetem o comportamento do StudentView: ao entrar carregam os
+quizzes e o resumo personalizado, enviam a cada `--cadencia` segundos um
+POST /api/metricas/lote com uma amostra de atenção e uma de interação
+(mesma sessão), e em um momento aleatório da aula respondem o quiz e
+registram o log de interação. M docentes consultam /api/analise a cada
+3 segundos (o polling do TeacherDashboard) e /api/quizzes e
+/api/mineracao-dados a cada `--intervalo-mineracao` segundos.
+
+Para cada número de alunos reporta vazão, latência p50/p95/p99 e erros
+por endpoint, o atraso dos envios em relação à cadência (o backend deixou
+de acompanhar a turma quando ele cresce) e o crescimento do banco.
+
+Modos:
+    uvicorn   backend em um subprocesso (padrão, mais próximo de produção)
+    processo  app ASGI no mesmo processo via httpx.ASGITransport, sem
+              rede; cliente e servidor dividem a mesma CPU
+
+Uso:
+    python benchmarks/carga_aula.py [--alunos 50 200] [--docentes 3] [--segundos 30] [--modo uvicorn] [--json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+AULA_ID = 1
+
+# Endpoints em que um 404 é resposta normal (o resumo só existe depois de gerado)
+NAO_ERROS = {"GET /api/resumos-personalizados": {404}}
+
+
+class Medidor:
+    """Latências e erros por endpoint"""
+
+    def __init__(self):
+        self.latencias = {}
+        self.erros = {}
+        self.atrasos = []
+
+    async def requisitar(self, cliente, metodo, caminho, nome, **kwargs):
+        chave = f"{metodo} {nome}"
+        self.latencias.setdefault(chave, [])
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.request(metodo, caminho, **kwargs)
+            falhou = resposta.status_code >= 400 and resposta.status_code not in NAO_ERROS.get(chave, ())
+        except httpx.HTTPError:
+            resposta = None
+            falhou = True
+        if falhou:
+            self.erros[chave] = self.erros.get(chave, 0) + 1
+        else:
+            self.latencias[chave].append((time.perf_counter() - inicio) * 1000)
+        return resposta
+
+
+async def aluno(cliente, medidor, aluno_id, quiz_id, args, fim):
+    rnd = random.Random(aluno_id)
+    sessao_id = uuid.uuid4().hex
+    entrada = time.monotonic()
+    momento_quiz = entrada + rnd.uniform(0.2, 0.8) * args.segundos
+    quiz_respondido = False
+    cliques = 0
+
+    # Alunos não entram todos no mesmo instante
+    await asyncio.sleep(rnd.uniform(0, args.cadencia))
+    await medidor.requisitar(cliente, "GET", f"/api/quizzes/{AULA_ID}", "/api/quizzes")
+    await medidor.requisitar(cliente, "GET", f"/api/resumos-personalizados/{aluno_id}/{AULA_ID}",
+                             "/api/resumos-personalizados")
+
+    inicio = time.monotonic()
+    proximo = inicio
+    while True:
+        proximo += args.cadencia
+        espera = proximo - time.monotonic()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        agora = time.monotonic()
+        if agora >= fim:
+            break
+        medidor.atrasos.append(max(0.0, agora - proximo) * 1000)
+
+        if rnd.random() < 0.05:
+            cliques += 1
+        gaze = rnd.random() < 0.8
+        await medidor.requisitar(cliente, "POST", "/api/metricas/lote", "/api/metricas/lote", json={"amostras": [
+            {
+                "aluno_id": aluno_id, "aula_id": AULA_ID, "gaze_na_tela": gaze,
+                "fadiga_score": round(rnd.random(), 3), "desvio_olhar": 0 if gaze else 1, "interrupcoes": 0,
+            },
+            {
+                "aluno_id": aluno_id, "aula_id": AULA_ID, "tempo_permanencia": int(agora - entrada),
+                "eventos_player": {"play": 1, "pause": 0, "seek": 0}, "cliques_materiais": cliques,
+                "conteudo_anotacoes": "", "sessao_id": sessao_id,
+            },
+        ]})
+
+        if not quiz_respondido and agora >= momento_quiz:
+            quiz_respondido = True
+            await medidor.requisitar(cliente, "POST", "/api/respostas-quiz", "/api/respostas-quiz", json={
+                "quiz_id": quiz_id, "aluno_id": aluno_id,
+                "respostas": {str(p): rnd.choice("abcd") for p in range(1, 6)},
+                "tempo_resposta": rnd.randint(20, 120),
+            })
+            await medidor.requisitar(cliente, "POST", "/api/logs-interacao", "/api/logs-interacao", json={
+                "aluno_id": aluno_id, "aula_id": AULA_ID, "tipo_interacao": "quiz",
+                "detalhes": {"quiz_id": quiz_id, "pontuacao": "calculada"},
+            })
+
+
+async def docente(cliente, medidor, args, fim):
+    proxima_mineracao = time.monotonic()
+    while time.monotonic() < fim:
+        await medidor.requisitar(cliente, "GET", f"/api/analise/{AULA_ID}", "/api/analise")
+        if time.monotonic() >= proxima_mineracao:
+            proxima_mineracao += args.intervalo_mineracao
+            await medidor.requisitar(cliente, "GET", f"/api/quizzes/{AULA_ID}", "/api/quizzes")
+            await medidor.requisitar(cliente, "GET", f"/api/mineracao-dados/{AULA_ID}", "/api/mineracao-dados")
+        await asyncio.sleep(3)
+
+
+async def simular(cliente, alunos, quiz_id, args):
+    from _comum import percentis
+
+    medidor = Medidor()
+    inicio = time.monotonic()
+    fim = inicio + args.segundos
+    await asyncio.gather(
+        *(aluno(cliente, medidor, i, quiz_id, args, fim) for i in range(1, alunos + 1)),
+        *(docente(cliente, medidor, args, fim) for _ in range(args.docentes)),
+    )
+    duracao = time.monotonic() - inicio
+
+    endpoints = []
+    for chave in sorted(medidor.latencias):
+        valores = medidor.latencias[chave]
+        erros = medidor.erros.get(chave, 0)
+        endpoints.append({
+            "endpoint": chave,
+            "requisicoes": len(valores) + erros,
+            "erros": erros,
+            "req_por_s": round((len(valores) + erros) / duracao, 1),
+            **{f"{k}_ms": v for k, v in percentis(valores).items()},
+        })
+    total = sum(e["requisicoes"] for e in endpoints)
+    erros = sum(e["erros"] for e in endpoints)
+    resumo = {
+        "req_por_s": round(total / duracao, 1),
+        "requisicoes": total,
+        "erros": erros,
+        "taxa_erro": round(erros / total, 4) if total else 0,
+        "atraso_envio_p95_ms": percentis(medidor.atrasos)["p95"],
+    }
+    return resumo, endpoints
+
+
+def tamanho_banco_mb(caminho):
+    total = sum(os.path.getsize(caminho + sufixo) for sufixo in ("", "-wal") if os.path.exists(caminho + sufixo))
+    return round(total / 1024 / 1024, 3)
+
+
+def preparar_banco(caminho, alunos):
+    """Turma com `alunos` alunos e um quiz de 5 perguntas; retorna o id do quiz"""
+    from _comum import banco_temporario, popular_turma
+    from sqlalchemy import insert
+    from models import Quiz
+
+    _, engine, _ = banco_temporario(caminho=caminho)
+    popular_turma(engine, alunos, 0, aula_id=AULA_ID)
+    with engine.begin() as conn:
+        quiz_id = conn.execute(insert(Quiz).values(
+            aula_id=AULA_ID, titulo="Quiz da aula", descricao="",
+            perguntas={str(p): {"texto": f"Pergunta {p}", "opcoes": list("abcd")} for p in range(1, 6)},
+            respostas_certas={str(p): "a" for p in range(1, 6)},
+        )).inserted_primary_key[0]
+    engine.dispose()
+    return quiz_id
+
+
+async def executar_em_processo(caminho, alunos, quiz_id, args):
+    from main import app
+
+    transporte = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga", timeout=60) as cliente:
+            return await simular(cliente, alunos, quiz_id, args)
+
+
+async def executar_com_cliente(url, alunos, quiz_id, args):
+    limites = httpx.Limits(max_connections=alunos + args.docentes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        return await simular(cliente, alunos, quiz_id, args)
+
+
+def executar(alunos, args, caminho=None):
+    """Roda a simulação para um número de alunos; retorna as linhas do resultado"""
+    from _comum import servidor_uvicorn
+
+    caminho = caminho or os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "carga.db")
+    quiz_id = preparar_banco(caminho, alunos)
+    tamanho_inicial = tamanho_banco_mb(caminho)
+
+    if args.modo == "processo":
+        resumo, endpoints = asyncio.run(executar_em_processo(caminho, alunos, quiz_id, args))
+    else:
+        with servidor_uvicorn(caminho, args.env) as url:
+            resumo, endpoints = asyncio.run(executar_com_cliente(url, alunos, quiz_id, args))
+
+    base = {"alunos": alunos, "docentes": args.docentes, "modo": args.modo}
+    linhas = [{
+        **base, "endpoint": "total", **resumo,
+        "banco_mb_inicio": tamanho_inicial,
+        "crescimento_mb": round(tamanho_banco_mb(caminho) - tamanho_inicial, 3),
+    }]
+    linhas += [{**base, **endpoint} for endpoint in endpoints]
+    return linhas
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--docentes", type=int, default=3)
+    parser.add_argument("--segundos", type=float, default=30)
+    parser.add_argument("--cadencia", type=float, default=2.0, help="intervalo entre envios de métricas (s)")
+    parser.add_argument("--intervalo-mineracao", type=float, default=15.0,
+                        help="intervalo das consultas de quizzes e mineração dos docentes (s)")
+    parser.add_argument("--modo", choices=("uvicorn", "processo"), default="uvicorn")
+    parser.add_argument("--env", nargs="*", default=[], metavar="VAR=VALOR",
+                        help="variáveis de ambiente do backend (ex.: DB_ASYNC=1)")
+    parser.add_argument("--json", action="store_true")
+    return parser
+
+
+def rodar(args):
+    args.env = dict(item.split("=", 1) for item in args.env)
+    if args.modo == "processo":
+        # O backend lê DATABASE_URL ao ser importado: um banco por processo
+        if len(args.alunos) > 1:
+            sys.exit("--modo processo aceita um único valor de --alunos")
+        caminho = os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "carga.db")
+        os.environ.update(args.env, DATABASE_URL=f"sqlite:///{caminho}")
+        return executar(args.alunos[0], args, caminho)
+
+    resultados = []
+    for alunos in args.alunos:
+        resultados += executar(alunos, args)
+    return resultados
+
+
+def main():
+    args = criar_parser().parse_args()
+    from _comum import emitir
+    emitir(rodar(args), args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Escalabilidade com vários workers do uvicorn
+
+Sobe o backend com 1, 2, 4... workers (uvicorn --workers, WEB_CONCURRENCY)
+sobre uma turma de `--alunos` alunos e mede, com `--conexoes` clientes em
+ciclo fechado durante `--segundos`, a vazão e a latência de uma mistura de
+requisições: envio de métricas em lote, análise da turma, mineração e
+listagem de aulas.
+
+Depois mede a consistência entre processos: como não dá para escolher o
+worker que atende cada requisição, sobe dois backends de um worker no
+mesmo banco, deixa a mineração da aula em cache nos dois, grava um log de
+interação pelo primeiro e conta quanto tempo leva até o segundo refletir a
+escrita — com e sem o estado compartilhado (sem ele, só ao expirar o
+cache, MINERACAO_CACHE_TTL_S).
+
+Uso:
+    python benchmarks/escala_workers.py [--workers 1 2 4] [--conexoes 32] [--segundos 20] [--env VAR=VALOR] [--json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from _comum import banco_temporario, emitir, percentis, popular_turma, servidor_uvicorn
+
+AULA_ID = 1
+
+MISTURA = (
+    ("POST /api/metricas/lote", 0.6),
+    ("GET /api/analise", 0.2),
+    ("GET /api/mineracao-dados", 0.1),
+    ("GET /api/aulas", 0.1),
+)
+
+
+async def requisicao(cliente, nome, rnd, alunos):
+    aluno_id = rnd.randint(1, alunos)
+    if nome == "POST /api/metricas/lote":
+        gaze = rnd.random() < 0.8
+        return await cliente.post("/api/metricas/lote", json={"amostras": [{
+            "aluno_id": aluno_id, "aula_id": AULA_ID, "gaze_na_tela": gaze, "fadiga_score": rnd.random(),
+            "desvio_olhar": 0 if gaze else 1, "interrupcoes": 0,
+        }]})
+    if nome == "GET /api/analise":
+        return await cliente.get(f"/api/analise/{AULA_ID}")
+    if nome == "GET /api/mineracao-dados":
+        return await cliente.get(f"/api/mineracao-dados/{AULA_ID}")
+    return await cliente.get("/api/aulas")
+
+
+async def carga(url, args):
+    nomes = [n for n, _ in MISTURA]
+    pesos = [p for _, p in MISTURA]
+    latencias = {n: [] for n in nomes}
+    erros = 0
+    fim = time.monotonic() + args.segundos
+
+    async def cliente_fechado(cliente, semente):
+        nonlocal erros
+        rnd = random.Random(semente)
+        while time.monotonic() < fim:
+            nome = rnd.choices(nomes, pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                resposta = await requisicao(cliente, nome, rnd, args.alunos)
+                falhou = resposta.status_code >= 400
+            except httpx.HTTPError:
+                falhou = True
+            if falhou:
+                erros += 1
+            else:
+                latencias[nome].append((time.perf_counter() - inicio) * 1000)
+
+    limites = httpx.Limits(max_connections=args.conexoes)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        inicio = time.monotonic()
+        await asyncio.gather(*(cliente_fechado(cliente, s) for s in range(args.conexoes)))
+        duracao = time.monotonic() - inicio
+    return latencias, erros, duracao
+
+
+async def convergencia(urls, tentativas=5, limite_s=5):
+    """
+    ms até a mineração lida em cada um de `urls` refletir um log gravado
+    pelo primeiro (None se não refletir em `limite_s`)
+    """
+    tempos = []
+    async with httpx.AsyncClient(timeout=30) as cliente:
+        for _ in range(tentativas):
+            antes = [(await cliente.get(f"{url}/api/mineracao-dados/{AULA_ID}")).json()["total_interacoes"]
+                     for url in urls]  # deixa a aula em cache em todos
+            await cliente.post(f"{urls[0]}/api/logs-interacao?confirmacao=nenhuma", json={
+                "aluno_id": 1, "aula_id": AULA_ID, "tipo_interacao": "click", "detalhes": {}})
+            inicio = time.monotonic()
+            pendentes = set(range(len(urls)))
+            while pendentes and time.monotonic() - inicio < limite_s:
+                for i in list(pendentes):
+                    total = (await cliente.get(f"{urls[i]}/api/mineracao-dados/{AULA_ID}")).json()["total_interacoes"]
+                    if total > antes[i]:
+                        pendentes.discard(i)
+                await asyncio.sleep(0.02)
+            tempos.append(None if pendentes else round((time.monotonic() - inicio) * 1000))
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--alunos", type=int, default=200)
+    parser.add_argument("--amostras", type=int, default=300, help="amostras de atenção já gravadas por aluno")
+    parser.add_argument("--conexoes", type=int, default=32)
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--env", nargs="*", default=[], metavar="VAR=VALOR",
+                        help="variáveis de ambiente do backend (ex.: ESTADO_COMPARTILHADO=0)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    env = dict(item.split("=", 1) for item in args.env)
+
+    resultados = []
+    base = None
+    for workers in args.workers:
+        caminho = os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "workers.db")
+        _, engine, _ = banco_temporario(caminho=caminho)
+        popular_turma(engine, args.alunos, args.amostras, aula_id=AULA_ID)
+        engine.dispose()
+
+        with servidor_uvicorn(caminho, {"WEB_CONCURRENCY": str(workers), **env}, workers=workers) as url:
+            latencias, erros, duracao = asyncio.run(carga(url, args))
+
+        total = sum(len(v) for v in latencias.values()) + erros
+        vazao = total / duracao
+        base = base or vazao
+        resultados.append({
+            "workers": workers, "endpoint": "total", "req_por_s": round(vazao, 1),
+            "escala": round(vazao / base, 2), "erros": erros,
+            **{f"{k}_ms": v for k, v in percentis([x for v in latencias.values() for x in v]).items()},
+        })
+        for nome, valores in latencias.items():
+            resultados.append({
+                "workers": workers, "endpoint": nome, "req_por_s": round(len(valores) / duracao, 1),
+                **{f"{k}_ms": v for k, v in percentis(valores).items()},
+            })
+
+    caminho = os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "convergencia.db")
+    _, engine, _ = banco_temporario(caminho=caminho)
+    popular_turma(engine, 10, 10, aula_id=AULA_ID)
+    engine.dispose()
+    for ativo in ("1", "0"):
+        ambiente = {**env, "ESTADO_COMPARTILHADO": ativo}
+        with servidor_uvicorn(caminho, ambiente) as primeiro, servidor_uvicorn(caminho, ambiente) as segundo:
+            tempos = asyncio.run(convergencia([primeiro, segundo]))
+        resultados.append({"endpoint": "convergencia", "estado_compartilhado": ativo, "ms": tempos})
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
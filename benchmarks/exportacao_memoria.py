@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória da exportação de métricas
+
+Para tabelas de atenção com `--alunos` x `--amostras` linhas, compara o
+pico de memória Python (tracemalloc) e o tempo de:
+- legado: .all() dos objetos ORM e uma única resposta JSON, como em
+  obter_logs_interacao
+- csv / parquet / arrow: exportacao.Exportacao em lotes
+
+O pico da exportação deve ficar constante com o crescimento da tabela.
+Os buffers internos do pyarrow não passam pelo tracemalloc; o pico deles
+é medido com pyarrow.total_allocated_bytes e somado.
+
+Uso:
+    python benchmarks/exportacao_memoria.py [--alunos 100 500 2000] [--amostras 300] [--json]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from _comum import banco_temporario, emitir, popular_turma
+
+from exportacao import FORMATOS, Exportacao, pa
+from models import MetricaAtencao
+
+
+def exportar_legado(sessao):
+    db = sessao()
+    try:
+        metricas = db.query(MetricaAtencao).all()
+        corpo = json.dumps([
+            {"id": m.id, "aluno_id": m.aluno_id, "aula_id": m.aula_id, "gaze_na_tela": m.gaze_na_tela,
+             "fadiga_score": m.fadiga_score, "desvio_olhar": m.desvio_olhar,
+             "interrupcoes": m.interrupcoes, "timestamp": m.timestamp.isoformat()}
+            for m in metricas
+        ])
+        return len(corpo)
+    finally:
+        db.close()
+
+
+def exportar(sessao, formato):
+    exportacao = Exportacao("atencao", formato, session_factory=sessao)
+    pico_arrow = 0
+    tamanho = 0
+    for parte in exportacao:
+        tamanho += len(parte)
+        if pa is not None:
+            pico_arrow = max(pico_arrow, pa.total_allocated_bytes())
+    return tamanho, pico_arrow
+
+
+def medir(funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tamanho, pico_extra = resultado if isinstance(resultado, tuple) else (resultado, 0)
+    return tamanho, (pico + pico_extra) / 2 ** 20, duracao * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--amostras", type=int, default=300, help="amostras por aluno (2s cada)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    formatos = [f for f in FORMATOS if f == "csv" or pa is not None]
+    resultados = []
+    for alunos in args.alunos:
+        _, engine, sessao = banco_temporario()
+        popular_turma(engine, alunos, args.amostras)
+        implementacoes = {"legado": lambda: exportar_legado(sessao)}
+        implementacoes.update({f: (lambda f=f: exportar(sessao, f)) for f in formatos})
+        for nome, funcao in implementacoes.items():
+            tamanho, pico_mb, ms = medir(funcao)
+            resultados.append({
+                "linhas": alunos * args.amostras,
+                "implementacao": nome,
+                "pico_mb": round(pico_mb, 1),
+                "tamanho_mb": round(tamanho / 2 ** 20, 1),
+                "ms": round(ms, 1),
+            })
+        engine.dispose()
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
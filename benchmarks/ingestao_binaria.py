@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark do formato binário de POST /api/metricas/lote
+
+Para lotes de `--tamanhos` amostras de atenção (1 é o envio de um aluno a
+cada 2 s; lotes maiores, um intermediário que agrega vários alunos), com e
+sem a amostra de interação que o StudentView envia junto, compara o custo
+de transformar o corpo da requisição nas linhas entregues à fila de
+ingestão:
+- json: json.loads + validação de LoteMetricas pelo pydantic + linha_atencao
+  e linha_interacao por amostra (o que o FastAPI e o endpoint fazem)
+- binario: formato_binario.decodificar_lote + validação da interação em JSON
+
+Reporta bytes no corpo e CPU por amostra de atenção, e confere que os dois
+caminhos produzem as mesmas linhas.
+
+Uso:
+    python benchmarks/ingestao_binaria.py [--tamanhos 1 10 100 1000] [--repeticoes 2000] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+# o backend lê DATABASE_URL ao ser importado (inclusive via _comum)
+CAMINHO = os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "ingestao_binaria.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{CAMINHO}"
+
+from _comum import emitir  # noqa: E402
+
+from formato_binario import codificar_lote, decodificar_lote  # noqa: E402
+from ingestao import linha_atencao, linha_interacao  # noqa: E402
+from main import LoteMetricas, MetricaAtencaoCreate, _amostras_interacao  # noqa: E402
+
+
+def gerar_amostras(tamanho, com_interacao, semente=42):
+    rnd = random.Random(semente)
+    atencao = []
+    for i in range(tamanho):
+        na_tela = rnd.random() < 0.8
+        atencao.append({
+            "aluno_id": 1 + i, "aula_id": 7, "gaze_na_tela": na_tela,
+            # valores com 3 casas, como os do detector, representáveis em float32 após o arredondamento
+            "fadiga_score": round(rnd.uniform(0.05, 0.9), 3),
+            "desvio_olhar": 0 if na_tela else 1, "interrupcoes": 0,
+        })
+    interacao = []
+    if com_interacao:
+        interacao.append({
+            "aluno_id": 1, "aula_id": 7, "tempo_permanencia": 1834,
+            "eventos_player": {"play": 3, "pause": 2, "seek": 1}, "cliques_materiais": 4,
+            "conteudo_anotacoes": "Revisar o exemplo da segunda parte", "sessao_id": "k3j2h1g0f9e8d7c6",
+        })
+    return atencao, interacao
+
+
+def decodificar_json(corpo, timestamp):
+    lote = LoteMetricas.model_validate(json.loads(corpo))
+    atencao = []
+    interacao = []
+    for amostra in lote.amostras:
+        if isinstance(amostra, MetricaAtencaoCreate):
+            atencao.append(linha_atencao(amostra, timestamp))
+        else:
+            interacao.append(linha_interacao(amostra, timestamp))
+    return atencao, interacao
+
+
+def decodificar_binario(corpo, timestamp):
+    atencao, interacao_json = decodificar_lote(corpo, timestamp)
+    interacao = []
+    if interacao_json:
+        interacao = [linha_interacao(a, timestamp) for a in _amostras_interacao.validate_json(interacao_json)]
+    return atencao, interacao
+
+
+def medir(funcao, corpo, timestamp, repeticoes):
+    resultado = funcao(corpo, timestamp)
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        funcao(corpo, timestamp)
+    return resultado, (time.process_time() - inicio) / repeticoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    timestamp = datetime.now()
+    resultados = []
+    for tamanho in args.tamanhos:
+        for com_interacao in (True, False):
+            atencao, interacao = gerar_amostras(tamanho, com_interacao)
+            corpos = {
+                "json": json.dumps({"amostras": atencao + interacao}).encode(),
+                "binario": codificar_lote(atencao, json.dumps(interacao).encode() if interacao else b""),
+            }
+            # lotes grandes: menos repetições para o mesmo tempo total
+            repeticoes = max(20, args.repeticoes // tamanho)
+            linhas = {}
+            for formato, funcao in (("json", decodificar_json), ("binario", decodificar_binario)):
+                linhas[formato], us = medir(funcao, corpos[formato], timestamp, repeticoes)
+                resultados.append({
+                    "amostras_atencao": tamanho, "interacao": com_interacao, "formato": formato,
+                    "bytes": len(corpos[formato]),
+                    "bytes_por_amostra": round(len(corpos[formato]) / tamanho, 1),
+                    "cpu_us_lote": round(us, 2),
+                    "cpu_us_por_amostra": round(us / tamanho, 3),
+                })
+            resultados[-1]["mesmas_linhas"] = linhas["binario"] == linhas["json"]
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Custo da instrumentação (/metrics) nas requisições
+
+Sobe o backend com METRICAS_ATIVAS=0 e =1, alternando as rodadas para
+diluir o ruído da máquina, e mede com `--clientes` clientes concorrentes
+a vazão e a latência de GET /api/analise (1 consulta) e de
+POST /api/metricas/atencao (leitura + upsert + insert). Também mede o
+tempo de gerar o texto de /metrics.
+
+Uso:
+    python benchmarks/instrumentacao_overhead.py [--alunos 300] [--clientes 8] [--segundos 8] [--rodadas 2] [--json]
+"""
+
+import argparse
+import asyncio
+import shutil
+import time
+
+import httpx
+
+from _comum import banco_temporario, emitir, percentis, popular_turma, servidor_uvicorn
+
+from agregados import reconstruir_agregados
+
+MODOS = {"desligada": {"METRICAS_ATIVAS": "0"}, "ligada": {"METRICAS_ATIVAS": "1"}}
+
+
+async def carga(url, args):
+    latencias = {"analise": [], "atencao": []}
+    fim = time.monotonic() + args.segundos
+
+    async def cliente_http(cliente, indice):
+        aluno_id = indice % args.alunos + 1
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            if indice % 2:
+                resposta = await cliente.get("/api/analise/1")
+                chave = "analise"
+            else:
+                resposta = await cliente.post("/api/metricas/atencao", json={
+                    "aluno_id": aluno_id, "aula_id": 1, "gaze_na_tela": True,
+                    "fadiga_score": 0.3, "desvio_olhar": 0, "interrupcoes": 0,
+                })
+                chave = "atencao"
+            resposta.raise_for_status()
+            latencias[chave].append((time.perf_counter() - inicio) * 1000)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as cliente:
+        inicio = time.monotonic()
+        await asyncio.gather(*(cliente_http(cliente, i) for i in range(args.clientes)))
+        duracao = time.monotonic() - inicio
+
+        exportacao = []
+        for _ in range(20):
+            comeco = time.perf_counter()
+            (await cliente.get("/metrics")).raise_for_status()
+            exportacao.append((time.perf_counter() - comeco) * 1000)
+    return latencias, duracao, exportacao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=300)
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=8)
+    parser.add_argument("--rodadas", type=int, default=2)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    base, engine, sessao = banco_temporario()
+    popular_turma(engine, args.alunos, 10)
+    db = sessao()
+    reconstruir_agregados(db)
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    acumulado = {modo: {"analise": [], "atencao": [], "requisicoes": 0, "segundos": 0.0, "metrics": []}
+                 for modo in MODOS}
+    for rodada in range(args.rodadas):
+        for modo, env in MODOS.items():
+            caminho = base.replace(".db", f"_{modo}_{rodada}.db")
+            shutil.copy(base, caminho)
+            with servidor_uvicorn(caminho, env) as url:
+                latencias, duracao, exportacao = asyncio.run(carga(url, args))
+            total = acumulado[modo]
+            for chave, valores in latencias.items():
+                total[chave] += valores
+            total["requisicoes"] += sum(len(v) for v in latencias.values())
+            total["segundos"] += duracao
+            total["metrics"] += exportacao
+
+    resultados = []
+    for modo, total in acumulado.items():
+        linha = {"instrumentacao": modo, "req_por_s": round(total["requisicoes"] / total["segundos"], 1)}
+        for chave in ("analise", "atencao"):
+            p = percentis(total[chave])
+            linha[f"{chave}_p50_ms"] = p["p50"]
+            linha[f"{chave}_p99_ms"] = p["p99"]
+        linha["metrics_p50_ms"] = percentis(total["metrics"])["p50"]
+        resultados.append(linha)
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
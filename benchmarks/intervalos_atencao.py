@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark do armazenamento das amostras de atenção em intervalos
+
+Simula uma aula com `--alunos` alunos enviando uma amostra a cada 2
+segundos, em que o estado de cada aluno persiste (o olhar sai da tela em
+média a cada `--persistencia` amostras e a fadiga deriva devagar), e grava
+as mesmas amostras:
+- amostras: uma linha por amostra em metricas_atencao (modo padrão)
+- intervalos tol=X: intervalos_atencao com ATENCAO_TOLERANCIA_FADIGA=X
+
+Cada lote passa também pelos agregados e pela linha do tempo, como na
+fila de ingestão. Reporta as linhas gravadas por tabela de atenção
+(amostras ou intervalos, presenças e somas da linha do tempo) e no total
+por amostra, o tempo de gravação por lote (só o armazenamento das
+amostras), o tempo da análise sobre as tabelas de atenção
+(calcular_analise_bruta, que varre o armazenamento) e da mineração, e
+confere que os resultados são iguais aos do modo amostras.
+
+Uso:
+    python benchmarks/intervalos_atencao.py [--alunos 200] [--amostras 1800] [--tolerancia 0.02 0.05 0.1] [--json]
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from _comum import banco_temporario, emitir
+from sqlalchemy import func, insert
+
+from agregados import aplicar_atencao, calcular_analise, calcular_analise_bruta
+from intervalos_atencao import IntervalosAtencao
+from linha_tempo import registrar_atencao
+from mineracao import calcular_mineracao
+from models import (Aluno, Aula, AtencaoAulaIntervalo, Docente, IntervaloAtencao, MetricaAtencao,
+                    PresencaAtencaoIntervalo)
+
+
+def gerar_aula(alunos, amostras, persistencia, semente=42):
+    """Lotes (um por passo de 2 s) com uma amostra de cada aluno"""
+    rnd = random.Random(semente)
+    inicio = datetime.now().replace(microsecond=0) - timedelta(seconds=2 * amostras)
+    estados = {a: [True, rnd.uniform(0.1, 0.4)] for a in range(1, alunos + 1)}
+    for passo in range(amostras):
+        momento = inicio + timedelta(seconds=2 * passo)
+        lote = []
+        for aluno, estado in estados.items():
+            if rnd.random() < 1 / persistencia:
+                estado[0] = not estado[0] if estado[0] else rnd.random() < 0.7
+            estado[1] = min(1.0, max(0.0, estado[1] + rnd.gauss(0.0005, 0.004)))
+            lote.append({
+                "aluno_id": aluno, "aula_id": 1, "gaze_na_tela": estado[0],
+                "fadiga_score": round(estado[1], 3), "desvio_olhar": 0 if estado[0] else 1,
+                "interrupcoes": 1 if rnd.random() < 0.001 else 0, "timestamp": momento,
+            })
+        yield lote
+
+
+def medir(funcao, sessao, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        db = sessao()
+        try:
+            inicio = time.perf_counter()
+            resultado = funcao(db)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            db.close()
+    return resultado, statistics.median(tempos)
+
+
+def executar(args, tolerancia):
+    _, engine, sessao = banco_temporario()
+    with engine.begin() as conn:
+        conn.execute(insert(Docente), [{"id": 1, "nome": "Docente", "email": "docente@bench"}])
+        conn.execute(insert(Aluno), [{"id": i, "nome": f"Aluno {i}", "email": f"aluno{i}@bench"}
+                                     for i in range(1, args.alunos + 1)])
+        conn.execute(insert(Aula), [{"id": 1, "titulo": "Aula 1", "descricao": "", "docente_id": 1}])
+
+    intervalos = IntervalosAtencao(tolerancia, ativo=True) if tolerancia is not None else None
+    tempos = []
+    db = sessao()
+    for lote in gerar_aula(args.alunos, args.amostras, args.persistencia):
+        inicio = time.perf_counter()
+        if intervalos:
+            abertos = intervalos.gravar(db, lote)
+        else:
+            db.execute(insert(MetricaAtencao), lote)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        aplicar_atencao(db, lote)
+        registrar_atencao(db, lote)
+        db.commit()
+        if intervalos:
+            intervalos.confirmar(abertos)
+    linhas = db.query(func.count(IntervaloAtencao.id if intervalos else MetricaAtencao.id)).scalar()
+    presencas = db.query(func.count()).select_from(PresencaAtencaoIntervalo).scalar()
+    linha_tempo = db.query(func.count()).select_from(AtencaoAulaIntervalo).scalar()
+    db.close()
+
+    analise, ms_analise = medir(lambda db: calcular_analise_bruta(db, 1), sessao)
+    mineracao, ms_mineracao = medir(lambda db: calcular_mineracao(db, 1), sessao)
+    db = sessao()
+    agregados = calcular_analise(db, 1)
+    db.close()
+    engine.dispose()
+    total = linhas + presencas + linha_tempo
+    return {
+        "linhas": linhas,
+        "linhas_presencas": presencas,
+        "linhas_linha_tempo": linha_tempo,
+        "linhas_total": total,
+        "linhas_por_amostra": round(total / (args.alunos * args.amostras), 3),
+        "gravacao_ms_por_lote": round(statistics.median(tempos), 3),
+        "analise_bruta_ms": round(ms_analise, 2),
+        "mineracao_ms": round(ms_mineracao, 2),
+    }, analise, mineracao, agregados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=200)
+    parser.add_argument("--amostras", type=int, default=1800, help="amostras por aluno (2s cada)")
+    parser.add_argument("--persistencia", type=float, default=30,
+                        help="amostras, em média, até o olhar do aluno mudar de estado")
+    parser.add_argument("--tolerancia", type=float, nargs="+", default=[0.02, 0.05, 0.1])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    resultados = []
+    referencia = None
+    for tolerancia in [None] + args.tolerancia:
+        medidas, analise, mineracao, agregados = executar(args, tolerancia)
+        if referencia is None:
+            referencia = (medidas, analise, mineracao)
+        resultados.append({
+            "armazenamento": "amostras" if tolerancia is None else f"intervalos tol={tolerancia}",
+            **medidas,
+            "reducao_linhas": round(referencia[0]["linhas"] / medidas["linhas"], 1),
+            "reducao_total": round(referencia[0]["linhas_total"] / medidas["linhas_total"], 1),
+            "analise_igual": analise == referencia[1] and agregados == referencia[1],
+            # médias sobre somas em ponto flutuante feitas em outra ordem
+            "mineracao_igual": all(math.isclose(v, referencia[2][k]) if isinstance(v, float) else v == referencia[2][k]
+                                   for k, v in mineracao.items()),
+        })
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark do motor de intervenções (intervencoes.py)
+
+Simula `--alunos` alunos enviando uma amostra de atenção a cada 2 segundos,
+com estado persistente (o olhar sai da tela em média a cada
+`--persistencia` amostras e a fadiga deriva devagar), e compara:
+- buffer: MotorIntervencoes, janelas em buffers circulares com somas correntes
+- deque: a mesma regra com uma deque de dicts por aluno, somada a cada amostra
+- cliente: a regra que o StudentView aplicava, amostra a amostra, sem janela
+
+Reporta amostras por segundo em um núcleo, memória das janelas por aluno
+(tracemalloc) e intervenções disparadas, e o custo por lote de gravar as
+intervenções na transação da ingestão, com as janelas em memória e no
+banco (vários workers).
+
+Uso:
+    python benchmarks/intervencoes.py [--alunos 2000] [--amostras 300] [--json]
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timedelta
+
+from _comum import banco_temporario, emitir
+from sqlalchemy import func, insert
+
+from intervencoes import COOLDOWN_S, JANELA_AMOSTRAS, MotorIntervencoes
+from models import Aluno, Aula, Docente, Intervencao
+
+
+def gerar_lotes(alunos, amostras, persistencia, semente=42):
+    """Lotes (um por passo de 2 s) com uma amostra de cada aluno"""
+    rnd = random.Random(semente)
+    inicio = datetime.now().replace(microsecond=0) - timedelta(seconds=2 * amostras)
+    estados = {a: [True, rnd.uniform(0.1, 0.6)] for a in range(1, alunos + 1)}
+    lotes = []
+    for passo in range(amostras):
+        momento = inicio + timedelta(seconds=2 * passo)
+        lote = []
+        for aluno, estado in estados.items():
+            if rnd.random() < 1 / persistencia:
+                estado[0] = not estado[0]
+            estado[1] = min(1.0, max(0.0, estado[1] + rnd.gauss(0.001, 0.01)))
+            lote.append({
+                "aluno_id": aluno, "aula_id": 1, "gaze_na_tela": estado[0] or rnd.random() < 0.9,
+                "fadiga_score": round(estado[1], 3), "desvio_olhar": 0 if estado[0] else 1,
+                "interrupcoes": 0, "timestamp": momento,
+            })
+        lotes.append(lote)
+    return lotes
+
+
+class _MotorDeque:
+    """Mesmas regras de MotorIntervencoes, com a janela como deque de dicts"""
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.janelas = {}
+        self.liberado = {}
+
+    def avaliar(self, atencao):
+        disparos = []
+        for m in atencao:
+            chave = (m["aula_id"], m["aluno_id"])
+            janela = self.janelas.get(chave)
+            if janela is None:
+                janela = self.janelas[chave] = deque(maxlen=self.motor.capacidade)
+            if janela and m["timestamp"] - janela[-1]["timestamp"] > self.motor.lacuna:
+                janela.clear()
+            janela.append(m)
+            n = len(janela)
+            if n < self.motor.minimo:
+                continue
+            fora = sum(1 for a in janela if not a["gaze_na_tela"])
+            fadiga = sum(a["fadiga_score"] for a in janela) / n
+            if fora >= self.motor.limite_desatencao * n:
+                self._disparar(chave, "attention", m["timestamp"], disparos)
+            if fadiga * 1000 > self.motor.limite_fadiga:
+                self._disparar(chave, "fatigue", m["timestamp"], disparos)
+        return disparos
+
+    def _disparar(self, chave, tipo, momento, disparos):
+        if momento < self.liberado.get((chave, tipo), datetime.min):
+            return
+        self.liberado[(chave, tipo)] = momento + self.motor.cooldown
+        disparos.append((chave, tipo))
+
+
+class _MotorCliente:
+    """A regra do StudentView: qualquer amostra fora da tela ou com fadiga > 0.7"""
+
+    def __init__(self):
+        self.liberado = {}
+
+    def avaliar(self, atencao):
+        disparos = []
+        for m in atencao:
+            chave = (m["aula_id"], m["aluno_id"])
+            for tipo, condicao in (("attention", not m["gaze_na_tela"]), ("fatigue", m["fadiga_score"] > 0.7)):
+                if condicao and m["timestamp"] >= self.liberado.get((chave, tipo), datetime.min):
+                    self.liberado[(chave, tipo)] = m["timestamp"] + timedelta(seconds=COOLDOWN_S)
+                    disparos.append((chave, tipo))
+        return disparos
+
+
+def medir_motor(nome, criar, lotes, janelas):
+    motor = criar()
+    disparos = 0
+    inicio = time.process_time()
+    for lote in lotes:
+        disparos += len(motor.avaliar(lote))
+    segundos = time.process_time() - inicio
+
+    # memória em uma segunda passada: o tracemalloc deixa tudo mais lento
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    motor = criar()
+    for lote in lotes:
+        motor.avaliar(lote)
+    memoria = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+
+    amostras = sum(len(lote) for lote in lotes)
+    alunos = len(janelas(motor))
+    return {
+        "implementacao": nome,
+        "amostras": amostras,
+        "amostras_por_s": round(amostras / segundos),
+        "us_por_amostra": round(segundos / amostras * 1e6, 2),
+        "bytes_por_aluno": round(memoria / alunos) if alunos else 0,
+        "intervencoes": disparos,
+    }
+
+
+def medir_gravacao(lotes, alunos, compartilhado):
+    """
+    Custo do motor na transação de cada lote da fila de ingestão, com o
+    INSERT das intervenções; com `compartilhado`, lendo e gravando as
+    janelas em janelas_intervencao, como com vários workers
+    """
+    _, engine, sessao = banco_temporario()
+    with engine.begin() as conn:
+        conn.execute(insert(Docente), [{"id": 1, "nome": "Docente", "email": "docente@bench"}])
+        conn.execute(insert(Aluno), [{"id": i, "nome": f"Aluno {i}", "email": f"aluno{i}@bench"}
+                                     for i in range(1, alunos + 1)])
+        conn.execute(insert(Aula), [{"id": 1, "titulo": "Aula 1", "descricao": "", "docente_id": 1}])
+    motor = MotorIntervencoes(ativo=True, compartilhado=compartilhado)
+    db = sessao()
+    tempos = []
+    for lote in lotes:
+        inicio = time.perf_counter()
+        janelas = motor.processar(db, lote)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        db.commit()
+        motor.confirmar(janelas)
+    gravadas = db.query(func.count(Intervencao.id)).scalar()
+    db.close()
+    engine.dispose()
+    return {
+        "implementacao": "banco+insert" if compartilhado else "buffer+insert", "amostras_por_lote": alunos,
+        "mediana_ms_por_lote": round(statistics.median(tempos), 3),
+        "p99_ms_por_lote": round(sorted(tempos)[int(len(tempos) * 0.99)], 3),
+        "intervencoes": gravadas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=2000)
+    parser.add_argument("--amostras", type=int, default=300, help="amostras por aluno (2s cada)")
+    parser.add_argument("--persistencia", type=float, default=30,
+                        help="amostras, em média, até o olhar do aluno mudar de estado")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    lotes = gerar_lotes(args.alunos, args.amostras, args.persistencia)
+    resultados = [
+        medir_motor("buffer", lambda: MotorIntervencoes(ativo=True), lotes, lambda m: m._janelas),
+        medir_motor("deque", lambda: _MotorDeque(MotorIntervencoes(ativo=True)), lotes, lambda m: m.janelas),
+        medir_motor("cliente", _MotorCliente, lotes, lambda m: {c for c, _ in m.liberado}),
+    ]
+    resultados[0]["janela_amostras"] = JANELA_AMOSTRAS
+    resultados.append(medir_gravacao(lotes, args.alunos, compartilhado=False))
+    resultados.append(medir_gravacao(lotes, args.alunos, compartilhado=True))
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
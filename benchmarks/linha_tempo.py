@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark da linha do tempo da atenção da turma
+
+Para uma aula de `--amostras` amostras por aluno (2 s cada; 3600 = 2
+horas), compara o custo de GET /api/analise/{aula_id}/timeline:
+- bruta_sql: GROUP BY por intervalo sobre metricas_atencao a cada consulta
+- mantida: leitura de atencao_aula_intervalos (linha_tempo.py)
+e confere que as duas curvas são iguais. Mede também o custo da
+manutenção na ingestão, por lote de amostras de todos os alunos.
+
+Uso:
+    python benchmarks/linha_tempo.py [--alunos 300] [--amostras 3600] [--bucket 30s 5m] [--json]
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from _comum import banco_temporario, emitir, popular_turma
+from sqlalchemy import DateTime, Integer, case, cast, func, select, type_coerce
+
+from linha_tempo import calcular_linha_tempo, intervalo_segundos, reconstruir_linha_tempo, registrar_atencao
+from models import MetricaAtencao
+
+
+def linha_tempo_bruta(db, aula_id, segundos):
+    """Mesma curva calculada sobre as amostras brutas (SQLite)"""
+    epoca = cast(func.strftime("%s", MetricaAtencao.timestamp), Integer)
+    inicio = epoca - epoca % segundos
+    linhas = db.execute(
+        select(
+            type_coerce(func.datetime(inicio, "unixepoch"), DateTime),
+            func.count(MetricaAtencao.id),
+            func.sum(case((MetricaAtencao.gaze_na_tela, 1), else_=0)),
+            func.sum(MetricaAtencao.fadiga_score),
+            func.count(func.distinct(MetricaAtencao.aluno_id)),
+        ).where(MetricaAtencao.aula_id == aula_id).group_by(inicio).order_by(inicio)
+    ).all()
+    return [
+        {
+            "inicio": momento,
+            "fim": momento + timedelta(seconds=segundos),
+            "amostras": amostras,
+            "score_atencao": round(na_tela / amostras * 100, 2),
+            "score_fadiga": round(fadiga / amostras, 2),
+            "alunos_ativos": ativos,
+        }
+        for momento, amostras, na_tela, fadiga, ativos in linhas
+    ]
+
+
+def medir(sessao, funcao, repeticoes):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        db = sessao()
+        try:
+            inicio = time.perf_counter()
+            resultado = funcao(db)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            db.close()
+    return resultado, statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=300)
+    parser.add_argument("--amostras", type=int, default=3600, help="amostras por aluno (2s cada)")
+    parser.add_argument("--bucket", nargs="+", default=["30s", "5m"])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    # começa alinhado ao minuto: a curva bruta usa intervalos alinhados à época
+    inicio_aula = datetime.now().replace(second=0, microsecond=0) - timedelta(seconds=2 * args.amostras)
+    _, engine, sessao = banco_temporario()
+    popular_turma(engine, args.alunos, args.amostras, inicio=inicio_aula)
+    resultados = []
+
+    db = sessao()
+    inicio = time.perf_counter()
+    reconstruir_linha_tempo(db)
+    db.commit()
+    db.close()
+    resultados.append({"etapa": "reconstrucao", "amostras": args.alunos * args.amostras,
+                       "ms": round((time.perf_counter() - inicio) * 1000, 1)})
+
+    for bucket in args.bucket:
+        segundos = intervalo_segundos(bucket)
+        referencia, ms_bruta = medir(sessao, lambda db: linha_tempo_bruta(db, 1, segundos), args.repeticoes)
+        mantida, ms_mantida = medir(sessao, lambda db: calcular_linha_tempo(db, 1, segundos), args.repeticoes)
+        for nome, ms, curva in (("bruta_sql", ms_bruta, referencia), ("mantida", ms_mantida, mantida)):
+            resultados.append({
+                "etapa": "consulta", "bucket": bucket, "implementacao": nome, "intervalos": len(curva),
+                "mediana_ms": round(ms, 2), "igual_bruta": curva == referencia,
+            })
+
+    # Ingestão: um lote com uma amostra de cada aluno, como na cadência de 2 s
+    db = sessao()
+    tempos = []
+    momento = datetime.now()
+    for passo in range(50):
+        lote = [{"aluno_id": aluno, "aula_id": 2, "gaze_na_tela": True, "fadiga_score": 0.3,
+                 "timestamp": momento + timedelta(seconds=2 * passo)} for aluno in range(1, args.alunos + 1)]
+        inicio = time.perf_counter()
+        registrar_atencao(db, lote)
+        db.commit()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    db.close()
+    resultados.append({"etapa": "ingestao", "amostras_por_lote": args.alunos,
+                       "mediana_ms": round(statistics.median(tempos), 2)})
+
+    engine.dispose()
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
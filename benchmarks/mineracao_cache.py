@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/mineracao-dados: implementação anterior x SQL x cache
+
+Para turmas de 30/300/3000 alunos (com `--logs` logs de interação por
+aluno), mede a latência de:
+- legado: carrega todos os logs, amostras e sessões da aula e conta em Python
+- sql: agregação no banco (mineracao.calcular_mineracao)
+- cache: leitura repetida com o resultado em cache_mineracao
+
+e simula um painel relendo a mineração enquanto a aula recebe escritas a
+cada `--escrita-a-cada` leituras, reportando a taxa de acerto do cache.
+
+Uso:
+    python benchmarks/mineracao_cache.py [--alunos 30 300 3000] [--amostras 30] [--logs 10] [--json]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+
+from _comum import banco_temporario, emitir, popular_turma
+
+from sqlalchemy import insert
+
+from cache import CacheLRU
+from mineracao import calcular_mineracao
+from models import LogInteracao, MetricaAtencao, SessaoInteracao
+
+TIPOS = ("quiz", "anotacao", "material", "pausa", "video")
+
+
+def mineracao_legada(db, aula_id):
+    """Cópia da versão anterior de analisar_dados_educacionais"""
+    logs = db.query(LogInteracao).filter(LogInteracao.aula_id == aula_id).all()
+    padroes_interacao = {}
+    for log in logs:
+        padroes_interacao[log.tipo_interacao] = padroes_interacao.get(log.tipo_interacao, 0) + 1
+    metricas_atencao = db.query(MetricaAtencao).filter(MetricaAtencao.aula_id == aula_id).all()
+    sessoes = db.query(SessaoInteracao).filter(SessaoInteracao.aula_id == aula_id).all()
+    return {
+        "total_alunos": len(set(log.aluno_id for log in logs)),
+        "padroes_interacao": padroes_interacao,
+        "media_atencao": sum(m.gaze_na_tela for m in metricas_atencao) / len(metricas_atencao) if metricas_atencao else 0,
+        "media_fadiga": sum(m.fadiga_score for m in metricas_atencao) / len(metricas_atencao) if metricas_atencao else 0,
+        "total_interacoes": len(logs),
+        "media_cliques": sum(s.cliques_materiais for s in sessoes) / len(sessoes) if sessoes else 0
+    }
+
+
+def mediana_ms(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tempos), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, nargs="+", default=[30, 300, 3000])
+    parser.add_argument("--amostras", type=int, default=30, help="amostras por aluno (2s cada)")
+    parser.add_argument("--logs", type=int, default=10, help="logs de interação por aluno")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--leituras", type=int, default=1000, help="leituras do painel na simulação")
+    parser.add_argument("--escrita-a-cada", type=int, default=20, help="leituras entre escritas na aula")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    resultados = []
+    for alunos in args.alunos:
+        _, engine, sessao = banco_temporario()
+        popular_turma(engine, alunos, args.amostras)
+        rnd = random.Random(alunos)
+        with engine.begin() as conn:
+            conn.execute(insert(LogInteracao), [
+                {"aluno_id": aluno, "aula_id": 1, "tipo_interacao": rnd.choice(TIPOS),
+                 "detalhes": {}, "timestamp": datetime.now()}
+                for aluno in range(1, alunos + 1) for _ in range(args.logs)
+            ])
+
+        db = sessao()
+        try:
+            legado = mineracao_legada(db, 1)
+            sql = calcular_mineracao(db, 1)
+            iguais = (legado["padroes_interacao"] == sql["padroes_interacao"]
+                      and all(abs(legado[k] - sql[k]) < 1e-9 for k in legado if k != "padroes_interacao"))
+
+            cache = CacheLRU(256, 30)
+            cache.obter_ou_calcular(1, lambda: calcular_mineracao(db, 1))
+            linha = {
+                "alunos": alunos,
+                "logs": alunos * args.logs,
+                "legado_ms": mediana_ms(lambda: mineracao_legada(db, 1), args.repeticoes),
+                "sql_ms": mediana_ms(lambda: calcular_mineracao(db, 1), args.repeticoes),
+                "cache_ms": mediana_ms(lambda: cache.obter_ou_calcular(1, lambda: calcular_mineracao(db, 1)), 100),
+                "resultados_iguais": iguais,
+            }
+
+            # Painel relendo enquanto a aula recebe escritas
+            cache = CacheLRU(256, 30)
+            inicio = time.perf_counter()
+            for leitura in range(args.leituras):
+                if leitura % args.escrita_a_cada == 0:
+                    cache.invalidar(1)
+                cache.obter_ou_calcular(1, lambda: calcular_mineracao(db, 1))
+            linha["simulacao_media_ms"] = round((time.perf_counter() - inicio) * 1000 / args.leituras, 3)
+            linha["taxa_acerto"] = round(cache.taxa_acerto(), 3)
+        finally:
+            db.close()
+        engine.dispose()
+        resultados.append(linha)
+
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
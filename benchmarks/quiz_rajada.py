@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark de rajada de respostas de quiz
+
+O docente lança o quiz e `--alunos` alunos respondem dentro de `--janela`
+segundos, todos para o mesmo quiz_id. Compara, com o app ASGI no mesmo
+processo (httpx.ASGITransport):
+- legado: a implementação anterior de POST /api/respostas-quiz (lê o Quiz,
+  corrige e faz um commit por resposta), montada em uma rota à parte
+- atual: gabarito em cache e gravação em lote pela fila de ingestão
+
+Reporta latência p50/p95/p99, vazão, consultas ao Quiz e commits.
+
+Uso:
+    python benchmarks/quiz_rajada.py [--alunos 100 500 1000] [--janela 2] [--json]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+# o backend lê DATABASE_URL ao ser importado (inclusive via _comum)
+CAMINHO = os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "quiz.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{CAMINHO}"
+
+from _comum import emitir, percentis  # noqa: E402
+from carga_aula import preparar_banco  # noqa: E402
+
+
+def rota_legada(app):
+    """Cópia da versão anterior do endpoint, montada em /bench/respostas-quiz-legado"""
+    from fastapi import HTTPException
+
+    from database import SessionLocal
+    from main import RespostaQuizCreate
+    from models import Quiz, RespostaQuiz
+
+    def registrar_resposta_quiz_legado(resposta: RespostaQuizCreate):
+        db = SessionLocal()
+        try:
+            quiz = db.query(Quiz).filter(Quiz.id == resposta.quiz_id).first()
+            if not quiz:
+                raise HTTPException(status_code=404, detail="Quiz não encontrado")
+            pontuacao = 0
+            total_perguntas = len(quiz.respostas_certas)
+            for pergunta_id, resposta_aluno in resposta.respostas.items():
+                if pergunta_id in quiz.respostas_certas and quiz.respostas_certas[pergunta_id] == resposta_aluno:
+                    pontuacao += 1
+            pontuacao_final = (pontuacao / total_perguntas) * 100 if total_perguntas > 0 else 0
+            nova_resposta = RespostaQuiz(quiz_id=resposta.quiz_id, aluno_id=resposta.aluno_id,
+                                         respostas=resposta.respostas, pontuacao=pontuacao_final,
+                                         tempo_resposta=resposta.tempo_resposta)
+            db.add(nova_resposta)
+            db.commit()
+            db.refresh(nova_resposta)
+            return nova_resposta
+        finally:
+            db.close()
+
+    app.add_api_route("/bench/respostas-quiz-legado", registrar_resposta_quiz_legado, methods=["POST"])
+
+
+class ContadorSQL:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.quiz = 0
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._consulta)
+        event.listen(engine, "commit", self._commit)
+
+    def _consulta(self, conexao, cursor, sql, *args):
+        if sql.lstrip().upper().startswith("SELECT") and "FROM quizzes" in sql:
+            self.quiz += 1
+
+    def _commit(self, conexao):
+        self.commits += 1
+
+
+async def rajada(cliente, caminho, quiz_id, alunos, janela, semente):
+    rnd = random.Random(semente)
+    latencias = []
+    erros = 0
+
+    async def aluno(aluno_id):
+        nonlocal erros
+        await asyncio.sleep(rnd.uniform(0, janela))
+        inicio = time.perf_counter()
+        resposta = await cliente.post(caminho, json={
+            "quiz_id": quiz_id, "aluno_id": aluno_id,
+            "respostas": {str(p): rnd.choice("abcd") for p in range(1, 6)},
+            "tempo_resposta": rnd.randint(20, 120),
+        })
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if resposta.status_code >= 400:
+            erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(aluno(a) for a in range(1, alunos + 1)))
+    return latencias, erros, time.perf_counter() - inicio
+
+
+async def executar(args):
+    from sqlalchemy import insert
+
+    from database import engine
+    from main import app
+    from models import Quiz
+
+    rota_legada(app)
+    contador = ContadorSQL(engine)
+    resultados = []
+    transporte = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://quiz", timeout=120) as cliente:
+            for alunos in args.alunos:
+                for nome, caminho in (("legado", "/bench/respostas-quiz-legado"), ("atual", "/api/respostas-quiz")):
+                    # um quiz novo por rodada: o gabarito começa fora do cache
+                    with engine.begin() as conn:
+                        quiz_id = conn.execute(insert(Quiz).values(
+                            aula_id=1, titulo=f"Quiz {nome} {alunos}", descricao="", perguntas={},
+                            respostas_certas={str(p): "a" for p in range(1, 6)},
+                        )).inserted_primary_key[0]
+                    consultas, commits = contador.quiz, contador.commits
+                    latencias, erros, duracao = await rajada(cliente, caminho, quiz_id, alunos, args.janela, alunos)
+                    resultados.append({
+                        "alunos": alunos,
+                        "implementacao": nome,
+                        **percentis(latencias),
+                        "vazao_rps": round(alunos / duracao, 1),
+                        "erros": erros,
+                        "consultas_quiz": contador.quiz - consultas,
+                        "commits": contador.commits - commits,
+                    })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--janela", type=float, default=2.0, help="segundos em que as respostas chegam")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    preparar_banco(CAMINHO, max(args.alunos))
+    emitir(asyncio.run(executar(args)), args.json)
+
+
+if __name__ == "__main__":
+    main()
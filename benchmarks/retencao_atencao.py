@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark da compactação por minuto das amostras de atenção
+
+Gera um semestre sintético (uma aula a cada `--espaco-dias` dias, todos os
+alunos presentes em todas), mede o tamanho do banco após VACUUM e a
+latência da análise da turma (cálculo bruto) e da média de atenção da
+mineração, antes e depois de `retencao.compactar_atencao`. Confere que os
+resultados não mudam.
+
+Uso:
+    python benchmarks/retencao_atencao.py [--alunos 40] [--aulas 30] [--amostras 900] [--dias 30] [--json]
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from _comum import banco_temporario, emitir, popular_turma
+
+from sqlalchemy import func, text
+
+from agregados import atencao_por_aluno, calcular_analise_bruta
+from retencao import compactar_atencao
+
+
+def tamanho_mb(engine, caminho):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+        conexao.execute(text("VACUUM"))
+        conexao.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return round(os.path.getsize(caminho) / 1024 / 1024, 2)
+
+
+def media_atencao(db, aula_id):
+    atencao = atencao_por_aluno(aula_id)
+    total, na_tela = db.query(func.sum(atencao.c.total_checks), func.sum(atencao.c.checks_na_tela)).one()
+    return round(na_tela / total, 6) if total else 0
+
+
+def medir(sessao, aulas, repeticoes):
+    """Mediana (ms) das consultas sobre todas as aulas e os resultados"""
+    tempos = {"analise_ms": [], "mineracao_ms": []}
+    analises = {}
+    medias = {}
+    for _ in range(repeticoes):
+        db = sessao()
+        try:
+            inicio = time.perf_counter()
+            for aula in aulas:
+                analises[aula] = calcular_analise_bruta(db, aula)
+            tempos["analise_ms"].append((time.perf_counter() - inicio) * 1000)
+
+            inicio = time.perf_counter()
+            for aula in aulas:
+                medias[aula] = media_atencao(db, aula)
+            tempos["mineracao_ms"].append((time.perf_counter() - inicio) * 1000)
+        finally:
+            db.close()
+    medianas = {k: round(statistics.median(v), 2) for k, v in tempos.items()}
+    return medianas, analises, medias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=40)
+    parser.add_argument("--aulas", type=int, default=30)
+    parser.add_argument("--amostras", type=int, default=900, help="amostras por aluno por aula (2s cada)")
+    parser.add_argument("--espaco-dias", type=float, default=4, help="dias entre aulas")
+    parser.add_argument("--dias", type=float, default=30, help="idade mínima das amostras compactadas")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    caminho, engine, sessao = banco_temporario()
+    agora = datetime.now()
+    for aula in range(1, args.aulas + 1):
+        inicio = agora - timedelta(days=(args.aulas - aula + 1) * args.espaco_dias)
+        popular_turma(engine, args.alunos, args.amostras, aula_id=aula, semente=aula,
+                      inicio=inicio, cadastros=aula == 1)
+    aulas = list(range(1, args.aulas + 1))
+
+    resultados = []
+    antes, analises_antes, medias_antes = medir(sessao, aulas, args.repeticoes)
+    resultados.append({"etapa": "bruto", "tamanho_mb": tamanho_mb(engine, caminho), **antes})
+
+    db = sessao()
+    try:
+        inicio = time.perf_counter()
+        baldes, removidas = compactar_atencao(db, args.dias, agora=agora)
+        duracao = round((time.perf_counter() - inicio) * 1000, 1)
+    finally:
+        db.close()
+
+    depois, analises_depois, medias_depois = medir(sessao, aulas, args.repeticoes)
+    resultados.append({
+        "etapa": "compactado", "tamanho_mb": tamanho_mb(engine, caminho), **depois,
+        "amostras_removidas": removidas, "baldes": baldes, "compactacao_ms": duracao,
+        "resultados_iguais": analises_antes == analises_depois and medias_antes == medias_depois,
+    })
+    engine.dispose()
+    emitir(resultados, args.json)
+
+
+if __name__ == "__main__":
+    main()
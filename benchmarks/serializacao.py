@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialização das respostas por endpoint
+
+Para o conteúdo típico de cada endpoint (objetos do ORM lidos de um banco
+temporário), compara o custo de transformar a resposta em bytes:
+- legado: sem response_model, como antes — jsonable_encoder introspecta
+  cada objeto do ORM e JSONResponse usa o json da biblioteca padrão
+- modelo: o schema de resposta do endpoint (pydantic, from_attributes),
+  renderizado com JSONResponse
+- modelo+orjson: o mesmo, renderizado com a classe de resposta padrão do
+  app (ORJSONResponse quando o orjson está instalado)
+
+Em seguida conta os comandos SQL de cada POST de alta frequência em cada
+modo de `?confirmacao=`.
+
+Uso:
+    python benchmarks/serializacao.py [--repeticoes 2000] [--json]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+# o backend lê DATABASE_URL ao ser importado (inclusive via _comum)
+CAMINHO = os.path.join(tempfile.mkdtemp(prefix="bench_monitoramento_"), "serializacao.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{CAMINHO}"
+
+from _comum import ContadorConsultas, emitir, popular_turma  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from database import SessionLocal, engine  # noqa: E402
+from main import (AulaResposta, LogInteracaoResposta, MetricaAtencaoResposta, Pagina, QuizResposta,  # noqa: E402
+                  RespostaJSON, SessaoInteracaoResposta, app)
+from models import Aula, LogInteracao, MetricaAtencao, Quiz, SessaoInteracao  # noqa: E402
+from paginacao import paginar  # noqa: E402
+
+
+def preparar():
+    popular_turma(engine, 50, 10)
+    with engine.begin() as conn:
+        conn.execute(insert(Aula), [
+            {"titulo": f"Aula {i}", "descricao": "Descrição da aula " * 10, "docente_id": 1} for i in range(2, 60)
+        ])
+        conn.execute(insert(Quiz), [
+            {"aula_id": 1, "titulo": f"Quiz {i}", "descricao": "",
+             "perguntas": {str(p): {"enunciado": f"Pergunta {p}", "opcoes": list("abcd")} for p in range(1, 11)},
+             "respostas_certas": {str(p): "a" for p in range(1, 11)}}
+            for i in range(50)
+        ])
+        conn.execute(insert(LogInteracao), [
+            {"aluno_id": 1, "aula_id": 1, "tipo_interacao": "click", "detalhes": {"material": i, "x": 10, "y": 20}}
+            for i in range(200)
+        ])
+
+
+def conteudos(db):
+    """endpoint -> (conteúdo como o endpoint retorna, tipo do response_model)"""
+    return {
+        "GET /api/aulas": (paginar(db.query(Aula), [Aula.id]), Pagina[AulaResposta]),
+        "GET /api/quizzes/{aula_id}": (
+            paginar(db.query(Quiz).filter(Quiz.aula_id == 1), [Quiz.criado_em, Quiz.id]), Pagina[QuizResposta]),
+        "GET /api/logs-interacao": (
+            paginar(db.query(LogInteracao), [LogInteracao.timestamp, LogInteracao.id], limite=200, decrescente=True),
+            Pagina[LogInteracaoResposta]),
+        "POST /api/metricas/atencao": (db.query(MetricaAtencao).first(), MetricaAtencaoResposta),
+        "POST /api/metricas/interacao": (db.query(SessaoInteracao).first(), SessaoInteracaoResposta),
+    }
+
+
+def medir(funcao, repeticoes):
+    funcao()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        corpo = funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6, len(corpo)
+
+
+def serializacao(repeticoes):
+    resultados = []
+    db = SessionLocal()
+    try:
+        for endpoint, (conteudo, tipo) in conteudos(db).items():
+            adaptador = TypeAdapter(tipo)
+
+            def pelo_modelo(classe):
+                valor = adaptador.validate_python(conteudo, from_attributes=True)
+                return classe(content=adaptador.dump_python(valor, mode="json")).body
+
+            implementacoes = {
+                "legado": lambda: JSONResponse(content=jsonable_encoder(conteudo)).body,
+                "modelo": lambda: pelo_modelo(JSONResponse),
+                "modelo+" + ("orjson" if RespostaJSON is not JSONResponse else "json"):
+                    lambda: pelo_modelo(RespostaJSON),
+            }
+            base = None
+            for nome, funcao in implementacoes.items():
+                us, tamanho = medir(funcao, repeticoes)
+                base = base or us
+                resultados.append({
+                    "endpoint": endpoint, "implementacao": nome, "us": round(us, 1),
+                    "bytes": tamanho, "aceleracao": round(base / us, 2),
+                })
+    finally:
+        db.close()
+    return resultados
+
+
+def consultas_por_escrita():
+    contador = ContadorConsultas(engine)
+    atencao = {"aluno_id": 1, "aula_id": 1, "gaze_na_tela": True, "fadiga_score": 0.3,
+               "desvio_olhar": 0, "interrupcoes": 0}
+    interacao = {"aluno_id": 2, "aula_id": 1, "tempo_permanencia": 40, "eventos_player": {"play": 1},
+                 "cliques_materiais": 1, "sessao_id": "bench-2"}
+    log = {"aluno_id": 1, "aula_id": 1, "tipo_interacao": "click", "detalhes": {"x": 1}}
+    resultados = []
+    with TestClient(app) as cliente:
+        for caminho, corpo in (("/api/metricas/atencao", atencao), ("/api/metricas/interacao", interacao),
+                               ("/api/logs-interacao", log)):
+            for confirmacao in ("completa", "id", "nenhuma"):
+                antes = contador.total
+                resposta = cliente.post(f"{caminho}?confirmacao={confirmacao}", json=corpo)
+                resultados.append({
+                    "endpoint": f"POST {caminho}", "confirmacao": confirmacao, "status": resposta.status_code,
+                    "consultas_sql": contador.total - antes, "bytes": len(resposta.content),
+                })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    preparar()
+    emitir(serializacao(args.repeticoes) + consultas_por_escrita(), args.json)
+
+
+if __name__ == "__main__":
+    main()
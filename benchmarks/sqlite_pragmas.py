@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Teste de carga: SQLite padrão x WAL + pragmas de database.py
+
+Simula tráfego misto por um tempo fixo: threads de ingestão gravando uma
+amostra de atenção por transação (como POST /api/metricas/atencao) e
+threads de painel lendo a análise da turma (como GET /api/analise).
+Reporta gravações por segundo, latência p50/p95/p99 das leituras e erros.
+
+Uso:
+    python benchmarks/sqlite_pragmas.py [--alunos 300] [--escritores 16] [--leitores 4] [--segundos 10] [--json]
+"""
+
+import argparse
+import random
+import threading
+import time
+from datetime import datetime
+
+from _comum import banco_temporario, emitir, percentis, popular_turma
+
+from agregados import aplicar_atencao, calcular_analise, reconstruir_agregados
+from models import MetricaAtencao
+
+CONFIGURACOES = {
+    # Padrões do SQLite: journal_mode=DELETE, synchronous=FULL, sem busy_timeout
+    "padrao": {},
+    "ajustado": None,  # SQLITE_PRAGMAS de database.py
+}
+
+
+def executar(nome, pragmas, args):
+    _, engine, sessao = banco_temporario(pragmas=pragmas)
+    popular_turma(engine, args.alunos, 10)
+    db = sessao()
+    reconstruir_agregados(db)
+    db.commit()
+    db.close()
+
+    parar = threading.Event()
+    gravacoes = []
+    leituras = []
+    erros = []
+
+    def escritor(semente):
+        rnd = random.Random(semente)
+        total = 0
+        while not parar.is_set():
+            linha = {
+                "aluno_id": rnd.randint(1, args.alunos), "aula_id": 1,
+                "gaze_na_tela": rnd.random() < 0.8, "fadiga_score": rnd.random(),
+                "desvio_olhar": 0, "interrupcoes": 0, "timestamp": datetime.now(),
+            }
+            db = sessao()
+            try:
+                db.add(MetricaAtencao(**linha))
+                aplicar_atencao(db, [linha])
+                db.commit()
+                total += 1
+            except Exception as e:
+                db.rollback()
+                erros.append(type(e).__name__)
+            finally:
+                db.close()
+        gravacoes.append(total)
+
+    def leitor():
+        while not parar.is_set():
+            db = sessao()
+            inicio = time.perf_counter()
+            try:
+                calcular_analise(db, 1)
+                leituras.append((time.perf_counter() - inicio) * 1000)
+            except Exception as e:
+                erros.append(type(e).__name__)
+            finally:
+                db.close()
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=escritor, args=(i,)) for i in range(args.escritores)]
+    threads += [threading.Thread(target=leitor) for _ in range(args.leitores)]
+    for t in threads:
+        t.start()
+    time.sleep(args.segundos)
+    parar.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        "configuracao": nome,
+        "gravacoes_por_s": round(sum(gravacoes) / args.segundos, 1),
+        "leituras": len(leituras),
+        **{f"leitura_{k}_ms": v for k, v in percentis(leituras).items()},
+        "erros": len(erros),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alunos", type=int, default=300)
+    parser.add_argument("--escritores", type=int, default=16)
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    emitir([executar(nome, pragmas, args) for nome, pragmas in CONFIGURACOES.items()], args.json)
+
+
+if __name__ == "__main__":
+    main()
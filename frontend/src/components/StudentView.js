@@ -3,6 +3,8 @@ import { FaceDetectionSystem } from '../utils/FaceDetection';
 import VideoPlayer from './VideoPlayer';
 import InterventionPopups from './InterventionPopups';
 import axios from 'axios';
+import { buscarPaginas } from '../utils/paginacao';
+import { codificarLote } from '../utils/loteBinario';
 import './StudentView.css';
 
 const API_BASE_URL = 'http://localhost:8000';
@@ -37,32 +39,40 @@ function StudentView() {
   const [personalizedSummary, setPersonalizedSummary] = useState(null);
 
   const faceDetectionRef = useRef(null);
+  const quizzesCursorRef = useRef(null);
+  const interventionsCursorRef = useRef(null);
+  const interventionsLoadedRef = useRef(false);
   const metricsIntervalRef = useRef(null);
   const startTimeRef = useRef(Date.now());
+  // Identifica este carregamento da página: o backend guarda só os
+  // contadores mais recentes de cada sessão
+  const sessionIdRef = useRef(`${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`);
 
-  const triggerIntervention = useCallback((type, message) => {
-    // Evitar múltiplas intervenções do mesmo tipo em pouco tempo
-    const recentInterventions = interventions.filter(
-      i => i.tipo === type && Date.now() - i.timestamp < 30000
-    );
-
-    if (recentInterventions.length === 0) {
-      const intervention = {
-        id: Date.now(),
-        tipo: type,
-        mensagem: message,
-        timestamp: Date.now()
-      };
-
-      setInterventions(prev => [...prev, intervention]);
+  // Intervenções decididas pelo backend a partir das métricas enviadas; a
+  // primeira busca só marca o ponto de partida, sem repetir as antigas
+  const loadInterventions = useCallback(async () => {
+    try {
+      const { itens, cursorRecente } = await buscarPaginas(
+        `${API_BASE_URL}/api/intervencoes/${aulaId}?aluno_id=${studentId}`, interventionsCursorRef.current
+      );
+      interventionsCursorRef.current = cursorRecente;
+      if (interventionsLoadedRef.current && itens.length > 0) {
+        setInterventions(prev => [...prev, ...itens]);
+      }
+      interventionsLoadedRef.current = true;
+    } catch (error) {
+      console.error('Erro ao buscar intervenções:', error);
     }
-  }, [interventions]);
+  }, [studentId, aulaId]);
 
   const sendMetrics = useCallback(async () => {
     try {
-      // Enviar métricas de atenção
+      const atencao = [];
+      const interacao = [];
+
+      // Métricas de atenção
       if (detectionData.faceDetected) {
-        await axios.post(`${API_BASE_URL}/api/metricas/atencao`, {
+        atencao.push({
           aluno_id: studentId,
           aula_id: aulaId,
           gaze_na_tela: detectionData.gazeOnScreen,
@@ -72,22 +82,31 @@ function StudentView() {
         });
       }
 
-      // Enviar métricas de interação
+      // Métricas de interação
       const currentTime = Math.floor((Date.now() - startTimeRef.current) / 1000);
       if (currentTime > 0) {
-        await axios.post(`${API_BASE_URL}/api/metricas/interacao`, {
+        interacao.push({
           aluno_id: studentId,
           aula_id: aulaId,
           tempo_permanencia: currentTime,
           eventos_player: interactionMetrics.eventosPlayer,
           cliques_materiais: interactionMetrics.cliquesMateriais,
-          conteudo_anotacoes: interactionMetrics.notas
+          conteudo_anotacoes: interactionMetrics.notas,
+          sessao_id: sessionIdRef.current
+        });
+      }
+
+      // Enviar tudo em uma única requisição, no formato binário
+      if (atencao.length + interacao.length > 0) {
+        await axios.post(`${API_BASE_URL}/api/metricas/lote/binario`, codificarLote(atencao, interacao), {
+          headers: { 'Content-Type': 'application/octet-stream' }
         });
+        await loadInterventions();
       }
     } catch (error) {
       console.error('Erro ao enviar métricas:', error);
     }
-  }, [detectionData, interactionMetrics, studentId, aulaId]);
+  }, [detectionData, interactionMetrics, studentId, aulaId, loadInterventions]);
 
   const handleCameraReady = useCallback(() => {
     setIsCameraReady(true);
@@ -98,26 +117,11 @@ function StudentView() {
     }, 2000); // Enviar a cada 2 segundos para tempo real
   }, [sendMetrics]);
 
+  // As regras de intervenção (atenção, fadiga, interação) são avaliadas no
+  // backend sobre as amostras enviadas, em janelas de vários segundos
   const handleDetectionUpdate = useCallback((data) => {
     setDetectionData(data);
-
-    // Verificar condições para intervenção
-    if (!data.gazeOnScreen && data.faceDetected) {
-      triggerIntervention('attention', 'Detectamos que sua atenção desviou. Mantenha o foco na tela.');
-    }
-
-    if (data.fatigueScore > 0.7) {
-      triggerIntervention('fatigue', 'Você parece cansado. Recomendamos uma pausa de 2 minutos.');
-    }
-
-    // Verificar baixa interação
-    const currentTime = Math.floor((Date.now() - startTimeRef.current) / 1000);
-    const interactionScore = (interactionMetrics.cliquesMateriais + Object.values(interactionMetrics.eventosPlayer).reduce((a, b) => a + b, 0));
-
-    if (currentTime > 120 && interactionScore < 2) {
-      triggerIntervention('interaction', 'Você não está interagindo com o material. Que tal fazer algumas anotações?');
-    }
-  }, [interactionMetrics.cliquesMateriais, interactionMetrics.eventosPlayer, triggerIntervention]);
+  }, []);
 
   useEffect(() => {
     async function initializeDetection() {
@@ -185,8 +189,14 @@ function StudentView() {
   // Funções para Quiz
   const loadQuizzes = useCallback(async () => {
     try {
-      const response = await axios.get(`${API_BASE_URL}/api/quizzes/${aulaId}`);
-      setQuizzes(response.data);
+      // Depois da primeira carga, busca só os quizzes criados desde a última
+      const { itens, cursorRecente } = await buscarPaginas(
+        `${API_BASE_URL}/api/quizzes/${aulaId}`, quizzesCursorRef.current
+      );
+      quizzesCursorRef.current = cursorRecente;
+      if (itens.length > 0) {
+        setQuizzes(prev => [...prev, ...itens]);
+      }
     } catch (error) {
       console.error('Erro ao carregar quizzes:', error);
     }
@@ -216,7 +226,7 @@ function StudentView() {
         aluno_id: studentId,
         respostas: quizAnswers,
         tempo_resposta: timeSpent
-      });
+      }, { params: { confirmacao: 'nenhuma' } });
 
       // Registrar log de interação
       await axios.post(`${API_BASE_URL}/api/logs-interacao`, {
@@ -224,7 +234,7 @@ function StudentView() {
         aula_id: aulaId,
         tipo_interacao: 'quiz',
         detalhes: { quiz_id: currentQuiz.id, pontuacao: 'calculada' }
-      });
+      }, { params: { confirmacao: 'nenhuma' } });
 
       setCurrentQuiz(null);
       setQuizAnswers({});
@@ -246,11 +256,14 @@ function StudentView() {
     }
   }, [studentId, aulaId]);
 
-  // Carregar quizzes e resumo ao montar componente
+  // Carregar quizzes e resumo ao montar componente; novos quizzes a cada 15s
   useEffect(() => {
     loadQuizzes();
+    loadInterventions();
     loadPersonalizedSummary();
-  }, [loadQuizzes, loadPersonalizedSummary]);
+    const interval = setInterval(loadQuizzes, 15000);
+    return () => clearInterval(interval);
+  }, [loadQuizzes, loadPersonalizedSummary, loadInterventions]);
 
   return (
     <div className="student-view">
@@ -1,8 +1,18 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import axios from 'axios';
+import { buscarPaginas } from '../utils/paginacao';
 import './TeacherDashboard.css';
 
 const API_BASE_URL = 'http://localhost:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+
+const NOMES_INTERVENCAO = {
+  attention: 'Atenção desviada',
+  fatigue: 'Fadiga',
+  interaction: 'Pouca interação'
+};
+
+const ordenarPorRisco = (alunos) => [...alunos].sort((a, b) => b.risco_evasao - a.risco_evasao);
 
 function TeacherDashboard() {
   const [analysis, setAnalysis] = useState(null);
@@ -10,6 +20,8 @@ function TeacherDashboard() {
   const [aulaId] = useState(1);
   const [quizzes, setQuizzes] = useState([]);
   const [dataMining, setDataMining] = useState(null);
+  const [interventions, setInterventions] = useState([]);
+  const interventionsCursorRef = useRef(null);
   const [showCreateQuiz, setShowCreateQuiz] = useState(false);
   const [newQuiz, setNewQuiz] = useState({
     titulo: '',
@@ -30,8 +42,8 @@ function TeacherDashboard() {
 
   const loadQuizzes = useCallback(async () => {
     try {
-      const response = await axios.get(`${API_BASE_URL}/api/quizzes/${aulaId}`);
-      setQuizzes(response.data);
+      const { itens } = await buscarPaginas(`${API_BASE_URL}/api/quizzes/${aulaId}`);
+      setQuizzes(itens);
     } catch (error) {
       console.error('Erro ao carregar quizzes:', error);
     }
@@ -46,13 +58,68 @@ function TeacherDashboard() {
     }
   }, [aulaId]);
 
+  // Intervenções disparadas pelo backend; depois da primeira carga, só as novas
+  const loadInterventions = useCallback(async () => {
+    try {
+      const { itens, cursorRecente } = await buscarPaginas(
+        `${API_BASE_URL}/api/intervencoes/${aulaId}`, interventionsCursorRef.current
+      );
+      interventionsCursorRef.current = cursorRecente;
+      if (itens.length > 0) {
+        setInterventions(prev => [...itens.reverse(), ...prev].slice(0, 20));
+      }
+    } catch (error) {
+      console.error('Erro ao carregar intervenções:', error);
+    }
+  }, [aulaId]);
+
+  useEffect(() => {
+    loadInterventions();
+    const interval = setInterval(loadInterventions, 5000);
+    return () => clearInterval(interval);
+  }, [loadInterventions]);
+
+  const applyAnalysisMessage = useCallback((mensagem) => {
+    if (mensagem.tipo === 'snapshot') {
+      setAnalysis({ aula_id: mensagem.aula_id, alunos: mensagem.alunos });
+      setLoading(false);
+      return;
+    }
+
+    // Delta: substituir apenas os alunos alterados
+    setAnalysis(prev => {
+      const alunos = new Map((prev?.alunos || []).map(a => [a.aluno_id, a]));
+      mensagem.removidos.forEach(id => alunos.delete(id));
+      mensagem.alterados.forEach(a => alunos.set(a.aluno_id, a));
+      return { aula_id: mensagem.aula_id, alunos: ordenarPorRisco(alunos.values()) };
+    });
+  }, []);
+
   useEffect(() => {
-    fetchAnalysis();
     loadQuizzes();
     loadDataMining();
-    const interval = setInterval(fetchAnalysis, 3000); // Atualizar a cada 3 segundos para tempo real
-    return () => clearInterval(interval);
-  }, [fetchAnalysis, loadQuizzes, loadDataMining]);
+
+    // Atualizações em tempo real via WebSocket; polling só se o canal cair
+    let interval = null;
+    const startPolling = () => {
+      if (!interval) {
+        fetchAnalysis();
+        interval = setInterval(fetchAnalysis, 3000);
+      }
+    };
+
+    const socket = new WebSocket(`${WS_BASE_URL}/ws/analise/${aulaId}`);
+    socket.onmessage = (event) => applyAnalysisMessage(JSON.parse(event.data));
+    socket.onerror = startPolling;
+    socket.onclose = startPolling;
+
+    return () => {
+      socket.onclose = null;
+      socket.onerror = null;
+      socket.close();
+      if (interval) clearInterval(interval);
+    };
+  }, [aulaId, fetchAnalysis, loadQuizzes, loadDataMining, applyAnalysisMessage]);
 
   const getRiskColor = (risco) => {
     if (risco >= 70) return '#ef4444';
@@ -260,6 +327,28 @@ function TeacherDashboard() {
           )}
         </div>
       </div>
+
+      <div className="alert-section glass-card">
+        <h2>💡 Intervenções Recentes</h2>
+        <div className="alert-students">
+          {interventions.map((intervencao) => (
+            <div key={intervencao.id} className="alert-student">
+              <strong>
+                {analysis?.alunos?.find(a => a.aluno_id === intervencao.aluno_id)?.aluno_nome
+                  || `Aluno ${intervencao.aluno_id}`}
+              </strong>
+              <span>{NOMES_INTERVENCAO[intervencao.tipo] || intervencao.tipo}</span>
+              <span>{intervencao.tipo === 'interaction'
+                ? `${intervencao.valor} interações`
+                : `${(intervencao.valor * 100).toFixed(0)}%`}</span>
+              <span>{new Date(intervencao.timestamp).toLocaleTimeString()}</span>
+            </div>
+          ))}
+          {interventions.length === 0 && (
+            <p className="no-alerts">Nenhuma intervenção disparada nesta aula.</p>
+          )}
+        </div>
+      </div>
     </div>
   );
 }
@@ -0,0 +1,27 @@
+// Codifica um lote de métricas no formato binário de
+// POST /api/metricas/lote/binario (backend/formato_binario.py): amostras de
+// atenção com layout fixo de 17 bytes e as de interação em JSON no fim.
+const CABECALHO = 6;
+const AMOSTRA_ATENCAO = 17;
+
+export function codificarLote(atencao, interacao = []) {
+  const json = interacao.length ? new TextEncoder().encode(JSON.stringify(interacao)) : new Uint8Array(0);
+  const buffer = new ArrayBuffer(CABECALHO + atencao.length * AMOSTRA_ATENCAO + json.length);
+  const dados = new DataView(buffer);
+  dados.setUint8(0, 0x4d); // "M"
+  dados.setUint8(1, 0x41); // "A"
+  dados.setUint8(2, 1); // versão
+  dados.setUint8(3, 0);
+  dados.setUint16(4, atencao.length, true);
+  atencao.forEach((amostra, i) => {
+    const p = CABECALHO + i * AMOSTRA_ATENCAO;
+    dados.setUint32(p, amostra.aluno_id, true);
+    dados.setUint32(p + 4, amostra.aula_id, true);
+    dados.setFloat32(p + 8, amostra.fadiga_score, true);
+    dados.setUint16(p + 12, amostra.desvio_olhar, true);
+    dados.setUint16(p + 14, amostra.interrupcoes, true);
+    dados.setUint8(p + 16, amostra.gaze_na_tela ? 1 : 0);
+  });
+  new Uint8Array(buffer, CABECALHO + atencao.length * AMOSTRA_ATENCAO).set(json);
+  return buffer;
+}
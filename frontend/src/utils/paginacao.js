@@ -0,0 +1,19 @@
+import axios from 'axios';
+
+// Percorre as páginas de uma listagem paginada por cursor. Com `desde`
+// (o cursorRecente de uma busca anterior), traz só os itens criados depois.
+export async function buscarPaginas(url, desde = null) {
+  const itens = [];
+  let cursor = null;
+  let cursorRecente = desde;
+  do {
+    const params = {};
+    if (desde) params.desde = desde;
+    if (cursor) params.cursor = cursor;
+    const { data } = await axios.get(url, { params });
+    itens.push(...data.itens);
+    cursor = data.proximo_cursor;
+    cursorRecente = data.cursor_recente || cursorRecente;
+  } while (cursor);
+  return { itens, cursorRecente };
+}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Sistema de Monitoramento de Engajamento em Aulas Online
+Benchmark de carga: simula uma aula completa contra o backend
+
+Executa benchmarks/carga_aula.py (alunos enviando métricas, quizzes e
+logs; docentes consultando análise, quizzes e mineração), grava o
+resultado em JSON e, com --comparar, aponta regressões em relação a uma
+execução anterior.
+
+Exemplos:
+    python run_benchmark.py --alunos 50 200 500 --segundos 60
+    python run_benchmark.py --saida atual.json --comparar baseline.json
+    python run_benchmark.py --modo processo --alunos 100
+"""
+
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+sys.path.insert(0, str(RAIZ / "benchmarks"))
+
+import carga_aula  # noqa: E402
+
+class Colors:
+    """Cores para terminal"""
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+def print_header(message):
+    """Imprime cabeçalho colorido"""
+    print(f"\n{Colors.HEADER}{Colors.BOLD}═══ {message} ═══{Colors.ENDC}")
+
+def print_success(message):
+    """Imprime mensagem de sucesso"""
+    print(f"{Colors.OKGREEN}✅ {message}{Colors.ENDC}")
+
+def print_warning(message):
+    """Imprime mensagem de aviso"""
+    print(f"{Colors.WARNING}⚠️  {message}{Colors.ENDC}")
+
+def print_error(message):
+    """Imprime mensagem de erro"""
+    print(f"{Colors.FAIL}❌ {message}{Colors.ENDC}")
+
+def versao_git():
+    """Commit atual, para identificar a execução no relatório"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=RAIZ, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def imprimir_resultados(resultados):
+    """Tabela por número de alunos: total e cada endpoint"""
+    for alunos in sorted({r["alunos"] for r in resultados}):
+        print_header(f"{alunos} ALUNOS")
+        for linha in (r for r in resultados if r["alunos"] == alunos):
+            if linha["endpoint"] == "total":
+                print(f"{Colors.BOLD}total{Colors.ENDC}: {linha['req_por_s']} req/s, "
+                      f"{linha['erros']} erros ({linha['taxa_erro']:.2%}), "
+                      f"atraso p95 dos envios {linha['atraso_envio_p95_ms']} ms, "
+                      f"banco +{linha['crescimento_mb']} MB")
+            else:
+                print(f"  {linha['endpoint']:<38} {linha['requisicoes']:>7} req  {linha['erros']:>4} erros  "
+                      f"p50 {linha['p50_ms']} / p95 {linha['p95_ms']} / p99 {linha['p99_ms']} ms")
+
+def comparar(resultados, baseline, tolerancia):
+    """
+    Regressões em relação ao baseline: p95 ou taxa de erro maiores, ou
+    vazão menor, além da tolerância relativa
+    """
+    anteriores = {(r["alunos"], r["endpoint"]): r for r in baseline["resultados"]}
+    regressoes = []
+    comparados = 0
+    for linha in resultados:
+        anterior = anteriores.get((linha["alunos"], linha["endpoint"]))
+        if anterior is None:
+            continue
+        comparados += 1
+        rotulo = f"{linha['alunos']} alunos, {linha['endpoint']}"
+        if linha["endpoint"] == "total":
+            if linha["req_por_s"] < anterior["req_por_s"] * (1 - tolerancia):
+                regressoes.append(f"{rotulo}: vazão {anterior['req_por_s']} -> {linha['req_por_s']} req/s")
+            if linha["taxa_erro"] > anterior["taxa_erro"] + 0.01:
+                regressoes.append(f"{rotulo}: taxa de erro {anterior['taxa_erro']:.2%} -> {linha['taxa_erro']:.2%}")
+        elif linha["p95_ms"] and anterior["p95_ms"] and linha["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{rotulo}: p95 {anterior['p95_ms']} -> {linha['p95_ms']} ms")
+    return regressoes, comparados
+
+def main():
+    parser = carga_aula.criar_parser()
+    parser.description = __doc__
+    parser.add_argument("--saida", default="benchmark_resultados.json", help="arquivo JSON do relatório")
+    parser.add_argument("--comparar", metavar="BASELINE", help="relatório JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="variação relativa aceita (padrão 20%%)")
+    args = parser.parse_args()
+
+    print_header("BENCHMARK DE CARGA")
+    print(f"Alunos: {', '.join(map(str, args.alunos))} | docentes: {args.docentes} | "
+          f"{args.segundos:g} s por execução | modo: {args.modo}")
+
+    try:
+        resultados = carga_aula.rodar(args)
+    except Exception as e:
+        print_error(f"Erro ao executar o benchmark: {e}")
+        sys.exit(1)
+
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "commit": versao_git(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("saida", "comparar", "json")},
+        "resultados": resultados,
+    }
+
+    if args.json:
+        print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    else:
+        imprimir_resultados(resultados)
+
+    Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    print_success(f"Relatório salvo em {args.saida}")
+
+    if args.comparar:
+        baseline = json.loads(Path(args.comparar).read_text())
+        regressoes, comparados = comparar(resultados, baseline, args.tolerancia)
+        if not comparados:
+            print_warning(f"Nenhum número de alunos em comum com {args.comparar}")
+        for regressao in regressoes:
+            print_warning(regressao)
+        if regressoes:
+            print_error(f"{len(regressoes)} regressões em relação a {args.comparar}")
+            sys.exit(1)
+        print_success(f"Sem regressões em relação a {args.comparar}")
+
+if __name__ == "__main__":
+    main()
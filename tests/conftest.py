@@ -0,0 +1,34 @@
+"""
+Configuração dos testes
+
+Os testes importam os módulos do backend diretamente (como os scripts em
+backend/ e os benchmarks fazem) e trabalham sobre bancos SQLite
+temporários, sem tocar no monitoramento.db da aplicação.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+# o backend lê DATABASE_URL ao ser importado
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='teste_monitoramento_'), 'app.db')}"
+
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import criar_engine  # noqa: E402
+from migracoes import aplicar_migracoes  # noqa: E402
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco SQLite vazio com as migrações aplicadas: (engine, sessionmaker)"""
+    engine = criar_engine(f"sqlite:///{tmp_path / 'teste.db'}")
+    aplicar_migracoes(bind=engine)
+    yield engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
@@ -0,0 +1,145 @@
+"""
+Regressões de índices e de consistência das somas incrementais
+
+Falha se uma consulta principal deixar de usar o índice esperado, se os
+agregados, a linha do tempo ou as estatísticas de quiz divergirem do
+recálculo a partir das linhas brutas depois de uma ingestão, ou se a
+paginação por keyset perder ou repetir linhas.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+import ingestao
+from agregados import verificar_agregados
+from estatisticas_quiz import verificar_estatisticas
+from ingestao import FilaIngestao
+from intervalos_atencao import IntervalosAtencao
+from intervencoes import MotorIntervencoes
+from linha_tempo import verificar_linha_tempo
+from migracoes import verificar_planos
+from models import Aluno, Aula, Docente, Intervencao, Quiz
+from paginacao import paginar
+
+ALUNOS = 12
+AULAS = (1, 2)
+QUIZZES = {10: 1, 11: 2}  # quiz_id -> aula_id
+
+
+def _cadastrar(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(Docente), [{"id": 1, "nome": "Docente", "email": "docente@teste"}])
+        conn.execute(insert(Aluno), [
+            {"id": i, "nome": f"Aluno {i}", "email": f"aluno{i}@teste"} for i in range(1, ALUNOS + 1)
+        ])
+        conn.execute(insert(Aula), [
+            {"id": a, "titulo": f"Aula {a}", "descricao": "", "docente_id": 1} for a in AULAS
+        ])
+        conn.execute(insert(Quiz), [
+            {"id": q, "aula_id": a, "titulo": f"Quiz {q}", "perguntas": []} for q, a in QUIZZES.items()
+        ])
+
+
+def _lotes(passos=60, semente=7):
+    """Envios na cadência do StudentView: atenção a cada 2 s, interação e quiz de vez em quando"""
+    rnd = random.Random(semente)
+    inicio = datetime(2026, 3, 2, 9, 0, 0)
+    for passo in range(passos):
+        momento = inicio + timedelta(seconds=2 * passo)
+        atencao, interacao, respostas = [], [], []
+        for aula_id in AULAS:
+            for aluno_id in range(1, ALUNOS + 1):
+                gaze = rnd.random() < 0.75
+                atencao.append({
+                    "aluno_id": aluno_id, "aula_id": aula_id, "gaze_na_tela": gaze,
+                    "fadiga_score": round(rnd.uniform(0.0, 1.0), 3), "desvio_olhar": 0 if gaze else 1,
+                    "interrupcoes": rnd.choice((0, 0, 0, 1)), "timestamp": momento,
+                })
+                if passo % 5 == 0:
+                    interacao.append({
+                        "aluno_id": aluno_id, "aula_id": aula_id, "tempo_permanencia": 2 * (passo + 1),
+                        "eventos_player": {"play": rnd.randint(0, 3), "pause": rnd.randint(0, 2)},
+                        "cliques_materiais": rnd.randint(0, 4), "conteudo_anotacoes": "",
+                        "sessao_chave": f"s{aluno_id}-{aula_id}-{passo // 30}", "timestamp": momento,
+                    })
+        if passo % 10 == 0:
+            for quiz_id in QUIZZES:
+                aluno_id = rnd.randint(1, ALUNOS)
+                respostas.append({
+                    "quiz_id": quiz_id, "aluno_id": aluno_id,
+                    "respostas": {"q1": rnd.choice(("a", "b", "c")), "q2": rnd.randint(0, 3)},
+                    "pontuacao": rnd.choice((0.0, 50.0, 100.0)), "tempo_resposta": rnd.randint(5, 90),
+                    "respondido_em": momento,
+                })
+        yield atencao, interacao, respostas
+
+
+@pytest.fixture
+def ingerido(banco, monkeypatch, request):
+    """Banco com uma aula simulada gravada pela fila de ingestão"""
+    engine, sessao = banco
+    _cadastrar(engine)
+    # estado em memória novo a cada teste: os ids são de outro banco
+    monkeypatch.setattr(ingestao, "intervalos_atencao",
+                        IntervalosAtencao(ativo=request.param, compartilhado=False))
+    monkeypatch.setattr(ingestao, "motor_intervencoes", MotorIntervencoes(compartilhado=False))
+    fila = FilaIngestao(session_factory=sessao, intervalo_ms=5)
+    fila.iniciar()
+    try:
+        futuros = [fila.submeter(*lote) for lote in _lotes()]
+        for futuro in futuros:
+            futuro.result(timeout=30)
+    finally:
+        fila.parar()
+    return sessao
+
+
+def test_consultas_usam_os_indices(banco):
+    engine, _ = banco
+    assert verificar_planos(engine) == []
+
+
+@pytest.mark.parametrize("ingerido", [False, True], ids=["amostras", "intervalos"], indirect=True)
+def test_agregados_iguais_ao_recalculo(ingerido):
+    with ingerido() as db:
+        for aula_id in AULAS:
+            assert verificar_agregados(db, aula_id) == []
+            assert verificar_linha_tempo(db, aula_id) == []
+        for quiz_id in QUIZZES:
+            assert verificar_estatisticas(db, quiz_id) == []
+
+
+@pytest.mark.parametrize("decrescente", [False, True])
+@pytest.mark.parametrize("limite", [1, 7, 200])
+def test_paginacao_keyset_sem_perdas_nem_repeticoes(banco, limite, decrescente):
+    engine, sessao = banco
+    _cadastrar(engine)
+    inicio = datetime(2026, 3, 2, 9, 0, 0)
+    # vários itens com o mesmo timestamp: a ordem depende do desempate pelo id
+    with engine.begin() as conn:
+        conn.execute(insert(Intervencao), [
+            {"aula_id": 1, "aluno_id": 1 + i % ALUNOS, "tipo": "attention", "mensagem": "",
+             "valor": 1.0, "timestamp": inicio + timedelta(seconds=i // 4)}
+            for i in range(250)
+        ])
+
+    colunas = [Intervencao.timestamp, Intervencao.id]
+    with sessao() as db:
+        esperado = [i.id for i in db.query(Intervencao).order_by(*(
+            c.desc() if decrescente else c.asc() for c in colunas))]
+        obtido = []
+        cursor = None
+        while True:
+            pagina = paginar(db.query(Intervencao).filter(Intervencao.aula_id == 1), colunas,
+                             limite=limite, cursor=cursor, decrescente=decrescente)
+            assert len(pagina["itens"]) <= limite
+            obtido.extend(i.id for i in pagina["itens"])
+            cursor = pagina["proximo_cursor"]
+            if cursor is None or len(obtido) > len(esperado):
+                break
+
+    assert len(obtido) == len(set(obtido))
+    assert obtido == esperado
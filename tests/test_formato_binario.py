@@ -0,0 +1,72 @@
+"""Lote binário de métricas: decodificação e erros devolvidos ao cliente"""
+
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from formato_binario import (AMOSTRA_ATENCAO, CABECALHO, CONTENT_TYPE, LoteInvalidoError, codificar_lote,
+                             decodificar_lote)
+
+MOMENTO = datetime(2026, 3, 2, 9, 0, 0)
+AMOSTRAS = [
+    {"aluno_id": 1, "aula_id": 7, "gaze_na_tela": True, "fadiga_score": 0.3, "desvio_olhar": 0, "interrupcoes": 0},
+    {"aluno_id": 2, "aula_id": 7, "gaze_na_tela": False, "fadiga_score": 0.85, "desvio_olhar": 3, "interrupcoes": 1},
+]
+INTERACAO = [{"aluno_id": 1, "aula_id": 7, "tempo_permanencia": 60, "eventos_player": {"play": 1},
+              "cliques_materiais": 2, "conteudo_anotacoes": "", "sessao_id": "s1"}]
+
+
+def _amostra(gaze=1, fadiga=0.5):
+    return AMOSTRA_ATENCAO.pack(1, 7, fadiga, 0, 0, gaze)
+
+
+def test_ida_e_volta():
+    interacao = json.dumps(INTERACAO).encode()
+    atencao, interacao_json = decodificar_lote(codificar_lote(AMOSTRAS, interacao), MOMENTO)
+    assert atencao == [{**m, "timestamp": MOMENTO} for m in AMOSTRAS]
+    assert interacao_json == interacao
+
+
+@pytest.mark.parametrize("corpo, mensagem", [
+    (b"MA\x01", "sem cabeçalho"),
+    (CABECALHO.pack(b"XY", 1, 0, 0) + b"[]", "assinatura"),
+    (CABECALHO.pack(b"MA", 2, 0, 0) + b"[]", "Versão"),
+    (CABECALHO.pack(b"MA", 1, 0, 2) + _amostra(), "truncado"),
+    (CABECALHO.pack(b"MA", 1, 0, 1) + _amostra(gaze=2), "gaze_na_tela"),
+    (CABECALHO.pack(b"MA", 1, 0, 1) + _amostra(fadiga=float("nan")), "finito"),
+    (CABECALHO.pack(b"MA", 1, 0, 1) + _amostra(fadiga=float("inf")), "finito"),
+    (CABECALHO.pack(b"MA", 1, 0, 0) + b"  ", "vazio"),
+])
+def test_lotes_invalidos(corpo, mensagem):
+    with pytest.raises(LoteInvalidoError, match=mensagem):
+        decodificar_lote(corpo, MOMENTO)
+
+
+def test_codificar_recusa_lote_acima_do_limite():
+    with pytest.raises(LoteInvalidoError):
+        codificar_lote(AMOSTRAS * 0x8000)
+
+
+def test_endpoint_responde_400_e_422_sem_enfileirar(monkeypatch):
+    import main
+    from ingestao import FilaIngestao
+
+    # escritora parada: nada pode ser enfileirado por um lote recusado
+    fila = FilaIngestao()
+    monkeypatch.setattr(main, "fila_ingestao", fila)
+    cliente = TestClient(main.app)
+
+    def enviar(corpo):
+        return cliente.post("/api/metricas/lote/binario", content=corpo, headers={"Content-Type": CONTENT_TYPE})
+
+    truncado = enviar(codificar_lote(AMOSTRAS)[:-1])
+    assert truncado.status_code == 400
+    assert "truncado" in truncado.json()["detail"]
+
+    # atenção válida, interação sem tempo_permanencia: o pydantic recusa o lote inteiro
+    sem_tempo = [{k: v for k, v in INTERACAO[0].items() if k != "tempo_permanencia"}]
+    assert enviar(codificar_lote(AMOSTRAS, json.dumps(sem_tempo).encode())).status_code == 422
+    assert enviar(codificar_lote(AMOSTRAS, b"{nao e json")).status_code == 422
+    assert fila.pendentes == 0
@@ -0,0 +1,130 @@
+"""Fila de ingestão: backpressure, contrato de confirmação e falhas na gravação"""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ingestao
+from ingestao import FilaCheiaError, FilaIngestao
+from intervencoes import MotorIntervencoes
+
+AMOSTRA = {"aluno_id": 1, "aula_id": 1, "gaze_na_tela": True, "fadiga_score": 0.2,
+           "desvio_olhar": 0, "interrupcoes": 0}
+
+
+def _linhas(n):
+    return [{**AMOSTRA, "timestamp": datetime.now()} for _ in range(n)]
+
+
+@pytest.fixture
+def motor(monkeypatch):
+    motor = MotorIntervencoes(compartilhado=False)
+    monkeypatch.setattr(ingestao, "motor_intervencoes", motor)
+    return motor
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Cliente da API sem o lifespan: cada teste instala a sua fila"""
+    import main
+
+    def usar(fila, timeout_ack=2.0):
+        monkeypatch.setattr(main, "fila_ingestao", fila)
+        monkeypatch.setattr(main, "TIMEOUT_ACK_LOTE", timeout_ack)
+        return TestClient(main.app)
+    return usar
+
+
+def test_submeter_espera_espaco_e_desiste_no_timeout():
+    # sem thread escritora: nada sai da fila
+    fila = FilaIngestao(capacidade=5)
+    fila.submeter(_linhas(5), [])
+    assert fila.pendentes == 5
+    with pytest.raises(FilaCheiaError):
+        fila.submeter(_linhas(1), [], timeout=0.05)
+    with pytest.raises(FilaCheiaError):
+        FilaIngestao(capacidade=5).submeter(_linhas(6), [], timeout=0)
+    assert fila.pendentes == 5
+
+
+def test_fila_libera_espaco_depois_de_gravar(banco, motor):
+    _, sessao = banco
+    fila = FilaIngestao(session_factory=sessao, intervalo_ms=1, capacidade=5)
+    fila.iniciar()
+    try:
+        for _ in range(4):
+            assert fila.submeter(_linhas(5), [], timeout=5).result(timeout=5) == 5
+    finally:
+        fila.parar()
+    assert fila.pendentes == 0
+
+
+def test_erro_ao_abrir_a_sessao_nao_derruba_a_escritora(banco, motor):
+    _, sessao = banco
+    falhas = [RuntimeError("banco indisponível")]
+
+    def abrir():
+        if falhas:
+            raise falhas.pop()
+        return sessao()
+
+    fila = FilaIngestao(session_factory=abrir, intervalo_ms=1, capacidade=5)
+    fila.iniciar()
+    try:
+        with pytest.raises(RuntimeError, match="indisponível"):
+            fila.submeter(_linhas(5), []).result(timeout=5)
+        # o espaço do lote que falhou foi devolvido e a thread continua gravando
+        assert fila.submeter(_linhas(5), [], timeout=1).result(timeout=5) == 5
+    finally:
+        fila.parar()
+    assert fila.pendentes == 0
+
+
+def test_erro_depois_do_commit_resolve_os_futures(banco, motor, monkeypatch):
+    _, sessao = banco
+    falhas = [RuntimeError("falha ao instalar as janelas")]
+    confirmar = motor.confirmar
+
+    def confirmar_falhando(janelas):
+        if falhas:
+            raise falhas.pop()
+        confirmar(janelas)
+
+    monkeypatch.setattr(motor, "confirmar", confirmar_falhando)
+    fila = FilaIngestao(session_factory=sessao, intervalo_ms=1, capacidade=5)
+    fila.iniciar()
+    try:
+        with pytest.raises(RuntimeError, match="janelas"):
+            fila.submeter(_linhas(5), []).result(timeout=5)
+        assert fila.submeter(_linhas(5), [], timeout=1).result(timeout=5) == 5
+    finally:
+        fila.parar()
+    assert fila.pendentes == 0
+
+
+def test_lote_gravado_responde_200(banco, motor, cliente):
+    _, sessao = banco
+    fila = FilaIngestao(session_factory=sessao, intervalo_ms=1)
+    fila.iniciar()
+    try:
+        resposta = cliente(fila).post("/api/metricas/lote", json={"amostras": [AMOSTRA] * 3})
+    finally:
+        fila.parar()
+    assert resposta.status_code == 200
+    assert resposta.json() == {"status": "gravado", "atencao": 3, "interacao": 0}
+
+
+def test_lote_sem_commit_no_prazo_responde_202(cliente):
+    # escritora parada: o commit nunca chega dentro do prazo de confirmação
+    resposta = cliente(FilaIngestao(), timeout_ack=0.05).post("/api/metricas/lote", json={"amostras": [AMOSTRA]})
+    assert resposta.status_code == 202
+    assert resposta.json() == {"status": "enfileirado", "atencao": 1, "interacao": 0}
+
+
+def test_fila_cheia_responde_503_com_retry_after(cliente):
+    fila = FilaIngestao(capacidade=2)
+    fila.submeter(_linhas(2), [])
+    resposta = cliente(fila).post("/api/metricas/lote", json={"amostras": [AMOSTRA]})
+    assert resposta.status_code == 503
+    assert resposta.headers["Retry-After"] == "1"
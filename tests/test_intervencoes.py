@@ -0,0 +1,64 @@
+"""Intervenções: cooldowns com as janelas compartilhadas entre workers"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from intervencoes import MotorIntervencoes
+from models import Intervencao, JanelaIntervencao
+
+INICIO = datetime(2026, 3, 2, 9, 0, 0)
+
+
+def _fora_da_tela(inicio, n):
+    return [{
+        "aluno_id": 1, "aula_id": 1, "gaze_na_tela": False, "fadiga_score": 0.1, "desvio_olhar": 1,
+        "interrupcoes": 0, "timestamp": INICIO + timedelta(seconds=2 * (inicio + i)),
+    } for i in range(n)]
+
+
+def _gravar(sessao, motor, amostras, segurar=0.0, avaliou=None):
+    with sessao() as db:
+        motor.processar(db, amostras)
+        if avaliou:
+            avaliou.set()
+        # segura a transação aberta enquanto o outro worker avalia
+        time.sleep(segurar)
+        db.commit()
+
+
+def test_dois_workers_nao_repetem_a_intervencao_no_cooldown(banco):
+    _, sessao = banco
+    # um motor por worker: o estado de cada aluno só existe no banco
+    primeiro, segundo = MotorIntervencoes(compartilhado=True), MotorIntervencoes(compartilhado=True)
+    avaliou = threading.Event()
+    erros = []
+
+    def worker(*args, **kwargs):
+        try:
+            _gravar(sessao, *args, **kwargs)
+        except Exception as e:
+            erros.append(e)
+            avaliou.set()
+
+    def depois_do_primeiro():
+        avaliou.wait()
+        worker(segundo, _fora_da_tela(5, 5))
+
+    a = threading.Thread(target=worker, args=(primeiro, _fora_da_tela(0, 5)),
+                         kwargs={"segurar": 0.3, "avaliou": avaliou})
+    b = threading.Thread(target=depois_do_primeiro)
+    for t in (a, b):
+        t.start()
+    for t in (a, b):
+        t.join(10)
+
+    assert erros == []
+    with sessao() as db:
+        disparos = db.query(Intervencao.timestamp).filter(Intervencao.tipo == "attention").all()
+        # o segundo lote (10 a 18 s) cai nos 30 s de cooldown do disparo aos 8 s
+        assert [t for t, in disparos] == [INICIO + timedelta(seconds=8)]
+        janela = db.query(JanelaIntervencao).one()
+        assert janela.tamanho == 10
+        assert janela.ultima == INICIO + timedelta(seconds=18)
+
@@ -0,0 +1,123 @@
+"""Modelo de risco: validação da configuração e recarga do arquivo"""
+
+import json
+import os
+
+import pytest
+
+from agregados import calcular_risco
+from modelo_risco import CONFIGURACAO_PADRAO, MODELO_PADRAO, ModeloConfigurado, ModeloInvalidoError, ModeloRisco
+
+NOVA = {"nome": "novo", "maximo": 50, "regras": [
+    {"campo": "total_cliques", "operador": "<", "limite": 5, "peso": 80},
+]}
+
+
+def _regra(**campos):
+    return {"regras": [{"campo": "score_atencao", "operador": "<", "limite": 50, "peso": 30, **campos}]}
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def configurado(tmp_path):
+    arquivo = tmp_path / "modelo_risco.json"
+    relogio = Relogio()
+    modelo = ModeloConfigurado(arquivo=str(arquivo), recarga_s=5, relogio=relogio)
+    recarregados = []
+    modelo.ao_recarregar.append(recarregados.append)
+    return modelo, arquivo, relogio, recarregados
+
+
+def _escrever(arquivo, conteudo, versao):
+    arquivo.write_text(conteudo if isinstance(conteudo, str) else json.dumps(conteudo), encoding="utf-8")
+    # mtime explícito: duas escritas no mesmo instante não contariam como mudança
+    os.utime(arquivo, ns=(versao * 10**9, versao * 10**9))
+
+
+def test_padrao_reproduz_os_limites_anteriores():
+    assert MODELO_PADRAO.configuracao() == CONFIGURACAO_PADRAO
+    assert calcular_risco(40, 0.8, 1, 100, modelo=MODELO_PADRAO) == 100
+    assert calcular_risco(90, 0.1, 10, 900, modelo=MODELO_PADRAO) == 0
+    assert calcular_risco(40, 0.1, 10, 900, modelo=MODELO_PADRAO) == 30
+
+
+@pytest.mark.parametrize("configuracao, mensagem", [
+    ([], "lista 'regras'"),
+    ({"regras": {}}, "lista 'regras'"),
+    ({"regras": ["score_atencao < 50"]}, "esperado um objeto"),
+    (_regra(campo="nota"), "campo desconhecido"),
+    (_regra(operador="=="), "operador desconhecido"),
+    (_regra(limite="50"), "numérico"),
+    (_regra(peso=True), "numérico"),
+    (_regra(peso=float("nan")), "finito"),
+    ({**_regra(), "maximo": float("inf")}, "finito"),
+])
+def test_configuracoes_invalidas(configuracao, mensagem):
+    with pytest.raises(ModeloInvalidoError, match=mensagem):
+        ModeloRisco.de_configuracao(configuracao)
+
+
+@pytest.mark.parametrize("constante", ["NaN", "Infinity", "-Infinity"])
+def test_arquivo_com_nan_ou_infinito(tmp_path, constante):
+    arquivo = tmp_path / "modelo.json"
+    arquivo.write_text(json.dumps(_regra()).replace("50", constante), encoding="utf-8")
+    with pytest.raises(ModeloInvalidoError, match="não suportado"):
+        ModeloRisco.de_arquivo(str(arquivo))
+
+
+def test_sem_arquivo_usa_o_padrao(configurado):
+    modelo, _, _, recarregados = configurado
+    assert modelo.atual() is MODELO_PADRAO
+    assert recarregados == []
+
+
+def test_recarrega_quando_o_arquivo_muda(configurado):
+    modelo, arquivo, relogio, recarregados = configurado
+    _escrever(arquivo, CONFIGURACAO_PADRAO, 1)
+    original = modelo.atual()
+    assert original.assinatura == MODELO_PADRAO.assinatura
+
+    _escrever(arquivo, NOVA, 2)
+    # dentro do intervalo de recarga o arquivo não é consultado
+    relogio.agora = 4
+    assert modelo.atual() is original
+
+    relogio.agora = 6
+    novo = modelo.atual()
+    assert novo.nome == "novo"
+    assert novo.assinatura != original.assinatura
+    assert novo.avaliar(90, 0, 1, 900, 0, 0) == 50
+    assert recarregados == [novo]
+    assert modelo.recargas == 1
+
+    # arquivo sem mudança: nenhuma recarga nova
+    relogio.agora = 12
+    assert modelo.atual() is novo
+    assert recarregados == [novo]
+
+
+@pytest.mark.parametrize("conteudo", ['{"regras": [', {"regras": [{"campo": "nota"}]},
+                                      '{"regras": [], "maximo": NaN}'])
+def test_arquivo_invalido_mantem_o_modelo_anterior(configurado, conteudo):
+    modelo, arquivo, relogio, recarregados = configurado
+    _escrever(arquivo, NOVA, 1)
+    anterior = modelo.atual()
+
+    _escrever(arquivo, conteudo, 2)
+    relogio.agora = 6
+    assert modelo.atual() is anterior
+    assert recarregados == []
+    assert modelo.recargas == 0
+
+    # corrigido o arquivo, a recarga volta a valer
+    _escrever(arquivo, CONFIGURACAO_PADRAO, 3)
+    relogio.agora = 12
+    assert modelo.atual().assinatura == MODELO_PADRAO.assinatura
+    assert len(recarregados) == 1
@@ -0,0 +1,83 @@
+"""Ranking da turma pelo índice e durante a troca do modelo de risco"""
+
+import random
+
+import pytest
+from sqlalchemy import insert
+
+from agregados import atualizar_ranking, calcular_analise, ranking_turma
+from modelo_risco import MODELO_PADRAO, ModeloRisco
+from models import AgregadoEngajamento, Aluno, Aula, Docente
+
+ALUNOS = 30
+
+# Inverte o padrão: quem tem mais cliques e mais atenção passa a ter mais risco
+MODELO_NOVO = ModeloRisco("invertido", [
+    {"campo": "score_atencao", "operador": ">=", "limite": 50, "peso": 40},
+    {"campo": "total_cliques", "operador": ">=", "limite": 3, "peso": 35},
+])
+
+
+@pytest.fixture
+def turma(banco):
+    engine, sessao = banco
+    rnd = random.Random(5)
+    with engine.begin() as conn:
+        conn.execute(insert(Docente), [{"id": 1, "nome": "Docente", "email": "docente@teste"}])
+        conn.execute(insert(Aluno), [
+            {"id": i, "nome": f"Aluno {i}", "email": f"aluno{i}@teste"} for i in range(1, ALUNOS + 1)
+        ])
+        conn.execute(insert(Aula), [{"id": 1, "titulo": "Aula 1", "descricao": "", "docente_id": 1}])
+        linhas = []
+        for i in range(1, ALUNOS + 1):
+            total = rnd.randint(10, 100)
+            linhas.append({
+                "aula_id": 1, "aluno_id": i, "total_checks": total, "checks_na_tela": rnd.randint(0, total),
+                "soma_fadiga": total * rnd.uniform(0.2, 0.9), "soma_desvios": rnd.randint(0, 5),
+                "soma_interrupcoes": rnd.randint(0, 3), "total_tempo": rnd.randint(0, 600),
+                "total_cliques": rnd.randint(0, 6),
+            })
+        conn.execute(insert(AgregadoEngajamento), linhas)
+    with sessao() as db:
+        atualizar_ranking(db, aula_id=1, modelo=MODELO_PADRAO)
+        db.commit()
+    return sessao
+
+
+def _todas_as_paginas(db, limite, **filtros):
+    alunos, cursor = [], None
+    while True:
+        pagina = ranking_turma(db, 1, limite=limite, cursor=cursor, **filtros)
+        alunos.extend(pagina["alunos"])
+        cursor = pagina["proximo_cursor"]
+        if cursor is None or len(alunos) > ALUNOS:
+            return alunos
+
+
+def _esperado(db, modelo, min_risco=None):
+    resultados = [r for r in calcular_analise(db, 1, modelo)
+                  if min_risco is None or r["risco_evasao"] >= min_risco]
+    return sorted(resultados, key=lambda r: (r["risco_evasao"], r["aluno_id"]), reverse=True)
+
+
+@pytest.mark.parametrize("limite", [4, 200])
+@pytest.mark.parametrize("min_risco", [None, 40])
+def test_ranking_usa_o_modelo_novo_antes_de_atualizar_os_riscos(turma, limite, min_risco):
+    with turma() as db:
+        # riscos gravados pelo modelo padrão; o modelo carregado já é outro
+        esperado = _esperado(db, MODELO_NOVO, min_risco)
+        assert esperado != _esperado(db, MODELO_PADRAO, min_risco)
+
+        obtido = _todas_as_paginas(db, limite, min_risco=min_risco, modelo=MODELO_NOVO)
+        assert obtido == esperado
+
+        # depois de atualizar_rankings, o caminho pelo índice dá a mesma resposta
+        atualizar_ranking(db, modelo=MODELO_NOVO, desatualizados=True)
+        assert _todas_as_paginas(db, limite, min_risco=min_risco, modelo=MODELO_NOVO) == esperado
+
+
+def test_ordem_por_atencao_com_riscos_desatualizados(turma):
+    with turma() as db:
+        obtido = _todas_as_paginas(db, 7, ordenar_por="score_atencao", min_risco=40, modelo=MODELO_NOVO)
+        assert {r["aluno_id"] for r in obtido} == {r["aluno_id"] for r in _esperado(db, MODELO_NOVO, 40)}
+        assert [r["score_atencao"] for r in obtido] == sorted(r["score_atencao"] for r in obtido)
@@ -0,0 +1,88 @@
+"""Retenção: compactação das amostras brutas e dos intervalos de atenção"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert
+
+from agregados import aplicar_atencao, calcular_analise_bruta
+from intervalos_atencao import IntervalosAtencao
+from linha_tempo import registrar_atencao
+from models import (Aluno, Aula, Docente, IntervaloAtencao, MetricaAtencao, MetricaAtencaoMinuto,
+                    PresencaAtencaoIntervalo)
+from retencao import compactar_atencao
+
+INICIO = datetime(2026, 3, 2, 9, 0, 0)
+
+
+def _gravar_aula(sessao, aula_id, intervalos, alunos=6, passos=120, semente=3):
+    """Uma aula de `passos` amostras por aluno, brutas ou em intervalos"""
+    rnd = random.Random(semente)
+    escritor = IntervalosAtencao(ativo=True, compartilhado=False)
+    estados = {a: True for a in range(1, alunos + 1)}
+    with sessao() as db:
+        for passo in range(passos):
+            lote = []
+            for aluno in estados:
+                if rnd.random() < 0.05:
+                    estados[aluno] = not estados[aluno]
+                lote.append({
+                    "aluno_id": aluno, "aula_id": aula_id, "gaze_na_tela": estados[aluno],
+                    "fadiga_score": round(rnd.uniform(0.2, 0.24), 3), "desvio_olhar": 0 if estados[aluno] else 1,
+                    "interrupcoes": 0, "timestamp": INICIO + timedelta(seconds=2 * passo),
+                })
+            abertos = None
+            if intervalos:
+                abertos = escritor.gravar(db, lote)
+            else:
+                db.execute(insert(MetricaAtencao), lote)
+            aplicar_atencao(db, lote)
+            registrar_atencao(db, lote)
+            db.commit()
+            if abertos:
+                escritor.confirmar(abertos)
+
+
+@pytest.fixture
+def turma(banco):
+    engine, sessao = banco
+    with engine.begin() as conn:
+        conn.execute(insert(Docente), [{"id": 1, "nome": "Docente", "email": "docente@teste"}])
+        conn.execute(insert(Aluno), [{"id": i, "nome": f"Aluno {i}", "email": f"aluno{i}@teste"} for i in range(1, 7)])
+        conn.execute(insert(Aula), [{"id": a, "titulo": f"Aula {a}", "descricao": "", "docente_id": 1} for a in (1, 2)])
+    return sessao
+
+
+def test_compacta_intervalos_e_presencas_sem_mudar_a_analise(turma):
+    _gravar_aula(turma, 1, intervalos=False)
+    _gravar_aula(turma, 2, intervalos=True)
+    with turma() as db:
+        antes = {a: calcular_analise_bruta(db, a) for a in (1, 2)}
+        amostras = db.query(func.count(MetricaAtencao.id)).scalar() + \
+            db.query(func.sum(IntervaloAtencao.total_amostras)).scalar()
+
+        baldes, removidas = compactar_atencao(db, dias=1, agora=INICIO + timedelta(days=2))
+
+        assert removidas == amostras
+        assert baldes == db.query(func.count()).select_from(MetricaAtencaoMinuto).scalar() > 0
+        assert db.query(func.count(MetricaAtencao.id)).scalar() == 0
+        assert db.query(func.count(IntervaloAtencao.id)).scalar() == 0
+        assert db.query(func.count()).select_from(PresencaAtencaoIntervalo).scalar() == 0
+        for aula_id in (1, 2):
+            depois = calcular_analise_bruta(db, aula_id)
+            # a análise arredonda as médias: somar a fadiga em outra ordem não a altera
+            assert depois == antes[aula_id]
+
+
+def test_mantem_intervalos_ainda_abertos_no_limite(turma):
+    _gravar_aula(turma, 2, intervalos=True)
+    # limite no meio da aula: só os intervalos encerrados antes dele saem
+    limite = INICIO + timedelta(minutes=2)
+    with turma() as db:
+        total = db.query(func.sum(IntervaloAtencao.total_amostras)).scalar()
+        _, removidas = compactar_atencao(db, dias=0, agora=limite)
+        restantes = db.query(func.sum(IntervaloAtencao.total_amostras)).scalar()
+        assert removidas + restantes == total
+        assert db.query(func.min(IntervaloAtencao.fim)).scalar() >= limite
+        assert db.query(func.sum(MetricaAtencaoMinuto.total_amostras)).scalar() == removidas
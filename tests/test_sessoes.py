@@ -0,0 +1,103 @@
+"""Sessões de interação: deltas dos agregados com gravações simultâneas"""
+
+import threading
+import time
+from datetime import datetime
+
+from models import AgregadoEngajamento, SessaoInteracao
+from sessoes import registrar_interacoes
+
+
+def _linha(tempo, sessao="s1"):
+    return {
+        "aluno_id": 1, "aula_id": 1, "tempo_permanencia": tempo, "eventos_player": {},
+        "cliques_materiais": 0, "conteudo_anotacoes": "", "sessao_chave": sessao,
+        "timestamp": datetime.now(),
+    }
+
+
+def test_gravacoes_simultaneas_nao_contam_o_tempo_duas_vezes(banco):
+    _, sessao = banco
+    with sessao() as db:
+        registrar_interacoes(db, [_linha(8)])
+        db.commit()
+
+    gravou = threading.Event()
+    erros = []
+
+    def primeira():
+        try:
+            with sessao() as db:
+                registrar_interacoes(db, [_linha(10)])
+                gravou.set()
+                # segura a transação aberta enquanto a segunda tenta ler
+                time.sleep(0.3)
+                db.commit()
+        except Exception as e:
+            erros.append(e)
+            gravou.set()
+
+    def segunda():
+        gravou.wait()
+        try:
+            with sessao() as db:
+                registrar_interacoes(db, [_linha(12)])
+                db.commit()
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=primeira), threading.Thread(target=segunda)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    assert erros == []
+    with sessao() as db:
+        assert db.query(SessaoInteracao.tempo_permanencia).scalar() == 12
+        # 8 + (10 - 8) + (12 - 10): a segunda calcula o delta sobre o valor gravado pela primeira
+        assert db.query(AgregadoEngajamento.total_tempo).scalar() == 12
+
+
+def test_endpoint_de_amostra_unica_e_fila_na_mesma_sessao(banco, monkeypatch):
+    """POST /api/metricas/interacao grava no threadpool, fora da fila de ingestão"""
+    import ingestao
+    from ingestao import FilaIngestao
+    from intervencoes import MotorIntervencoes
+    from main import _gravar_interacao
+
+    _, sessao = banco
+    motor = MotorIntervencoes(compartilhado=False)
+    monkeypatch.setattr(ingestao, "motor_intervencoes", motor)
+    monkeypatch.setattr("main.motor_intervencoes", motor)
+    fila = FilaIngestao(session_factory=sessao, intervalo_ms=1)
+    fila.iniciar()
+    erros = []
+
+    def endpoint():
+        try:
+            for tempo in range(2, 82, 2):
+                with sessao() as db:
+                    _gravar_interacao(db, _linha(tempo), "nenhuma")
+        except Exception as e:
+            erros.append(e)
+
+    def lote():
+        try:
+            for tempo in range(1, 81, 2):
+                fila.submeter([], [_linha(tempo)]).result(timeout=10)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=endpoint), threading.Thread(target=lote)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    fila.parar()
+
+    assert erros == []
+    with sessao() as db:
+        # a soma dos deltas é o último valor gravado na sessão, em qualquer ordem de commit
+        assert db.query(AgregadoEngajamento.total_tempo).scalar() == \
+            db.query(SessaoInteracao.tempo_permanencia).scalar()